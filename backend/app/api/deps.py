@@ -1,82 +1,86 @@
-from fastapi import Depends, HTTPException, status, Query, Security
+from fastapi import Depends, HTTPException, status, Query, Request, Security
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from typing import Optional
 from app.core.config import settings
-from app.core.security import decode_access_token
-from app.db.base import get_db
+from app.core.api_tokens import record_use, scope_allows
+from app.core.principals import (
+    Principal, load_principal, load_principal_async, load_token_principal, load_token_principal_async, user_key,
+)
+from app.core.security import READ_PRIMARY_COOKIE, decode_access_token, primary_token_valid
+from app.db.base import AsyncReadSessionLocal, ReadSessionLocal, REPLICA_URLS, get_db, get_async_db
+from app.db.slow_queries import set_request_family
+from app.db.tenancy import TenantScope
 from app.models.user import User
 from app.models.family import Family
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 api_key_header = APIKeyHeader(name="X-API-Token", auto_error=False)
 
+def _authenticated(principal: Optional[Principal], request: Optional[Request] = None) -> Principal:
+    if principal is None or not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if principal.token_id is not None:
+        record_use(principal.token_id)
+        # Token de API: escopos por área da API (app/core/api_tokens.py)
+        if request is not None and not scope_allows(principal.scopes, request.method, request.url.path):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="O token de API não tem escopo para esta operação"
+            )
+    # Família associada às queries lentas desta requisição
+    set_request_family(principal.family_id)
+    if request is not None:
+        # Usuário autenticado (JWT ou token de API) para o read-your-writes em app/main.py
+        request.state.user_id = principal.id
+    return principal
+
+def _credentials(token: Optional[str]) -> Optional[tuple[str, list]]:
+    """Chave do cache de principal e filtro do usuário (JWT Bearer)"""
+    payload = decode_access_token(token) if token else None
+    if payload is None or payload.get("sub") is None:
+        return None
+    user_id = int(payload["sub"])
+    return user_key(user_id), [User.id == user_id]
+
 async def get_current_user(
+    request: Request = None,
     token: Optional[str] = Depends(oauth2_scheme),
     api_key: Optional[str] = Security(api_key_header),
     db: Session = Depends(get_db)
-) -> User:
-    """Obtém o usuário atual a partir do token JWT ou X-API-Token header"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Não foi possível validar as credenciais",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    # --- Autenticação por API Token estático (X-API-Token header) ---
+) -> Principal:
+    """Obtém o usuário atual a partir do token JWT ou X-API-Token header.
+
+    Devolve o principal em cache (app/core/principals.py), sem consulta ao banco na maioria
+    das requisições. Endpoints que precisam do objeto ORM usam get_current_user_model.
+    """
     if api_key:
-        user = db.query(User).options(
-            joinedload(User.families)
-        ).filter(User.api_token == api_key, User.is_active == True).first()
-        if user is None:
-            raise credentials_exception
-        # Cachear family_ids
-        if not hasattr(user, '_cached_family_ids'):
-            if user.is_superuser:
-                family_ids = [f.id for f in user.families] if user.families else []
-                if not family_ids and user.family_id:
-                    family_ids = [user.family_id]
-            else:
-                family_ids = [user.family_id] if user.family_id else []
-            user._cached_family_ids = family_ids
-        return user
-
-    # --- Autenticação por JWT Bearer token ---
-    if not token:
-        raise credentials_exception
-    
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    
-    # OTIMIZAÇÃO: Carregar usuário junto com suas famílias em uma única query
-    user = db.query(User).options(
-        joinedload(User.families)
-    ).filter(User.id == int(user_id)).first()
-    
+        return _authenticated(load_token_principal(db, api_key), request)
+    credentials = _credentials(token)
+    if credentials is None:
+        return _authenticated(None)
+    key, criteria = credentials
+    return _authenticated(load_principal(db, key, criteria), request)
+
+def get_current_user_model(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Usuário atual como objeto ORM (perfil, alterações no próprio usuário)"""
+    user = db.get(User, current_user.id)
     if user is None:
-        raise credentials_exception
-    
-    # Cachear os family_ids no objeto user para evitar queries repetidas
-    if not hasattr(user, '_cached_family_ids'):
-        if user.is_superuser:
-            family_ids = [f.id for f in user.families] if user.families else []
-            if not family_ids and user.family_id:
-                family_ids = [user.family_id]
-        else:
-            family_ids = [user.family_id] if user.family_id else []
-        user._cached_family_ids = family_ids
-    
+        return _authenticated(None)
     return user
 
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """Verifica se o usuário atual é administrador (apenas superuser, não staff)"""
     if not current_user.is_superuser:
         raise HTTPException(
@@ -85,25 +89,18 @@ async def get_current_admin(
         )
     return current_user
 
-def get_user_family_ids(user: User, db: Session) -> list[int]:
-    """Retorna lista de IDs das famílias que o usuário tem acesso - OTIMIZADO usando cache"""
-    # Usar cache se já foi calculado no get_current_user
-    if hasattr(user, '_cached_family_ids'):
-        return user._cached_family_ids
-    
-    # Fallback se não foi cacheado (não deveria acontecer, mas por segurança)
-    if user.is_superuser:
-        family_ids = [f.id for f in user.families] if user.families else []
-        if not family_ids and user.family_id:
-            family_ids = [user.family_id]
-        return family_ids
-    elif user.is_staff:
-        return [user.family_id] if user.family_id else []
-    else:
-        return [user.family_id] if user.family_id else []
+def get_user_family_ids(user, db: Session) -> list[int]:
+    """Retorna lista de IDs das famílias que o usuário tem acesso.
+
+    Para o principal autenticado os IDs já estão calculados (sem query); objetos User do
+    ORM (ex.: bot do Telegram) usam as mesmas regras de Principal.from_user.
+    """
+    if isinstance(user, Principal):
+        return list(user.family_ids)
+    return list(Principal.from_user(user).family_ids)
 
 async def get_current_family(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     family_id: Optional[int] = Query(None, description="ID da família (apenas para admins)"),
     db: Session = Depends(get_db)
 ) -> Optional[int]:
@@ -115,48 +112,21 @@ async def get_current_family(
     """
     # Se for admin e forneceu family_id, validar e retornar
     if (current_user.is_superuser or current_user.is_staff) and family_id is not None:
-        # Usar cache de family_ids se disponível para validação rápida
-        cached_family_ids = getattr(current_user, '_cached_family_ids', None)
-        
-        if cached_family_ids is not None:
-            # Verificar acesso usando cache (sem query adicional)
-            has_access = family_id in cached_family_ids or family_id == current_user.family_id
-            if not has_access:
-                # Se não está no cache, verificar se a família existe
-                family = db.query(Family).filter(Family.id == family_id).first()
-                if not family:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Família não encontrada"
-                    )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Você não tem acesso a esta família"
-                )
+        set_request_family(family_id)
+        # Verificar acesso usando as famílias do principal (sem query adicional)
+        if family_id in current_user.family_ids or family_id == current_user.family_id:
             return family_id
-        
-        # Fallback: validar que a família existe
+        # Sem acesso: distinguir família inexistente de família de outro usuário
         family = db.query(Family).filter(Family.id == family_id).first()
         if not family:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Família não encontrada"
             )
-        
-        # Se for superuser, validar que tem acesso a essa família
-        if current_user.is_superuser:
-            # Verificar se a família está nas famílias do admin ou é a família principal
-            has_access = (
-                family_id == current_user.family_id or
-                any(f.id == family_id for f in current_user.families)
-            )
-            if not has_access:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Você não tem acesso a esta família"
-                )
-        
-        return family_id
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem acesso a esta família"
+        )
     
     # Para admins sem family_id, retornar None (os endpoints tratarão para buscar todas as famílias)
     if (current_user.is_superuser or current_user.is_staff) and family_id is None:
@@ -171,3 +141,117 @@ async def get_current_family(
     
     return current_user.family_id
 
+
+def _tenant_scope(current_user: Principal, family_id: Optional[int]) -> TenantScope:
+    if family_id is not None:
+        return TenantScope((family_id,), family_id)
+    # Admin sem family_id: todas as famílias dele; escritas vão para a primeira
+    family_ids = tuple(get_user_family_ids(current_user, None))
+    return TenantScope(family_ids, family_ids[0] if family_ids else None)
+
+
+async def get_tenant_scope(
+    current_user: Principal = Depends(get_current_user),
+    family_id: Optional[int] = Depends(get_current_family)
+) -> TenantScope:
+    """Escopo de família da requisição (app/db/tenancy.py), resolvido uma vez"""
+    return _tenant_scope(current_user, family_id)
+
+
+# ===== Versões assíncronas (AsyncSession / asyncpg) =====
+# Mesmas regras das dependencies acima, para os endpoints que já usam get_async_db.
+
+async def get_current_user_async(
+    request: Request = None,
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Security(api_key_header),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Obtém o usuário atual a partir do token JWT ou X-API-Token header (sessão assíncrona)"""
+    if api_key:
+        return _authenticated(await load_token_principal_async(db, api_key), request)
+    credentials = _credentials(token)
+    if credentials is None:
+        return _authenticated(None)
+    key, criteria = credentials
+    return _authenticated(await load_principal_async(db, key, criteria), request)
+
+
+async def get_current_family_async(
+    current_user: Principal = Depends(get_current_user_async),
+    family_id: Optional[int] = Query(None, description="ID da família (apenas para admins)"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[int]:
+    """Retorna o family_id do usuário atual (mesmas regras de get_current_family, sessão assíncrona)"""
+    if (current_user.is_superuser or current_user.is_staff) and family_id is not None:
+        set_request_family(family_id)
+        if family_id in get_user_family_ids(current_user, db) or family_id == current_user.family_id:
+            return family_id
+        family = await db.get(Family, family_id)
+        if not family:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Família não encontrada"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem acesso a esta família"
+        )
+
+    # Para admins sem family_id, retornar None (os endpoints tratarão para buscar todas as famílias)
+    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
+        return None
+
+    if current_user.family_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuário não possui uma família associada. Entre em contato com o administrador."
+        )
+
+    return current_user.family_id
+
+
+async def get_tenant_scope_async(
+    current_user: Principal = Depends(get_current_user_async),
+    family_id: Optional[int] = Depends(get_current_family_async)
+) -> TenantScope:
+    """Igual a get_tenant_scope, com as dependencies assíncronas"""
+    return _tenant_scope(current_user, family_id)
+
+
+# ----- Sessões de leitura (réplicas) -----
+
+def _read_from_primary(request: Request, user: Principal) -> bool:
+    """Sem réplicas configuradas ou logo após uma escrita do usuário, lê do primário"""
+    return not REPLICA_URLS or primary_token_valid(request.cookies.get(READ_PRIMARY_COOKIE), user.id)
+
+def get_read_db(
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sessão para endpoints somente leitura: réplica quando disponível.
+
+    Reaproveita a sessão do primário (a mesma de get_current_user) quando não há réplica
+    ou o usuário escreveu há pouco (read-your-writes); assim não abre uma segunda conexão.
+    """
+    if _read_from_primary(request, current_user):
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+async def get_async_read_db(
+    request: Request,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Versão assíncrona de get_read_db"""
+    if _read_from_primary(request, current_user):
+        yield db
+        return
+    async with AsyncReadSessionLocal() as read_db:
+        yield read_db
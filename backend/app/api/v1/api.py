@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, healthcare, maintenance, dashboard, families, telegram, finance, system
+from app.api.v1.endpoints import auth, users, healthcare, maintenance, dashboard, families, telegram, finance, system, sync
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(maintenance.router, prefix="/maintenance", tags=["main
 api_router.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
 api_router.include_router(finance.router, prefix="/finance", tags=["finance"])
 api_router.include_router(system.router, prefix="/system", tags=["system"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
@@ -1,13 +1,18 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
-from app.db.base import get_db
+from app.core.rate_limit import client_ip, enforce
+from app.core.refresh_tokens import issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+from app.core.security import create_access_token, verify_password_async, get_password_hash_async
+from app.db.base import get_async_db, get_db
+from app.db.writes import insert_returning
 from app.models.user import User, Profile
 from app.models.family import Family
-from app.schemas.token import Token
+from app.schemas.token import RefreshRequest, Token
 from app.schemas.user import UserCreate, User as UserSchema
 import secrets
 import string
@@ -15,15 +20,32 @@ import string
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+def _token_response(user_id: int, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": str(user_id)}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """Login e geração de token JWT"""
+    # Antes de qualquer consulta ou bcrypt
+    await enforce("login-ip", settings.RATE_LIMIT_LOGIN_PER_IP, client_ip(request))
+    await enforce("login-username", settings.RATE_LIMIT_LOGIN_PER_USERNAME, form_data.username.strip().lower())
     user = db.query(User).filter(User.username == form_data.username).first()
     
-    if not user or not verify_password(form_data.password, user.password):
+    valid, new_hash = await verify_password_async(form_data.password, user.password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário ou senha incorretos",
@@ -36,19 +58,24 @@ async def login(
             detail="Usuário inativo"
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    if new_hash:
+        # Hash com custo diferente de BCRYPT_ROUNDS: refeito agora que temos a senha em claro.
+        # UPDATE direto: é a mesma senha, não muda auth_version (app/core/principals.py) nem revoga sessões
+        db.execute(update(User).where(User.id == user.id).values(password=new_hash))
+    
+    refresh_token = issue_refresh_token(db, user.id, user.auth_version or 0)
+    db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _token_response(user.id, refresh_token)
 
 @router.post("/register", response_model=Token)
 async def register(
+    request: Request,
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ):
     """Registro de novo usuário"""
+    await enforce("register-ip", settings.RATE_LIMIT_REGISTER_PER_IP, client_ip(request))
     
     # Verificar se usuário já existe
     if db.query(User).filter(User.username == user_data.username).first():
@@ -84,31 +111,47 @@ async def register(
         family_id = family.id
     
     # Criar novo usuário
-    user = User(
-        username=user_data.username,
-        email=user_data.email,
-        password=get_password_hash(user_data.password),
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        is_active=True,
-        is_staff=False,
-        is_superuser=False,
-        family_id=family_id
-    )
-    
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = insert_returning(db, User, {
+        "username": user_data.username,
+        "email": user_data.email,
+        "password": await get_password_hash_async(user_data.password),
+        "first_name": user_data.first_name,
+        "last_name": user_data.last_name,
+        "is_active": True,
+        "is_staff": False,
+        "is_superuser": False,
+        "family_id": family_id,
+    })
     
-    # Criar perfil automaticamente
-    profile = Profile(user_id=user.id)
-    db.add(profile)
+    # Criar perfil automaticamente (mesma transação do usuário)
+    db.execute(insert(Profile).values(user_id=user["id"]))
+    refresh_token = issue_refresh_token(db, user["id"], user["auth_version"])
     db.commit()
     
-    # Gerar token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _token_response(user["id"], refresh_token)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    request: Request,
+    data: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Troca o refresh token por um novo par de tokens (rotação; sem senha)"""
+    await enforce("refresh-ip", settings.RATE_LIMIT_REFRESH_PER_IP, client_ip(request))
+    rotated = await rotate_refresh_token(db, data.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id, refresh_token = rotated
+    return _token_response(user_id, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    data: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Revoga a sessão do refresh token (o access token expira sozinho)"""
+    await revoke_refresh_token(db, data.refresh_token)
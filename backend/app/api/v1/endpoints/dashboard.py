@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-from app.db.base import get_db
+from typing import Optional
+from app.core.cache import cached_response_async
+from app.db.base import get_async_db
 from app.models.user import User
 from app.models.dashboard import DashboardPreference
 from app.models.healthcare import FamilyMember, MedicalAppointment, Medication
@@ -12,52 +14,61 @@ from app.schemas.dashboard import (
     DashboardPreferenceCreate,
     DashboardPreferenceUpdate
 )
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user_async
 
 router = APIRouter()
 
 
 @router.get("/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Obter estatísticas do dashboard em uma única requisição"""
+    # Sessão do primário: o resultado vai para o cache da família (ver finance.get_finance_summary)
     family_id = current_user.family_id
+    return await cached_response_async(
+        "dashboard:stats",
+        [family_id],
+        {"family_id": family_id},
+        lambda: _build_dashboard_stats(db, family_id),
+    )
+
+
+async def _build_dashboard_stats(db: AsyncSession, family_id: Optional[int]) -> dict:
+    """Calcula as estatísticas do dashboard (sem cache)"""
     now = datetime.now(timezone.utc)
     
     # Contar membros da família
-    total_members = db.query(func.count(FamilyMember.id)).filter(
-        FamilyMember.family_id == family_id
-    ).scalar() or 0
+    total_members = await db.scalar(
+        select(func.count(FamilyMember.id)).where(FamilyMember.family_id == family_id)
+    ) or 0
     
-    # Contar consultas futuras (via family_member)
-    total_appointments = db.query(func.count(MedicalAppointment.id)).join(
-        FamilyMember, MedicalAppointment.family_member_id == FamilyMember.id
-    ).filter(
-        FamilyMember.family_id == family_id,
-        MedicalAppointment.appointment_date >= now
-    ).scalar() or 0
+    # Contar consultas futuras (family_id denormalizado: sem JOIN com o membro)
+    total_appointments = await db.scalar(
+        select(func.count(MedicalAppointment.id)).where(
+            MedicalAppointment.family_id == family_id,
+            MedicalAppointment.appointment_date >= now
+        )
+    ) or 0
     
     # Contar equipamentos
-    total_equipment = db.query(func.count(Equipment.id)).filter(
-        Equipment.family_id == family_id
-    ).scalar() or 0
+    total_equipment = await db.scalar(
+        select(func.count(Equipment.id)).where(Equipment.family_id == family_id)
+    ) or 0
     
     # Contar medicações ativas (sem end_date ou com end_date no futuro)
-    active_medications = db.query(func.count(Medication.id)).join(
-        FamilyMember, Medication.family_member_id == FamilyMember.id
-    ).filter(
-        FamilyMember.family_id == family_id,
-        (Medication.end_date == None) | (Medication.end_date >= now.date())
-    ).scalar() or 0
+    active_medications = await db.scalar(
+        select(func.count(Medication.id)).where(
+            Medication.family_id == family_id,
+            (Medication.end_date == None) | (Medication.end_date >= now.date())
+        )
+    ) or 0
     
     # Contar ordens de manutenção
-    total_orders = db.query(func.count(MaintenanceOrder.id)).join(
-        Equipment, MaintenanceOrder.equipment_id == Equipment.id
-    ).filter(
-        Equipment.family_id == family_id
-    ).scalar() or 0
+    total_orders = await db.scalar(
+        select(func.count(MaintenanceOrder.id)).where(MaintenanceOrder.family_id == family_id)
+    ) or 0
     
     return {
         "total_members": total_members,
@@ -69,33 +80,33 @@ async def get_dashboard_stats(
 
 @router.get("/preferences", response_model=DashboardPreferenceSchema)
 async def get_dashboard_preferences(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Obter preferências do dashboard"""
-    preference = db.query(DashboardPreference).filter(
-        DashboardPreference.user_id == current_user.id
-    ).first()
+    preference = await db.scalar(
+        select(DashboardPreference).where(DashboardPreference.user_id == current_user.id)
+    )
     
     if not preference:
         # Criar preferências padrão
         preference = DashboardPreference(user_id=current_user.id)
         db.add(preference)
-        db.commit()
-        db.refresh(preference)
+        await db.commit()
+        await db.refresh(preference)
     
     return preference
 
 @router.put("/preferences", response_model=DashboardPreferenceSchema)
 async def update_dashboard_preferences(
     preference_data: DashboardPreferenceUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Atualizar preferências do dashboard"""
-    preference = db.query(DashboardPreference).filter(
-        DashboardPreference.user_id == current_user.id
-    ).first()
+    preference = await db.scalar(
+        select(DashboardPreference).where(DashboardPreference.user_id == current_user.id)
+    )
     
     if not preference:
         preference = DashboardPreference(user_id=current_user.id)
@@ -105,7 +116,6 @@ async def update_dashboard_preferences(
     for field, value in preference_data.dict(exclude_unset=True).items():
         setattr(preference, field, value)
     
-    db.commit()
-    db.refresh(preference)
+    await db.commit()
+    await db.refresh(preference)
     return preference
-
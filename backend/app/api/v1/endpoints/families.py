@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.base import get_db
+from app.db.writes import insert_returning, update_returning
 from app.models.family import Family
 from app.models.user import User
 from app.models.healthcare import FamilyMember
@@ -44,14 +45,11 @@ async def create_family(
         if not existing:
             break
     
-    new_family = Family(
-        name=family_data.name,
-        codigo_unico=codigo_unico
-    )
-    
-    db.add(new_family)
+    new_family = insert_returning(db, Family, {
+        "name": family_data.name,
+        "codigo_unico": codigo_unico,
+    })
     db.commit()
-    db.refresh(new_family)
     
     return new_family
 
@@ -78,19 +76,18 @@ async def update_family(
     current_user: User = Depends(get_current_admin)
 ):
     """Atualizar família (apenas administradores) - código único não pode ser alterado"""
-    family = db.query(Family).filter(Family.id == family_id).first()
+    # Apenas o nome pode ser alterado - código único é imutável
+    if family_data.name is not None:
+        family = update_returning(db, Family, [Family.id == family_id], {"name": family_data.name})
+    else:
+        family = db.query(Family).filter(Family.id == family_id).first()
     if not family:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Família não encontrada"
         )
     
-    # Apenas o nome pode ser alterado - código único é imutável
-    if family_data.name is not None:
-        family.name = family_data.name
-    
     db.commit()
-    db.refresh(family)
     
     return family
 
@@ -116,6 +113,18 @@ async def delete_family(
             detail=f"Não é possível deletar família com {users_count} usuário(s) associado(s)"
         )
     
+    # Admins com acesso a esta família (N:N) perdem o acesso: invalidar o principal em cache
+    from sqlalchemy import select, update
+    from app.core.principals import bump_auth_version, mark_principal_changed
+    from app.models.user_family import user_families
+
+    admin_ids = db.execute(
+        select(user_families.c.user_id).where(user_families.c.family_id == family_id)
+    ).scalars().all()
+    if admin_ids:
+        db.execute(update(User).where(User.id.in_(admin_ids)).values(**bump_auth_version()))
+        mark_principal_changed(db, admin_ids)
+    
     db.delete(family)
     db.commit()
     
@@ -1,20 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Request, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, insert
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
 from app.db.base import get_db
+from app.core.cache import cached_response
+from app.core.config import settings
+from app.db.sync_log import record_changes
+from app.db.writes import column_values, insert_returning, update_returning
+from app.utils.category_usage import USAGE_FIELDS, category_usage_stats, record_entry_usage
+from app.utils.conditional_get import collection_state, conditional_response
+from app.utils.fast_json import fast_json_response, schema_rows, schema_select
+from app.utils.sparse_fields import FIELDS_QUERY, FieldSet
 from app.models.user import User
-from app.models.finance import FinanceCategory, FinanceEntry, FinanceRecurrence
+from app.models.finance import FinanceCategory, FinanceEntry, FinanceRecurrence, FinanceCategoryUsage
 from app.schemas.finance import (
     FinanceCategory as CategorySchema, FinanceCategoryCreate, FinanceCategoryUpdate,
     FinanceEntry as EntrySchema, FinanceEntryCreate, FinanceEntryUpdate,
     FinanceRecurrence as RecurrenceSchema, FinanceRecurrenceCreate, FinanceRecurrenceUpdate,
     FinanceSummary
 )
-from app.api.deps import get_current_user, get_current_family
+from app.api.deps import get_current_user, get_tenant_scope, get_read_db
+from app.db.tenancy import TenantScope
 from app.utils.ai_vision import analyze_receipt
 from app.utils.category_matching import find_best_matching_category
 from app.utils.installments import (
@@ -27,60 +36,90 @@ from app.utils.receipt_dates import resolve_receipt_date
 
 router = APIRouter()
 
+# Campos aceitos em ?fields= (app/utils/sparse_fields.py)
+ENTRY_FIELDS = FieldSet(EntrySchema, exclude=("category",))
+RECURRENCE_FIELDS = FieldSet(RecurrenceSchema, exclude=("category",))
+
 # ----- CATEGORIES -----
 
+def _attach_category(db: Session, row: Optional[dict]) -> Optional[dict]:
+    """Anexa a categoria ao registro devolvido pelo RETURNING (busca leve por PK)"""
+    if isinstance(row, dict) and row.get("category_id"):
+        row["category"] = db.get(FinanceCategory, row["category_id"])
+    return row
+
+
 @router.get("/categories", response_model=List[CategorySchema])
 async def list_categories(
+    order: str = Query("name", pattern="^(name|usage)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
-    """Lista as categorias da família"""
-    from app.api.deps import get_user_family_ids
-    
-    query = db.query(FinanceCategory).filter(FinanceCategory.is_active == True)
+    """Lista as categorias da família com estatísticas de uso.
     
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        query = query.filter(FinanceCategory.family_id.in_(family_ids))
-    elif family_id:
-        query = query.filter(FinanceCategory.family_id == family_id)
+    order=name (padrão) ordena alfabeticamente; order=usage ordena pelas mais usadas
+    (contagem de lançamentos e último uso).
+    """
+    family_filter = scope.where(FinanceCategory)
+    usage_filter = scope.where(FinanceCategoryUsage)
+    return cached_response(
+        "finance:categories",
+        scope.family_ids,
+        {"order": order, "today": date.today()},
+        lambda: _list_categories_with_usage(db, family_filter, usage_filter, order),
+    )
+
+
+def _list_categories_with_usage(db: Session, family_filter, usage_filter, order: str) -> list[CategorySchema]:
+    """Consulta as categorias com as estatísticas de uso agregadas (sem cache)"""
+    usage = category_usage_stats(usage_filter)
+    usage_count = func.coalesce(usage.c.usage_count, 0)
+    query = (
+        db.query(
+            FinanceCategory,
+            usage_count,
+            usage.c.last_used_date,
+            func.coalesce(usage.c.total_30d, 0),
+            func.coalesce(usage.c.total_90d, 0),
+        )
+        .outerjoin(usage, usage.c.category_id == FinanceCategory.id)
+        .filter(FinanceCategory.is_active == True, family_filter)
+    )
+
+    if order == "usage":
+        query = query.order_by(usage_count.desc(), usage.c.last_used_date.desc().nulls_last(), FinanceCategory.name)
     else:
-        return []
+        query = query.order_by(FinanceCategory.name)
 
-    return query.order_by(FinanceCategory.name).all()
+    categories = []
+    for category, count, last_used, total_30d, total_90d in query.all():
+        category.usage_count = count
+        category.last_used_date = last_used
+        category.total_30d = total_30d
+        category.total_90d = total_90d
+        categories.append(CategorySchema.model_validate(category))
+    return categories
 
 @router.post("/categories", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
 async def create_category(
     category_data: FinanceCategoryCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Cria uma nova categoria"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
 
     try:
         dump = category_data.model_dump()
         now = datetime.now()
-        category = FinanceCategory(
+        category = insert_returning(db, FinanceCategory, {
             **dump,
-            family_id=family_id,
-            created_by_id=current_user.id,
-            created_at=now
-        )
-        db.add(category)
+            "family_id": family_id,
+            "created_by_id": current_user.id,
+            "created_at": now,
+        })
         db.commit()
-        db.refresh(category)
         return category
     except Exception as e:
         db.rollback()
@@ -93,44 +132,33 @@ async def update_category(
     category_id: int,
     category_data: FinanceCategoryUpdate,
     db: Session = Depends(get_db),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualiza uma categoria"""
-    category = db.query(FinanceCategory).filter(
-        FinanceCategory.id == category_id
-    )
+    criteria = scope.owns(FinanceCategory, category_id)
     
-    # Se não for superuser, filtrar pela família
-    if family_id:
-        category = category.filter(FinanceCategory.family_id == family_id)
-        
-    category = category.first()
+    update_data = column_values(FinanceCategory, category_data.model_dump(exclude_unset=True))
+    if update_data:
+        category = update_returning(db, FinanceCategory, criteria, update_data)
+    else:
+        category = db.query(FinanceCategory).filter(*criteria).first()
     
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
     
-    update_data = category_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(category, key, value)
-    
+    # Os lançamentos que embutem a categoria não são reescritos: o ETag da listagem inclui o
+    # updated_at das categorias e o /sync informa a categoria alterada
     db.commit()
-    db.refresh(category)
     return category
 
 @router.delete("/categories/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Exclui uma categoria"""
-    query = db.query(FinanceCategory).filter(FinanceCategory.id == category_id)
-    
-    if family_id:
-        query = query.filter(FinanceCategory.family_id == family_id)
-        
-    category = query.first()
+    category = db.query(FinanceCategory).filter(*scope.owns(FinanceCategory, category_id)).first()
     
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
@@ -143,90 +171,116 @@ async def delete_category(
 
 @router.get("/entries", response_model=List[EntrySchema])
 async def list_entries(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     category_id: Optional[int] = None,
     type: Optional[str] = None,
     is_paid: Optional[bool] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
-    """Lista os lançamentos com filtros"""
-    from app.api.deps import get_user_family_ids
-    
-    query = db.query(FinanceEntry).options(joinedload(FinanceEntry.category))
-    
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        query = query.filter(FinanceEntry.family_id.in_(family_ids))
-    elif family_id:
-        query = query.filter(FinanceEntry.family_id == family_id)
-    else:
-        return []
+    """Lista os lançamentos com filtros (réplica de leitura, se configurada)"""
+    selected = ENTRY_FIELDS.parse(fields)
+    
+    # GET condicional: responde 304 antes de carregar os lançamentos
+    state = collection_state(
+        db,
+        scope.family_ids,
+        (FinanceEntry, [scope.where(FinanceEntry)]),
+        (FinanceCategory, [scope.where(FinanceCategory)]),  # Categoria embutida nos lançamentos
+    )
+    not_modified = conditional_response(request, response, state)
+    if not_modified:
+        return not_modified
     
+    filters = [scope.where(FinanceEntry)]
     if start_date:
-        query = query.filter(FinanceEntry.date >= start_date)
+        filters.append(FinanceEntry.date >= start_date)
     if end_date:
-        query = query.filter(FinanceEntry.date <= end_date)
+        filters.append(FinanceEntry.date <= end_date)
     if category_id:
-        query = query.filter(FinanceEntry.category_id == category_id)
+        filters.append(FinanceEntry.category_id == category_id)
     if type:
-        query = query.filter(FinanceEntry.type == type)
+        filters.append(FinanceEntry.type == type)
     if is_paid is not None:
-        query = query.filter(FinanceEntry.is_paid == is_paid)
+        filters.append(FinanceEntry.is_paid == is_paid)
+    order_by = (FinanceEntry.date.desc(), FinanceEntry.created_at.desc())
+    
+    if settings.FAST_LIST_RESPONSES or selected:
+        return fast_json_response(_fast_entries(db, filters, order_by, selected), response)
         
-    entries = query.order_by(FinanceEntry.date.desc(), FinanceEntry.created_at.desc()).all()
+    entries = db.query(FinanceEntry).options(joinedload(FinanceEntry.category)).filter(*filters).order_by(*order_by).all()
     
     # Strip base64 content to save drastic bandwidth on massive lists
-    import json
     for entry in entries:
         if entry.documents:
             try:
                 db.expunge(entry)
-                docs = json.loads(entry.documents)
-                for d in docs:
-                    if 'content' in d:
-                        d['content'] = "" 
-                entry.documents = json.dumps(docs)
+                entry.documents = _strip_document_contents(entry.documents)
             except Exception:
                 pass
                 
     return entries
 
+
+def _strip_document_contents(documents: str) -> str:
+    """Documentos sem o conteúdo base64 (a listagem só mostra nome e tipo)"""
+    import json
+    docs = json.loads(documents)
+    for d in docs:
+        if 'content' in d:
+            d['content'] = ""
+    return json.dumps(docs)
+
+
+def _fast_entries(db: Session, filters: list, order_by: tuple, fields: Optional[tuple] = None) -> List[dict]:
+    """Lançamentos como dicts (app/utils/fast_json.py); as categorias vêm numa consulta à parte.
+    Com `fields` (sparse fieldset), só as colunas pedidas e sem a categoria embutida."""
+    statement = schema_select(FinanceEntry, EntrySchema, fields=fields).where(*filters).order_by(*order_by)
+    entries = schema_rows(db, statement, EntrySchema, fields=fields)
+    
+    categories = {}
+    category_ids = {entry["category_id"] for entry in entries if entry["category_id"]} if fields is None else ()
+    if category_ids:
+        for category in db.query(FinanceCategory).filter(FinanceCategory.id.in_(category_ids)):
+            categories[category.id] = CategorySchema.model_validate(category).model_dump(mode="json")
+    
+    for entry in entries:
+        if fields is None:
+            entry["category"] = categories.get(entry["category_id"])
+        if entry.get("documents"):
+            try:
+                entry["documents"] = _strip_document_contents(entry["documents"])
+            except Exception:
+                pass
+    return entries
+
 @router.post("/entries", response_model=EntrySchema, status_code=status.HTTP_201_CREATED)
 async def create_entry(
     entry_data: FinanceEntryCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Cria um novo lançamento"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
 
     try:
         dump = entry_data.model_dump()
         now = datetime.now()
-        entry = FinanceEntry(
+        entry = insert_returning(db, FinanceEntry, {
             **dump,
-            family_id=family_id,
-            created_by_id=current_user.id,
-            created_at=now,
-            updated_at=now
-        )
-        db.add(entry)
+            "family_id": family_id,
+            "created_by_id": current_user.id,
+            "created_at": now,
+            "updated_at": now,
+        })
+        record_entry_usage(db, [(None, entry)])
         db.commit()
-        db.refresh(entry)
-        return entry
+        return _attach_category(db, entry)
     except Exception as e:
         db.rollback()
         import logging
@@ -238,46 +292,45 @@ async def update_entry(
     entry_id: int,
     entry_data: FinanceEntryUpdate,
     db: Session = Depends(get_db),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualiza um lançamento"""
-    query = db.query(FinanceEntry).filter(FinanceEntry.id == entry_id)
+    criteria = scope.owns(FinanceEntry, entry_id)
     
-    if family_id:
-        query = query.filter(FinanceEntry.family_id == family_id)
-        
-    entry = query.first()
+    update_data = column_values(FinanceEntry, entry_data.model_dump(exclude_unset=True))
+    update_data['updated_at'] = datetime.now()
+    
+    # Estado anterior (só os campos das estatísticas de uso) para calcular o delta
+    old_usage = None
+    if any(field in update_data for field in USAGE_FIELDS):
+        old_usage = db.query(
+            *(getattr(FinanceEntry, field) for field in USAGE_FIELDS)
+        ).filter(*criteria).with_for_update().first()
+    
+    entry = update_returning(db, FinanceEntry, criteria, update_data)
     
     if not entry:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
     
-    update_data = entry_data.model_dump(exclude_unset=True)
-    update_data['updated_at'] = datetime.now()
-    for key, value in update_data.items():
-        setattr(entry, key, value)
+    if old_usage is not None:
+        record_entry_usage(db, [(old_usage._asdict(), entry)])
         
     db.commit()
-    db.refresh(entry)
-    return entry
+    return _attach_category(db, entry)
 
 @router.delete("/entries/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_entry(
     entry_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Exclui um lançamento"""
-    query = db.query(FinanceEntry).filter(FinanceEntry.id == entry_id)
-    
-    if family_id:
-        query = query.filter(FinanceEntry.family_id == family_id)
-        
-    entry = query.first()
+    entry = db.query(FinanceEntry).filter(*scope.owns(FinanceEntry, entry_id)).first()
     
     if not entry:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
     
+    record_entry_usage(db, [(entry, None)])
     db.delete(entry)
     db.commit()
     return None
@@ -286,14 +339,10 @@ async def delete_entry(
 async def get_receipt(
     entry_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Retorna o arquivo do comprovante em formato original"""
-    query = db.query(FinanceEntry).filter(FinanceEntry.id == entry_id)
-    if family_id:
-        query = query.filter(FinanceEntry.family_id == family_id)
-    entry = query.first()
+    entry = db.query(FinanceEntry).filter(*scope.owns(FinanceEntry, entry_id)).first()
     
     if not entry or not entry.documents:
         raise HTTPException(status_code=404, detail="Comprovante não encontrado")
@@ -319,23 +368,14 @@ async def upload_receipt(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """
     Recebe um comprovante (imagem ou PDF), usa IA para extrair dados 
     e cadastra a despesa automaticamente.
     """
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]
-    elif family_id is None:
-        raise HTTPException(status_code=400, detail="Família não identificada.")
-        
+    family_id = scope.require_family()
+    
     import time
     import logging
     logger = logging.getLogger(__name__)
@@ -429,6 +469,7 @@ async def upload_receipt(
     import json
     from io import BytesIO
     from PIL import Image
+    from app.core.metrics import IMAGE_PROCESSING
     
     t2 = time.time()
     
@@ -437,31 +478,32 @@ async def upload_receipt(
     final_mime_type = file.content_type or "image/jpeg"
     
     if file.content_type and file.content_type.startswith("image/"):
-        try:
-            img = Image.open(BytesIO(contents))
+        with IMAGE_PROCESSING.time(operation="receipt_compress"):
+            try:
+                img = Image.open(BytesIO(contents))
             
-            # Converter RGBA para RGB se necessário (para salvar como JPEG)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
+                # Converter RGBA para RGB se necessário (para salvar como JPEG)
+                if img.mode in ('RGBA', 'P'):
+                    img = img.convert('RGB')
             
-            # Redimensionar se muito grande (max 1200px de largura)
-            max_width = 1200
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_size = (max_width, int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
+                # Redimensionar se muito grande (max 1200px de largura)
+                max_width = 1200
+                if img.width > max_width:
+                    ratio = max_width / img.width
+                    new_size = (max_width, int(img.height * ratio))
+                    img = img.resize(new_size, Image.Resampling.LANCZOS)
             
-            # Comprimir como JPEG com 85% de qualidade
-            output = BytesIO()
-            img.save(output, format='JPEG', quality=85, optimize=True)
-            compressed_contents = output.getvalue()
-            final_mime_type = "image/jpeg"
+                # Comprimir como JPEG com 85% de qualidade
+                output = BytesIO()
+                img.save(output, format='JPEG', quality=85, optimize=True)
+                compressed_contents = output.getvalue()
+                final_mime_type = "image/jpeg"
             
-            original_size = len(contents)
-            compressed_size = len(compressed_contents)
-            logger.info(f"[RECEIPT] Imagem comprimida: {original_size} -> {compressed_size} bytes ({100*compressed_size/original_size:.0f}%)")
-        except Exception as e:
-            logger.warning(f"[RECEIPT] Falha ao comprimir imagem: {e}, usando original")
+                original_size = len(contents)
+                compressed_size = len(compressed_contents)
+                logger.info(f"[RECEIPT] Imagem comprimida: {original_size} -> {compressed_size} bytes ({100*compressed_size/original_size:.0f}%)")
+            except Exception as e:
+                logger.warning(f"[RECEIPT] Falha ao comprimir imagem: {e}, usando original")
     
     b64_str = base64.b64encode(compressed_contents).decode('utf-8')
     # O sistema usa um array de docs [ { "name": "...", "content": "base64..." } ]
@@ -475,134 +517,112 @@ async def upload_receipt(
     documents_json = json.dumps([doc_obj])
     logger.info(f"[RECEIPT] Base64 preparado: {len(documents_json)} chars em {time.time()-t2:.2f}s")
         
-    created_entries: list[FinanceEntry] = []
+    entry_rows: list[dict] = []
     now = datetime.now()
     for index, installment_entry in enumerate(installment_entries):
         notes = None
         if total_installments > 1 and index > 0:
             notes = f"Gerado automaticamente a partir de comprovante parcelado ({current_installment}/{total_installments})."
 
-        entry = FinanceEntry(
-            description=installment_entry["description"],
-            amount=installment_entry["amount"],
-            date=installment_entry["date"],
-            type='EXPENSE',
-            category_id=category.id,
-            family_id=family_id,
-            created_by_id=current_user.id,
-            created_at=now,
-            updated_at=now,
-            is_paid=installment_entry["is_paid"],
-            notes=notes,
-            documents=documents_json if index == 0 else None
-        )
-        db.add(entry)
-        created_entries.append(entry)
+        entry_rows.append({
+            "description": installment_entry["description"],
+            "amount": installment_entry["amount"],
+            "date": installment_entry["date"],
+            "type": 'EXPENSE',
+            "category_id": category.id,
+            "family_id": family_id,
+            "created_by_id": current_user.id,
+            "created_at": now,
+            "updated_at": now,
+            "is_paid": installment_entry["is_paid"],
+            "notes": notes,
+            "documents": documents_json if index == 0 else None,
+        })
 
     t3 = time.time()
+    # Primeira parcela com RETURNING (sem devolver o comprovante em base64); demais em lote
+    created_entry = insert_returning(db, FinanceEntry, entry_rows[0])
+    if len(entry_rows) > 1:
+        installment_ids = db.scalars(insert(FinanceEntry).returning(FinanceEntry.id), entry_rows[1:]).all()
+        record_changes(db, FinanceEntry, installment_ids, family_id)
+    record_entry_usage(db, [(None, row) for row in entry_rows])
     db.commit()
     logger.info(f"[RECEIPT] Commit em {time.time()-t3:.2f}s")
-    
-    t4 = time.time()
-    db.refresh(created_entries[0])
-    logger.info(f"[RECEIPT] Refresh em {time.time()-t4:.2f}s")
     logger.info(f"[RECEIPT] TOTAL: {time.time()-t0:.2f}s")
 
-    return created_entries[0]
+    return _attach_category(db, created_entry)
 
 # ----- RECURRENCES -----
 
 @router.get("/recurrences", response_model=List[RecurrenceSchema])
 async def list_recurrences(
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Lista as recorrências ativas"""
-    from app.api.deps import get_user_family_ids
-    
-    query = db.query(FinanceRecurrence).options(joinedload(FinanceRecurrence.category))
-    
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        query = query.filter(FinanceRecurrence.family_id.in_(family_ids))
-    elif family_id:
-        query = query.filter(FinanceRecurrence.family_id == family_id)
-    else:
-        return []
-        
-    return query.all()
+    selected = RECURRENCE_FIELDS.parse(fields)
+    if selected:
+        statement = schema_select(FinanceRecurrence, RecurrenceSchema, fields=selected).where(
+            scope.where(FinanceRecurrence)
+        )
+        return fast_json_response(schema_rows(db, statement, RecurrenceSchema, fields=selected))
+    return (
+        db.query(FinanceRecurrence)
+        .options(joinedload(FinanceRecurrence.category))
+        .filter(scope.where(FinanceRecurrence))
+        .all()
+    )
 
 @router.post("/recurrences", response_model=RecurrenceSchema, status_code=status.HTTP_201_CREATED)
 async def create_recurrence(
     recurrence_data: FinanceRecurrenceCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Cria uma nova configuração de recorrência"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-
-    recurrence = FinanceRecurrence(
+    family_id = scope.require_family()
+
+    recurrence = insert_returning(db, FinanceRecurrence, {
         **recurrence_data.model_dump(),
-        family_id=family_id,
-        created_by_id=current_user.id,
-        created_at=datetime.now()
-    )
-    db.add(recurrence)
+        "family_id": family_id,
+        "created_by_id": current_user.id,
+        "created_at": datetime.now(),
+    })
     db.commit()
-    db.refresh(recurrence)
-    return recurrence
+    return _attach_category(db, recurrence)
 
 @router.put("/recurrences/{recurrence_id}", response_model=RecurrenceSchema)
 async def update_recurrence(
     recurrence_id: int,
     recurrence_data: FinanceRecurrenceUpdate,
     db: Session = Depends(get_db),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualiza uma recorrência"""
-    query = db.query(FinanceRecurrence).filter(FinanceRecurrence.id == recurrence_id)
+    criteria = scope.owns(FinanceRecurrence, recurrence_id)
     
-    if family_id:
-        query = query.filter(FinanceRecurrence.family_id == family_id)
-        
-    recurrence = query.first()
+    update_data = column_values(FinanceRecurrence, recurrence_data.model_dump(exclude_unset=True))
+    if update_data:
+        recurrence = update_returning(db, FinanceRecurrence, criteria, update_data)
+    else:
+        recurrence = db.query(FinanceRecurrence).filter(*criteria).first()
     
     if not recurrence:
         raise HTTPException(status_code=404, detail="Recorrência não encontrada")
-    
-    update_data = recurrence_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(recurrence, key, value)
         
     db.commit()
-    db.refresh(recurrence)
-    return recurrence
+    return _attach_category(db, recurrence)
 
 @router.delete("/recurrences/{recurrence_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_recurrence(
     recurrence_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Exclui uma recorrência"""
-    query = db.query(FinanceRecurrence).filter(FinanceRecurrence.id == recurrence_id)
-    
-    if family_id:
-        query = query.filter(FinanceRecurrence.family_id == family_id)
-        
-    recurrence = query.first()
+    recurrence = db.query(FinanceRecurrence).filter(*scope.owns(FinanceRecurrence, recurrence_id)).first()
     
     if not recurrence:
         raise HTTPException(status_code=404, detail="Recorrência não encontrada")
@@ -619,19 +639,27 @@ async def get_finance_summary(
     year: int = Query(default=datetime.now().year),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
-    """Obtém o resumo financeiro do mês"""
-    from app.api.deps import get_user_family_ids
-    
-    # Resolver family_ids para o filtro
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        f_ids = get_user_family_ids(current_user, db)
-    elif family_id:
-        f_ids = [family_id]
-    else:
-        f_ids = []
+    """Obtém o resumo financeiro do mês.
+
+    Calculado no primário, não na réplica: o resultado fica no cache sob a versão atual
+    da família, e um valor defasado da réplica seria servido também a quem acabou de escrever.
+    """
+    f_ids = list(scope.family_ids)
+
+    return cached_response(
+        "finance:summary",
+        f_ids,
+        {"year": year, "month": month},
+        lambda: _build_finance_summary(db, current_user, f_ids, year, month),
+    )
+
 
+def _build_finance_summary(
+    db: Session, current_user: User, f_ids: list[int], year: int, month: Optional[int]
+) -> dict:
+    """Calcula o resumo financeiro (sem cache)"""
     # Opcional: Gerar recorrências automaticamente para o mês visualizado
     now_dt = datetime.now()
     if f_ids:
@@ -645,6 +673,7 @@ async def get_finance_summary(
                 )
                 recurrences = query_rec.all()
                 month_start = date(year, month, 1)
+                generated_entries = []
                 
                 for rec in recurrences:
                     # Verificar se o mês visualizado está dentro da vigência da recorrência
@@ -689,8 +718,10 @@ async def get_finance_summary(
                             updated_at=now_dt
                         )
                         db.add(entry)
+                        generated_entries.append(entry)
                         # Atualizar a data de última geração para fins de auditoria/histórico
                         rec.last_generated_date = now_dt.date()
+                record_entry_usage(db, [(None, entry) for entry in generated_entries])
                 db.commit()
             except Exception as e:
                 db.rollback()
@@ -836,7 +867,7 @@ async def generate_monthly_recurrences(
     year: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Gera lançamentos para um mês específico ou para o ano inteiro"""
     today = date.today()
@@ -848,22 +879,12 @@ async def generate_monthly_recurrences(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     
-    query = db.query(FinanceRecurrence).filter(
-        FinanceRecurrence.is_active == True
-    )
-    
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        from app.api.deps import get_user_family_ids
-        family_ids = get_user_family_ids(current_user, db)
-        query = query.filter(FinanceRecurrence.family_id.in_(family_ids))
-    elif family_id:
-        query = query.filter(FinanceRecurrence.family_id == family_id)
-    else:
-        return {"message": "Nenhuma família especificada."}
-        
-    recurrences = query.all()
+    recurrences = db.query(FinanceRecurrence).filter(
+        FinanceRecurrence.is_active == True,
+        scope.where(FinanceRecurrence)
+    ).all()
     
-    generated_count = 0
+    generated_entries = []
 
     for m in months_to_process:
         for rec in recurrences:
@@ -910,7 +931,8 @@ async def generate_monthly_recurrences(
             )
             db.add(entry)
             rec.last_generated_date = today
-            generated_count += 1
+            generated_entries.append(entry)
         
+    record_entry_usage(db, [(None, entry) for entry in generated_entries])
     db.commit()
-    return {"message": f"Gerados {generated_count} lançamentos recorrentes."}
+    return {"message": f"Gerados {len(generated_entries)} lançamentos recorrentes."}
@@ -1,15 +1,19 @@
 import base64
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import func
 from sqlalchemy.orm import Session, defer
 from typing import List, Optional
 from datetime import datetime, timezone
+from app.core.config import settings
 from app.db.base import get_db
+from app.db.writes import column_values, insert_returning, update_returning
+from app.utils.conditional_get import collection_state, conditional_response
+from app.utils.fast_json import fast_json_response, schema_rows, schema_select
+from app.utils.sparse_fields import FIELDS_QUERY, FieldSet
 
 logger = logging.getLogger(__name__)
-from app.models.user import User
 from app.models.healthcare import FamilyMember, MedicalAppointment, MedicalProcedure, Medication
 from app.schemas.healthcare import (
     FamilyMember as FamilyMemberSchema, 
@@ -22,29 +26,26 @@ from app.schemas.healthcare import (
     Medication as MedicationSchema,
     MedicationCreate, MedicationUpdate
 )
-from app.api.deps import get_current_user, get_current_family
+from app.api.deps import get_tenant_scope
+from app.db.tenancy import TenantScope
 
 router = APIRouter()
 
+# Campos aceitos em ?fields= (app/utils/sparse_fields.py); a foto só na listagem completa (thumbnail)
+MEMBER_FIELDS = FieldSet(FamilyMemberSchema, exclude=("photo",))
+APPOINTMENT_FIELDS = FieldSet(MedicalAppointmentSchema)
+PROCEDURE_FIELDS = FieldSet(MedicalProcedureSchema)
+MEDICATION_FIELDS = FieldSet(MedicationSchema)
+
 # ===== FAMILY MEMBERS =====
 @router.post("/members", response_model=FamilyMemberSchema, status_code=status.HTTP_201_CREATED)
 async def create_family_member(
     member_data: FamilyMemberCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar novo membro da família (compartilhado entre todos os usuários da mesma família)"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     member_data_dict = member_data.model_dump(exclude_none=False)
     member_data_dict['family_id'] = family_id
@@ -59,11 +60,8 @@ async def create_family_member(
     member_data_dict['created_at'] = now
     member_data_dict['updated_at'] = now
     
-    member = FamilyMember(**member_data_dict)
-    
-    db.add(member)
+    member = insert_returning(db, FamilyMember, member_data_dict)
     db.commit()
-    db.refresh(member)
     return member
 
 def _member_photo_for_list(photo_raw) -> Optional[str]:
@@ -79,28 +77,36 @@ def _member_photo_for_list(photo_raw) -> Optional[str]:
 
 @router.get("/members", response_model=List[FamilyMemberSchema])
 async def list_family_members(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family),
+    scope: TenantScope = Depends(get_tenant_scope),
     include_photos: bool = True,
     photo_thumb: bool = True,
+    fields: Optional[str] = FIELDS_QUERY,
 ):
     """Listar todos os membros da família (compartilhados entre usuários da mesma família) ordenados por 'order' e depois nome.
     Use include_photos=false para carregamento mais rápido (sem fotos).
     Com include_photos=true, photo_thumb=true (padrão) retorna fotos redimensionadas para listagem (melhor em mobile)."""
-    from app.api.deps import get_user_family_ids
     from app.utils.image import resize_photo_base64
 
+    selected = MEMBER_FIELDS.parse(fields)
     try:
-        if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-            family_ids = get_user_family_ids(current_user, db)
-            if not family_ids:
-                return []
-            query = db.query(FamilyMember).filter(FamilyMember.family_id.in_(family_ids))
-        else:
-            if family_id is None:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-            query = db.query(FamilyMember).filter(FamilyMember.family_id == family_id)
+        if scope.empty:
+            return []
+        query = db.query(FamilyMember).filter(scope.where(FamilyMember))
+
+        # GET condicional: responde 304 antes de carregar os membros (e as fotos)
+        state = collection_state(db, scope.family_ids, (FamilyMember, [scope.where(FamilyMember)]))
+        not_modified = conditional_response(request, response, state)
+        if not_modified:
+            return not_modified
+
+        if selected:
+            statement = schema_select(FamilyMember, FamilyMemberSchema, fields=selected).where(
+                scope.where(FamilyMember)
+            ).order_by(FamilyMember.order, FamilyMember.name)
+            return fast_json_response(schema_rows(db, statement, FamilyMemberSchema, fields=selected), response)
 
         if not include_photos:
             query = query.options(defer(FamilyMember.photo))
@@ -176,32 +182,10 @@ async def list_family_members(
 async def get_family_member(
     member_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Obter detalhes de um membro da família"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o membro pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Membro da família não encontrado"
-            )
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    member = db.query(FamilyMember).filter(*scope.owns(FamilyMember, member_id)).first()
     
     if not member:
         raise HTTPException(
@@ -216,28 +200,15 @@ async def get_family_member(
 async def reorder_family_members(
     order_data: List[FamilyMemberOrderItem],
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar a ordem de exibição dos membros da família"""
-    from app.api.deps import get_user_family_ids
-    
     try:
-        # Se for admin sem family_id especificado, buscar de todas as famílias que tem acesso
-        if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-            family_ids = get_user_family_ids(current_user, db)
-            if not family_ids:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        else:
-            if family_id is None:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-            family_ids = [family_id]
+        if scope.empty:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
         
         for item in order_data:
-            member = db.query(FamilyMember).filter(
-                FamilyMember.id == item.id,
-                FamilyMember.family_id.in_(family_ids)
-            ).first()
+            member = db.query(FamilyMember).filter(*scope.owns(FamilyMember, item.id)).first()
             if member:
                 member.order = item.order
         
@@ -255,34 +226,19 @@ async def update_family_member(
     member_id: int,
     member_data: FamilyMemberUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar membro da família"""
-    import logging
-    from app.api.deps import get_user_family_ids
-    logger = logging.getLogger("uvicorn")
-    
-    # Se for admin sem family_id especificado, verificar se o membro pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Membro da família não encontrado"
-            )
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    update_dict = column_values(FamilyMember, member_data.model_dump(exclude_unset=True))
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        # Log especial para foto (não mostrar a string inteira pois é muito grande)
+        log_dict = update_dict.copy()
+        if 'photo' in log_dict and log_dict['photo']:
+            log_dict['photo'] = f"<base64 string com {len(log_dict['photo'])} caracteres>"
+        logger.debug("Atualizando membro %s com dados: %s", member_id, log_dict)
+    
+    member = update_returning(db, FamilyMember, scope.owns(FamilyMember, member_id), update_dict)
     
     if not member:
         raise HTTPException(
@@ -290,56 +246,18 @@ async def update_family_member(
             detail="Membro da família não encontrado"
         )
     
-    update_dict = member_data.model_dump(exclude_unset=True)
-    
-    # Log especial para foto (não mostrar a string inteira pois é muito grande)
-    log_dict = update_dict.copy()
-    if 'photo' in log_dict and log_dict['photo']:
-        log_dict['photo'] = f"<base64 string com {len(log_dict['photo'])} caracteres>"
-    logger.info(f"🔄 Atualizando membro {member_id} com dados: {log_dict}")
-    
-    for field, value in update_dict.items():
-        if field == 'photo' and value:
-            logger.info(f"   ➡️ Setando {field} = <base64 string com {len(value)} caracteres>")
-        else:
-            logger.info(f"   ➡️ Setando {field} = {value} (tipo: {type(value)})")
-        setattr(member, field, value)
-    
     db.commit()
-    db.refresh(member)
-    logger.info(f"✅ Membro atualizado - ID={member.id}, name={member.name}, order={member.order}")
+    logger.debug("Membro atualizado - ID=%s, order=%s", member['id'], member['order'])
     return member
 
 @router.delete("/members/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_family_member(
     member_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir membro da família"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o membro pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Membro da família não encontrado"
-            )
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        member = db.query(FamilyMember).filter(
-            FamilyMember.id == member_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    member = db.query(FamilyMember).filter(*scope.owns(FamilyMember, member_id)).first()
     
     if not member:
         raise HTTPException(
@@ -355,20 +273,10 @@ async def delete_family_member(
 async def create_appointment(
     appointment_data: MedicalAppointmentCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar nova consulta médica"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     # Verificar se o membro existe e pertence à família do usuário
     member = db.query(FamilyMember).filter(
@@ -382,14 +290,7 @@ async def create_appointment(
             detail="Membro da família não encontrado"
         )
     
-    # DEBUG: Log do que foi recebido
-    import logging
-    logger = logging.getLogger("uvicorn")
-    logger.info("="*60)
-    logger.info("🔍 DEBUG - Criar Consulta")
-    logger.info(f"📥 Recebido do Pydantic: {appointment_data.appointment_date}")
-    logger.info(f"📥 Tipo: {type(appointment_data.appointment_date)}")
-    logger.info(f"📥 Timezone: {appointment_data.appointment_date.tzinfo}")
+    logger.debug("Criar consulta - appointment_date=%r", appointment_data.appointment_date)
     
     # Usar model_dump para garantir que campos opcionais sejam incluídos
     appointment_dict = appointment_data.model_dump(exclude_none=False)
@@ -404,46 +305,47 @@ async def create_appointment(
     now = dt_module.now()  # Naive datetime (sem timezone)
     appointment_dict['created_at'] = now
     appointment_dict['updated_at'] = now
+    appointment_dict['family_id'] = family_id  # Denormalizado do membro (validado acima)
     
-    appointment = MedicalAppointment(**appointment_dict)
-    db.add(appointment)
+    appointment = insert_returning(db, MedicalAppointment, appointment_dict)
     db.commit()
-    db.refresh(appointment)
     
     return appointment
 
 @router.get("/appointments", response_model=List[MedicalAppointmentSchema])
 async def list_appointments(
+    request: Request,
+    response: Response,
     member_id: int = None,
     include_documents: bool = True,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Listar consultas médicas (apenas da família do usuário).
     Use include_documents=false para carregamento mais rápido."""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, buscar de todas as famílias que tem acesso
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            return JSONResponse(content=[])
-        query = db.query(MedicalAppointment).join(FamilyMember).filter(
-            FamilyMember.family_id.in_(family_ids)
-        )
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        query = db.query(MedicalAppointment).join(FamilyMember).filter(
-            FamilyMember.family_id == family_id
-        )
-    
+    selected = APPOINTMENT_FIELDS.parse(fields)
+    if scope.empty:
+        return JSONResponse(content=[])
+    # GET condicional: responde 304 antes de carregar as consultas (e os documentos)
+    state = collection_state(db, scope.family_ids, (MedicalAppointment, [scope.where(MedicalAppointment)]))
+    not_modified = conditional_response(request, response, state)
+    if not_modified:
+        return not_modified
+    
+    filters = [scope.where(MedicalAppointment)]
     if member_id:
-        query = query.filter(MedicalAppointment.family_member_id == member_id)
+        filters.append(MedicalAppointment.family_member_id == member_id)
     
-    appointments = query.order_by(MedicalAppointment.appointment_date.desc()).all()
+    if settings.FAST_LIST_RESPONSES or selected:
+        statement = schema_select(
+            MedicalAppointment, MedicalAppointmentSchema,
+            skip=() if include_documents else ("documents",),
+            fields=selected,
+        ).where(*filters).order_by(MedicalAppointment.appointment_date.desc())
+        return fast_json_response(schema_rows(db, statement, MedicalAppointmentSchema, fields=selected), response)
+    
+    appointments = db.query(MedicalAppointment).filter(*filters).order_by(MedicalAppointment.appointment_date.desc()).all()
     
     # Se não incluir documentos, retornar sem eles para economizar banda
     if not include_documents:
@@ -474,32 +376,15 @@ async def update_appointment(
     appointment_id: int,
     appointment_data: MedicalAppointmentUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar consulta médica"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se a consulta pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Consulta não encontrada"
-            )
-        appointment = db.query(MedicalAppointment).join(FamilyMember).filter(
-            MedicalAppointment.id == appointment_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        appointment = db.query(MedicalAppointment).join(FamilyMember).filter(
-            MedicalAppointment.id == appointment_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    appointment = update_returning(
+        db,
+        MedicalAppointment,
+        scope.owns(MedicalAppointment, appointment_id),
+        column_values(MedicalAppointment, appointment_data.model_dump(exclude_unset=True)),
+    )
     
     if not appointment:
         raise HTTPException(
@@ -507,43 +392,17 @@ async def update_appointment(
             detail="Consulta não encontrada"
         )
     
-    for field, value in appointment_data.model_dump(exclude_unset=True).items():
-        setattr(appointment, field, value)
-    
     db.commit()
-    db.refresh(appointment)
     return appointment
 
 @router.delete("/appointments/{appointment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_appointment(
     appointment_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir consulta médica"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se a consulta pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Consulta não encontrada"
-            )
-        appointment = db.query(MedicalAppointment).join(FamilyMember).filter(
-            MedicalAppointment.id == appointment_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        appointment = db.query(MedicalAppointment).join(FamilyMember).filter(
-            MedicalAppointment.id == appointment_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    appointment = db.query(MedicalAppointment).filter(*scope.owns(MedicalAppointment, appointment_id)).first()
     
     if not appointment:
         raise HTTPException(
@@ -560,13 +419,12 @@ async def download_procedure_document(
     procedure_id: int,
     doc_index: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Baixar um anexo de um procedimento médico"""
     from app.utils.file_response import get_document_response
     
-    procedure = db.query(MedicalProcedure).filter(MedicalProcedure.id == procedure_id).first()
+    procedure = db.query(MedicalProcedure).filter(*scope.owns(MedicalProcedure, procedure_id)).first()
     if not procedure:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Procedimento não encontrado")
     
@@ -576,22 +434,10 @@ async def download_procedure_document(
 async def create_medication(
     medication_data: MedicationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar novo medicamento"""
-    import logging
-    from app.api.deps import get_user_family_ids
-    logger = logging.getLogger("uvicorn")
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     member = db.query(FamilyMember).filter(
         FamilyMember.id == medication_data.family_member_id,
@@ -618,27 +464,15 @@ async def create_medication(
     now = dt_module.now()
     data_dict['created_at'] = now
     data_dict['updated_at'] = now
+    data_dict['family_id'] = family_id  # Denormalizado do membro (validado acima)
     
-    # Log detalhado para debug
-    logger.info(f"🔵 CREATE MEDICATION - Recebido:")
-    logger.info(f"   - Campo 'documents' presente: {'documents' in data_dict}")
-    logger.info(f"   - Valor de 'documents': {data_dict.get('documents', 'NÃO ENCONTRADO')}")
-    if data_dict.get('documents'):
-        logger.info(f"   - Tipo: {type(data_dict.get('documents'))}")
-        logger.info(f"   - Tamanho: {len(str(data_dict.get('documents')))} caracteres")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("CREATE MEDICATION - documents: %s caracteres", len(str(data_dict.get('documents') or "")))
     
-    medication = Medication(**data_dict)
-    db.add(medication)
+    medication = insert_returning(db, Medication, data_dict)
     db.commit()
-    db.refresh(medication)
     
-    # Verificar se foi salvo
-    logger.info(f"🟢 CREATE MEDICATION - Salvo no banco:")
-    logger.info(f"   - ID: {medication.id}")
-    logger.info(f"   - Campo 'documents' no objeto: {hasattr(medication, 'documents')}")
-    logger.info(f"   - Valor de 'documents': {medication.documents if hasattr(medication, 'documents') else 'ATRIBUTO NÃO EXISTE'}")
-    if hasattr(medication, 'documents') and medication.documents:
-        logger.info(f"   - Tamanho no banco: {len(medication.documents)} caracteres")
+    logger.debug("CREATE MEDICATION - ID=%s, has_documents=%s", medication['id'], medication['has_documents'])
     
     return medication
 
@@ -646,97 +480,72 @@ async def create_medication(
 async def list_medications(
     member_id: int = None,
     active_only: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Listar medicamentos (apenas da família do usuário)"""
     from datetime import date
-    from app.api.deps import get_user_family_ids
     
-    # Se for admin sem family_id especificado, buscar de todas as famílias que tem acesso
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            return []
-        query = db.query(Medication).join(FamilyMember).filter(
-            FamilyMember.family_id.in_(family_ids)
-        )
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        query = db.query(Medication).join(FamilyMember).filter(
-            FamilyMember.family_id == family_id
-        )
+    selected = MEDICATION_FIELDS.parse(fields)
+    if scope.empty:
+        return []
+    filters = [scope.where(Medication)]
     
     if member_id:
-        query = query.filter(Medication.family_member_id == member_id)
+        filters.append(Medication.family_member_id == member_id)
     
     if active_only:
         today = date.today()
-        query = query.filter(
-            Medication.start_date <= today,
-            (Medication.end_date.is_(None)) | (Medication.end_date >= today)
-        )
+        filters.append(Medication.start_date <= today)
+        filters.append((Medication.end_date.is_(None)) | (Medication.end_date >= today))
     
-    medications = query.order_by(Medication.created_at.desc()).all()
+    if selected:
+        statement = schema_select(Medication, MedicationSchema, fields=selected).where(*filters).order_by(
+            Medication.created_at.desc()
+        )
+        medications = schema_rows(db, statement, MedicationSchema, fields=selected)
+        for med in medications:
+            for name in ("start_date", "end_date"):
+                if isinstance(med.get(name), datetime):  # Mesmo ajuste do validator do schema
+                    med[name] = med[name].date()
+            if med.get("documents"):
+                try:
+                    med["documents"] = _strip_document_contents(med["documents"])
+                except Exception:
+                    pass
+        return fast_json_response(medications)
+    
+    medications = db.query(Medication).filter(*filters).order_by(Medication.created_at.desc()).all()
     
-    import json
     for med in medications:
         if med.documents:
             try:
                 db.expunge(med)
-                docs = json.loads(med.documents)
-                for d in docs:
-                    if 'content' in d:
-                        d['content'] = ""
-                med.documents = json.dumps(docs)
+                med.documents = _strip_document_contents(med.documents)
             except Exception:
                 pass
                 
     return medications
 
+
+def _strip_document_contents(documents: str) -> str:
+    """Documentos sem o conteúdo base64 (a listagem só mostra nome e tipo)"""
+    import json
+    docs = json.loads(documents)
+    for d in docs:
+        if 'content' in d:
+            d['content'] = ""
+    return json.dumps(docs)
+
 @router.put("/medications/{medication_id}", response_model=MedicationSchema)
 async def update_medication(
     medication_id: int,
     medication_data: MedicationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar medicamento"""
-    import logging
-    from app.api.deps import get_user_family_ids
-    logger = logging.getLogger("uvicorn")
-    
-    # Se for admin sem family_id especificado, verificar se o medicamento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Medicamento não encontrado"
-            )
-        medication = db.query(Medication).join(FamilyMember).filter(
-            Medication.id == medication_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        medication = db.query(Medication).join(FamilyMember).filter(
-            Medication.id == medication_id,
-            FamilyMember.family_id == family_id
-        ).first()
-    
-    if not medication:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Medicamento não encontrado"
-        )
-    
     # IMPORTANTE: Para campos opcionais como documents, precisamos garantir que sejam processados
     # mesmo quando são None. O problema é que exclude_unset=True pode não incluir campos None
     # se eles não foram explicitamente definidos no request.
@@ -747,35 +556,30 @@ async def update_medication(
     # Depois, obter apenas campos que foram definidos (exclude_unset=True)
     update_dict = medication_data.model_dump(exclude_unset=True)
     
-    # Log detalhado para debug
-    logger.info(f"🟡 UPDATE MEDICATION {medication_id} - Recebido:")
-    logger.info(f"   - Campo 'documents' em exclude_unset=True: {'documents' in update_dict}")
-    logger.info(f"   - Campo 'documents' em exclude_unset=False: {'documents' in all_data}")
-    logger.info(f"   - Valor de 'documents' (unset): {update_dict.get('documents', 'NÃO ENCONTRADO')}")
-    logger.info(f"   - Valor de 'documents' (all): {all_data.get('documents', 'NÃO ENCONTRADO')}")
-    
     # CRÍTICO: Se documents está presente em all_data (mesmo que None), significa que foi enviado
     # e deve ser atualizado. Se não está em update_dict mas está em all_data, adicionar.
     if 'documents' in all_data:
         update_dict['documents'] = all_data['documents']
-        logger.info(f"   - Documents incluído no update: {all_data['documents'] is not None}")
-        if all_data['documents']:
-            logger.info(f"   - Tamanho: {len(str(all_data['documents']))} caracteres")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("UPDATE MEDICATION %s - documents: %s caracteres", medication_id, len(str(all_data['documents'] or "")))
     
     # Atualizar campos
-    for field, value in update_dict.items():
-        logger.info(f"   - Atualizando {field} = {value if field != 'documents' else ('<JSON>' if value else 'None')}")
-        setattr(medication, field, value)
+    medication = update_returning(
+        db,
+        Medication,
+        scope.owns(Medication, medication_id),
+        column_values(Medication, update_dict),
+    )
+    
+    if not medication:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Medicamento não encontrado"
+        )
     
     db.commit()
-    db.refresh(medication)
     
-    # Verificar se foi salvo
-    logger.info(f"🟢 UPDATE MEDICATION - Salvo no banco:")
-    logger.info(f"   - Campo 'documents' no objeto: {hasattr(medication, 'documents')}")
-    logger.info(f"   - Valor de 'documents': {medication.documents if hasattr(medication, 'documents') else 'ATRIBUTO NÃO EXISTE'}")
-    if hasattr(medication, 'documents') and medication.documents:
-        logger.info(f"   - Tamanho no banco: {len(medication.documents)} caracteres")
+    logger.debug("UPDATE MEDICATION %s - has_documents=%s", medication_id, medication['has_documents'])
     
     return medication
 
@@ -783,32 +587,10 @@ async def update_medication(
 async def delete_medication(
     medication_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir medicamento"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o medicamento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Medicamento não encontrado"
-            )
-        medication = db.query(Medication).join(FamilyMember).filter(
-            Medication.id == medication_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        medication = db.query(Medication).join(FamilyMember).filter(
-            Medication.id == medication_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    medication = db.query(Medication).filter(*scope.owns(Medication, medication_id)).first()
     
     if not medication:
         raise HTTPException(
@@ -825,13 +607,12 @@ async def download_appointment_document(
     appointment_id: int,
     doc_index: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Baixar um anexo de uma consulta médica"""
     from app.utils.file_response import get_document_response
     
-    appointment = db.query(MedicalAppointment).filter(MedicalAppointment.id == appointment_id).first()
+    appointment = db.query(MedicalAppointment).filter(*scope.owns(MedicalAppointment, appointment_id)).first()
     if not appointment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
     
@@ -841,20 +622,10 @@ async def download_appointment_document(
 async def create_procedure(
     procedure_data: MedicalProcedureCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar novo procedimento médico"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     member = db.query(FamilyMember).filter(
         FamilyMember.id == procedure_data.family_member_id,
@@ -879,47 +650,43 @@ async def create_procedure(
     now = dt_module.now()
     procedure_dict['created_at'] = now
     procedure_dict['updated_at'] = now
+    procedure_dict['family_id'] = family_id  # Denormalizado do membro (validado acima)
     
-    procedure = MedicalProcedure(**procedure_dict)
-    db.add(procedure)
+    procedure = insert_returning(db, MedicalProcedure, procedure_dict)
     db.commit()
-    db.refresh(procedure)
     return procedure
 
 @router.get("/procedures", response_model=List[MedicalProcedureSchema])
 async def list_procedures(
     member_id: int = None,
     include_documents: bool = True,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Listar procedimentos médicos (apenas da família do usuário).
     Use include_documents=false para carregamento mais rápido."""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, buscar de todas as famílias que tem acesso
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            return []
-        query = db.query(MedicalProcedure).join(FamilyMember).filter(
-            FamilyMember.family_id.in_(family_ids)
-        )
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        query = db.query(MedicalProcedure).join(FamilyMember).filter(
-            FamilyMember.family_id == family_id
-        )
-    
+    selected = PROCEDURE_FIELDS.parse(fields)
+    if scope.empty:
+        return []
+    filters = [scope.where(MedicalProcedure)]
     if member_id:
-        query = query.filter(MedicalProcedure.family_member_id == member_id)
+        filters.append(MedicalProcedure.family_member_id == member_id)
+    query = db.query(MedicalProcedure).filter(*filters)
+
+    has_documents = func.coalesce(func.length(MedicalProcedure.documents), 0) > 2
+    if settings.FAST_LIST_RESPONSES or selected:
+        statement = schema_select(
+            MedicalProcedure, MedicalProcedureSchema,
+            computed={"has_documents": has_documents},
+            skip=() if include_documents else ("documents",),
+            fields=selected,
+        ).where(*filters).order_by(MedicalProcedure.procedure_date.desc())
+        return fast_json_response(schema_rows(db, statement, MedicalProcedureSchema, fields=selected))
 
     if not include_documents:
         procedures = query.add_columns(
-            (func.coalesce(func.length(MedicalProcedure.documents), 0) > 2).label("has_documents")
+            has_documents.label("has_documents")
         ).options(defer(MedicalProcedure.documents)).order_by(MedicalProcedure.procedure_date.desc()).all()
 
         return [
@@ -950,30 +717,10 @@ async def list_procedures(
 async def get_procedure(
     procedure_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Obter um procedimento médico com documentos completos."""
-    from app.api.deps import get_user_family_ids
-
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Procedimento não encontrado"
-            )
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    procedure = db.query(MedicalProcedure).filter(*scope.owns(MedicalProcedure, procedure_id)).first()
 
     if not procedure:
         raise HTTPException(
@@ -988,39 +735,9 @@ async def update_procedure(
     procedure_id: int,
     procedure_data: MedicalProcedureUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar procedimento médico"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o procedimento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Procedimento não encontrado"
-            )
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id == family_id
-        ).first()
-    
-    if not procedure:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Procedimento não encontrado"
-        )
-    
     # Atualizar campos, garantindo que documents seja processado mesmo se None
     update_data = procedure_data.model_dump(exclude_unset=True)
     
@@ -1028,43 +745,30 @@ async def update_procedure(
     if 'documents' in procedure_data.model_dump(exclude_unset=False):
         update_data['documents'] = procedure_data.documents
     
-    for field, value in update_data.items():
-        setattr(procedure, field, value)
+    procedure = update_returning(
+        db,
+        MedicalProcedure,
+        scope.owns(MedicalProcedure, procedure_id),
+        column_values(MedicalProcedure, update_data),
+    )
+    
+    if not procedure:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Procedimento não encontrado"
+        )
     
     db.commit()
-    db.refresh(procedure)
     return procedure
 
 @router.delete("/procedures/{procedure_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_procedure(
     procedure_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir procedimento médico"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o procedimento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Procedimento não encontrado"
-            )
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        procedure = db.query(MedicalProcedure).join(FamilyMember).filter(
-            MedicalProcedure.id == procedure_id,
-            FamilyMember.family_id == family_id
-        ).first()
+    procedure = db.query(MedicalProcedure).filter(*scope.owns(MedicalProcedure, procedure_id)).first()
     
     if not procedure:
         raise HTTPException(
@@ -1090,13 +794,12 @@ async def download_medication_document(
     medication_id: int,
     doc_index: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Baixar um anexo de um medicamento"""
     from app.utils.file_response import get_document_response
     
-    medication = db.query(Medication).filter(Medication.id == medication_id).first()
+    medication = db.query(Medication).filter(*scope.owns(Medication, medication_id)).first()
     if not medication:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Medicamento não encontrado")
     
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 import json
+import logging
 from datetime import datetime, timezone
-from app.db.base import get_db
+from app.core.cache import cached_response_async
+from app.core.config import settings
+from app.db.base import get_db, get_async_db
+from app.db.writes import column_values, insert_returning, update_returning
+from app.utils.conditional_get import collection_state, conditional_response
+from app.utils.fast_json import fast_json_response, schema_rows, schema_select
+from app.utils.sparse_fields import FIELDS_QUERY, FieldSet
 from app.models.user import User
 from app.models.maintenance import Equipment, MaintenanceOrder, EquipmentAttachment
 from app.schemas.maintenance import (
@@ -13,29 +22,26 @@ from app.schemas.maintenance import (
     MaintenanceOrder as MaintenanceOrderSchema,
     MaintenanceOrderCreate, MaintenanceOrderUpdate, MaintenanceOrderDetail
 )
-from app.api.deps import get_current_user, get_current_family
+from app.api.deps import get_current_user, get_tenant_scope, get_current_user_async
+from app.db.tenancy import TenantScope
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Campos aceitos em ?fields= (app/utils/sparse_fields.py)
+EQUIPMENT_FIELDS = FieldSet(EquipmentSchema)
+ORDER_FIELDS = FieldSet(MaintenanceOrderSchema)
+
 # ===== EQUIPMENT =====
 @router.post("/equipment", response_model=EquipmentSchema, status_code=status.HTTP_201_CREATED)
 async def create_equipment(
     equipment_data: EquipmentCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar novo equipamento"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     try:
         equipment_dict = equipment_data.model_dump(exclude_none=False)
@@ -60,13 +66,11 @@ async def create_equipment(
         equipment_dict['created_at'] = now
         equipment_dict['updated_at'] = now
         
-        equipment = Equipment(**equipment_dict)
-        if not equipment.owner_id:
-            equipment.owner_id = current_user.id
+        if not equipment_dict.get('owner_id'):
+            equipment_dict['owner_id'] = current_user.id
         
-        db.add(equipment)
+        equipment = insert_returning(db, Equipment, column_values(Equipment, equipment_dict, exclude=('id',)))
         db.commit()
-        db.refresh(equipment)
         return equipment
     except Exception as e:
         db.rollback()
@@ -79,31 +83,44 @@ async def create_equipment(
 
 @router.get("/equipment", response_model=List[EquipmentSchema])
 async def list_equipment(
+    request: Request,
+    response: Response,
     equipment_type: str = None,
     include_documents: bool = True,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Listar todos os equipamentos (compartilhados entre usuários da mesma família).
     Use include_documents=false para carregamento mais rápido."""
-    from app.api.deps import get_user_family_ids
-    
     from sqlalchemy.orm import defer
     
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            return []
-        query = db.query(Equipment).filter(Equipment.family_id.in_(family_ids))
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        query = db.query(Equipment).filter(Equipment.family_id == family_id)
+    selected = EQUIPMENT_FIELDS.parse(fields)
+    if scope.empty:
+        return []
+    
+    # GET condicional: responde 304 antes de carregar os equipamentos (e os documentos)
+    state = collection_state(db, scope.family_ids, (Equipment, [scope.where(Equipment)]))
+    not_modified = conditional_response(request, response, state)
+    if not_modified:
+        return not_modified
     
+    filters = [scope.where(Equipment)]
     if equipment_type:
-        query = query.filter(Equipment.type == equipment_type)
+        filters.append(Equipment.type == equipment_type)
+    
+    if selected:
+        # has_documents calculado no banco, como a property do modelo; sem documentos, None
+        computed = {"has_documents": func.coalesce(func.length(Equipment.documents), 0) > 2} if include_documents else {}
+        statement = schema_select(
+            Equipment, EquipmentSchema,
+            computed=computed,
+            skip=() if include_documents else ("documents",),
+            fields=selected,
+        ).where(*filters).order_by(Equipment.created_at.desc())
+        return fast_json_response(schema_rows(db, statement, EquipmentSchema, fields=selected), response)
+    
+    query = db.query(Equipment).filter(*filters)
         
     if not include_documents:
         query = query.options(defer(Equipment.documents))
@@ -142,13 +159,12 @@ async def download_equipment_document(
     equipment_id: int,
     doc_index: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Baixar um anexo de um equipamento"""
     from app.utils.file_response import get_document_response
     
-    equipment = db.query(Equipment).filter(Equipment.id == equipment_id).first()
+    equipment = db.query(Equipment).filter(*scope.owns(Equipment, equipment_id)).first()
     if not equipment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Equipamento não encontrado")
     
@@ -158,32 +174,10 @@ async def download_equipment_document(
 async def get_equipment(
     equipment_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Obter detalhes de um equipamento"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o equipamento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Equipamento não encontrado"
-            )
-        equipment = db.query(Equipment).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        equipment = db.query(Equipment).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id == family_id
-        ).first()
+    equipment = db.query(Equipment).filter(*scope.owns(Equipment, equipment_id)).first()
     
     if not equipment:
         raise HTTPException(
@@ -199,42 +193,9 @@ async def update_equipment(
     equipment_data: EquipmentUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar equipamento"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, verificar se o equipamento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Equipamento não encontrado"
-            )
-        equipment = db.query(Equipment).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        equipment = db.query(Equipment).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id == family_id
-        ).first()
-    
-    if not equipment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Equipamento não encontrado"
-        )
-    
-    # Se o equipamento não tem owner_id, atribuir ao usuário atual
-    if not equipment.owner_id:
-        equipment.owner_id = current_user.id
-    
     # Atualizar campos, garantindo que documents seja processado mesmo se None
     update_data = equipment_data.model_dump(exclude_unset=True)
     
@@ -242,54 +203,37 @@ async def update_equipment(
     if 'documents' in equipment_data.model_dump(exclude_unset=False):
         update_data['documents'] = equipment_data.documents
     
-    update_data.pop('has_documents', None)
+    update_data = column_values(Equipment, update_data)
     
-    for field, value in update_data.items():
-        setattr(equipment, field, value)
+    # Se o equipamento não tem owner_id, atribuir ao usuário atual
+    if not update_data.get('owner_id'):
+        update_data['owner_id'] = func.coalesce(Equipment.owner_id, current_user.id)
+    
+    equipment = update_returning(db, Equipment, scope.owns(Equipment, equipment_id), update_data)
+    
+    if not equipment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Equipamento não encontrado"
+        )
     
     db.commit()
-    db.refresh(equipment)
     return equipment
 
 @router.delete("/equipment/{equipment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_equipment(
     equipment_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir equipamento"""
-    from app.api.deps import get_user_family_ids
     from sqlalchemy.orm import noload
     
-    # Se for admin sem family_id especificado, verificar se o equipamento pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Equipamento não encontrado"
-            )
-        # Usar noload para evitar carregar relacionamentos que podem ter problemas de schema
-        equipment = db.query(Equipment).options(
-            noload(Equipment.maintenance_orders),
-            noload(Equipment.attachments)
-        ).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        # Usar noload para evitar carregar relacionamentos que podem ter problemas de schema
-        equipment = db.query(Equipment).options(
-            noload(Equipment.maintenance_orders),
-            noload(Equipment.attachments)
-        ).filter(
-            Equipment.id == equipment_id,
-            Equipment.family_id == family_id
-        ).first()
+    # Usar noload para evitar carregar relacionamentos que podem ter problemas de schema
+    equipment = db.query(Equipment).options(
+        noload(Equipment.maintenance_orders),
+        noload(Equipment.attachments)
+    ).filter(*scope.owns(Equipment, equipment_id)).first()
     
     if not equipment:
         raise HTTPException(
@@ -315,19 +259,10 @@ async def create_maintenance_order(
     order_data: MaintenanceOrderCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Criar nova ordem de manutenção"""
-    from app.api.deps import get_user_family_ids
-    
-    # Se for admin sem family_id especificado, usar a primeira família do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
-        family_id = family_ids[0]  # Usar a primeira família
-    elif family_id is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+    family_id = scope.require_family()
     
     # Verificar se o equipamento pertence à família do usuário
     equipment = db.query(Equipment).filter(
@@ -360,59 +295,72 @@ async def create_maintenance_order(
     data_dict['created_at'] = now
     data_dict['updated_at'] = now
     
-    # Log para debug
-    print(f"[DEBUG] CREATE ORDER - documents presente: {'documents' in data_dict}")
-    if data_dict.get('documents'):
-        print(f"[DEBUG] CREATE ORDER - documents tamanho: {len(str(data_dict.get('documents')))} caracteres")
-    
-    order = MaintenanceOrder(**data_dict, created_by_id=current_user.id)
-    db.add(order)
+    data_dict['created_by_id'] = current_user.id
+    data_dict['family_id'] = family_id  # Denormalizado do equipamento (validado acima)
+    order = insert_returning(db, MaintenanceOrder, column_values(MaintenanceOrder, data_dict, exclude=('id',)))
     db.commit()
-    db.refresh(order)
+    order['equipment_name'] = equipment.name
     
-    print(f"[DEBUG] CREATE ORDER - Salvo com ID: {order.id}")
-    if hasattr(order, 'documents') and order.documents:
-        print(f"[DEBUG] CREATE ORDER - documents salvo: {len(order.documents)} caracteres")
+    logger.debug("CREATE ORDER - ID=%s, has_documents=%s", order['id'], order['has_documents'])
     
     return order
 
 @router.get("/orders", response_model=List[MaintenanceOrderSchema])
 async def list_maintenance_orders(
+    request: Request,
+    response: Response,
     equipment_id: int = None,
     status: str = None,
     include_documents: bool = True,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Listar todas as ordens de manutenção (compartilhadas entre usuários da mesma família).
     Use include_documents=false para carregamento mais rápido."""
-    from app.api.deps import get_user_family_ids
-    
     from sqlalchemy.orm import defer
     
-    # Se for admin sem family_id especificado, buscar de todas as famílias que tem acesso
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            return []
-        query = db.query(MaintenanceOrder).options(joinedload(MaintenanceOrder.equipment)).join(Equipment).filter(
-            Equipment.family_id.in_(family_ids)
-        )
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        query = db.query(MaintenanceOrder).options(joinedload(MaintenanceOrder.equipment)).join(Equipment).filter(
-            Equipment.family_id == family_id
-        )
-    
+    selected = ORDER_FIELDS.parse(fields)
+    if scope.empty:
+        return []
+
+    # GET condicional: o nome do equipamento vai embutido nas ordens, então os equipamentos
+    # também entram no validador
+    state = collection_state(
+        db,
+        scope.family_ids,
+        (MaintenanceOrder, [scope.where(MaintenanceOrder)]),
+        (Equipment, [scope.where(Equipment)]),
+    )
+    not_modified = conditional_response(request, response, state)
+    if not_modified:
+        return not_modified
+    
+    filters = [scope.where(MaintenanceOrder)]
     if equipment_id:
-        query = query.filter(MaintenanceOrder.equipment_id == equipment_id)
-    
+        filters.append(MaintenanceOrder.equipment_id == equipment_id)
+
     if status:
-        query = query.filter(MaintenanceOrder.status == status)
-        
+        filters.append(MaintenanceOrder.status == status)
+
+    if settings.FAST_LIST_RESPONSES or selected:
+        # Sem documentos: has_documents fica None, como no caminho padrão
+        computed = {"equipment_name": func.coalesce(Equipment.name, "Desconhecido")}
+        if include_documents:
+            computed["has_documents"] = func.coalesce(func.length(MaintenanceOrder.documents), 0) > 2
+        statement = schema_select(
+            MaintenanceOrder, MaintenanceOrderSchema,
+            computed=computed,
+            skip=() if include_documents else ("documents",),
+            fields=selected,
+        )
+        if selected is None or "equipment_name" in selected:
+            statement = statement.outerjoin_from(MaintenanceOrder, Equipment)
+        statement = statement.where(*filters).order_by(MaintenanceOrder.completion_date.desc())
+        return fast_json_response(schema_rows(db, statement, MaintenanceOrderSchema, fields=selected), response)
+
+    query = db.query(MaintenanceOrder).options(joinedload(MaintenanceOrder.equipment)).filter(*filters)
+
     if not include_documents:
         query = query.options(defer(MaintenanceOrder.documents))
     
@@ -459,13 +407,12 @@ async def download_maintenance_order_document(
     order_id: int,
     doc_index: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Baixar um anexo de uma ordem de manutenção"""
     from app.utils.file_response import get_document_response
     
-    order = db.query(MaintenanceOrder).filter(MaintenanceOrder.id == order_id).first()
+    order = db.query(MaintenanceOrder).filter(*scope.owns(MaintenanceOrder, order_id)).first()
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ordem de manutenção não encontrada")
     
@@ -475,64 +422,24 @@ async def download_maintenance_order_document(
 async def get_maintenance_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Obter detalhes de uma ordem de manutenção"""
-    from app.api.deps import get_user_family_ids
-    import logging
-    logging.info(f"[DEBUG] ===== INICIO GET ORDER {order_id} =====")
-    
     try:
-        # Se for admin sem family_id especificado, verificar se a ordem pertence a alguma das famílias do admin
-        if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-            family_ids = get_user_family_ids(current_user, db)
-            if not family_ids:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Ordem de manutenção não encontrada"
-                )
-            order = db.query(MaintenanceOrder).join(Equipment).filter(
-                MaintenanceOrder.id == order_id,
-                Equipment.family_id.in_(family_ids)
-            ).first()
-        else:
-            # Usuário normal ou admin com family_id específico
-            if family_id is None:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-            order = db.query(MaintenanceOrder).join(Equipment).filter(
-                MaintenanceOrder.id == order_id,
-                Equipment.family_id == family_id
-            ).first()
+        order = db.query(MaintenanceOrder).filter(*scope.owns(MaintenanceOrder, order_id)).first()
         
         if not order:
-            logging.error(f"[ERROR] Ordem {order_id} nao encontrada")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Ordem de manutenção não encontrada"
             )
         
-        logging.info(f"[DEBUG] Ordem {order_id} encontrada, serializando...")
-        
-        # Testar serialização manualmente para debug
-        try:
-            from app.schemas.maintenance import MaintenanceOrderDetail as DetailSchema
-            DetailSchema.model_validate(order)
-            logging.info(f"[DEBUG] Serializacao Pydantic OK")
-        except Exception as e:
-            logging.error(f"[ERROR] Falha na serializacao: {e}")
-            import traceback
-            logging.error(traceback.format_exc())
-            # Não interromper aqui, deixar o FastAPI tentar retornar
-            
-        logging.info(f"[DEBUG] ===== FIM GET ORDER {order_id} (SUCESSO) =====")
+        logger.debug("GET ORDER %s - has_documents=%s", order_id, bool(order.documents))
         return order
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        logging.error(f"[ERROR] Erro inesperado no GET ORDER {order_id}: {e}")
-        logging.error(traceback.format_exc())
+        logger.exception("[ERROR] Erro inesperado no GET ORDER %s: %s", order_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao carregar detalhes da ordem: {str(e)}"
@@ -543,44 +450,10 @@ async def update_maintenance_order(
     order_id: int,
     order_data: MaintenanceOrderUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Atualizar ordem de manutenção"""
-    from app.api.deps import get_user_family_ids
-    import logging
-    logging.info(f"[DEBUG] ===== INICIO UPDATE ORDER {order_id} =====")
     try:
-        # Se for admin sem family_id especificado, verificar se a ordem pertence a alguma das famílias do admin
-        if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-            family_ids = get_user_family_ids(current_user, db)
-            if not family_ids:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Ordem de manutenção não encontrada"
-                )
-            order = db.query(MaintenanceOrder).join(Equipment).filter(
-                MaintenanceOrder.id == order_id,
-                Equipment.family_id.in_(family_ids)
-            ).first()
-        else:
-            # Usuário normal ou admin com family_id específico
-            if family_id is None:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-            order = db.query(MaintenanceOrder).join(Equipment).filter(
-                MaintenanceOrder.id == order_id,
-                Equipment.family_id == family_id
-            ).first()
-        
-        if not order:
-            logging.error(f"[ERROR] Ordem {order_id} nao encontrada")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ordem de manutenção não encontrada"
-            )
-        
-        logging.info(f"[DEBUG] Ordem {order_id} encontrada")
-        
         # IMPORTANTE: Para campos opcionais como documents, precisamos garantir que sejam processados
         # mesmo quando são None. O problema é que exclude_unset=True pode não incluir campos None
         # se eles não foram explicitamente definidos no request.
@@ -595,46 +468,44 @@ async def update_maintenance_order(
         # e deve ser atualizado. Se não está em update_dict mas está em all_data, adicionar.
         if 'documents' in all_data:
             update_dict['documents'] = all_data['documents']
-            logging.info(f"[DEBUG] UPDATE ORDER {order_id} - documents presente: {all_data['documents'] is not None}")
-            if all_data['documents']:
-                logging.info(f"[DEBUG] UPDATE ORDER {order_id} - documents tamanho: {len(str(all_data['documents']))} caracteres")
+            logger.debug("UPDATE ORDER %s - documents: %s caracteres", order_id, len(str(all_data['documents'] or "")))
         
-        update_dict.pop('has_documents', None)
+        update_dict = column_values(MaintenanceOrder, update_dict)
         
-        # Atualizar campos (incluindo documents agora)
-        for field, value in update_dict.items():
-            # Normalizar status para maiúsculas se estiver sendo atualizado
-            if field == 'status' and value:
-                value = value.upper()
-            setattr(order, field, value)
+        # Normalizar status para maiúsculas se estiver sendo atualizado
+        if update_dict.get('status'):
+            update_dict['status'] = update_dict['status'].upper()
         
         try:
-            import logging
-            logging.info(f"[DEBUG] Fazendo commit da ordem {order_id}...")
-            db.commit()
-            logging.info(f"[DEBUG] Commit realizado com sucesso")
-            db.refresh(order)
-            logging.info(f"[DEBUG] Ordem {order_id} atualizada com sucesso")
+            # Atualizar campos (incluindo documents agora) já com o filtro de família no WHERE
+            order = update_returning(
+                db,
+                MaintenanceOrder,
+                scope.owns(MaintenanceOrder, order_id),
+                update_dict,
+                extra_columns=(
+                    select(Equipment.name)
+                    .where(Equipment.id == MaintenanceOrder.equipment_id)
+                    .scalar_subquery()
+                    .label("equipment_name"),
+                ),
+            )
             
-            # Verificar se a serialização funciona antes de retornar
-            from app.schemas.maintenance import MaintenanceOrder as MaintenanceOrderSchema
-            logging.info(f"[DEBUG] Testando serializacao Pydantic...")
-            try:
-                test_schema = MaintenanceOrderSchema.model_validate(order)
-                logging.info(f"[DEBUG] Serializacao OK, retornando order")
-            except Exception as schema_err:
-                logging.error(f"[ERROR] Falha na serializacao Pydantic: {schema_err}")
-                raise
+            if not order:
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Ordem de manutenção não encontrada"
+                )
             
-            logging.info(f"[DEBUG] ===== FIM UPDATE ORDER {order_id} (SUCESSO) =====")
+            db.commit()
+            logger.debug("UPDATE ORDER %s - status=%s", order_id, order['status'])
             return order
+        except HTTPException:
+            raise
         except Exception as e:
             db.rollback()
-            import logging
-            logging.error(f"Erro ao fazer commit da ordem {order_id}: {e}")
-            logging.error(f"Tipo do erro: {type(e).__name__}")
-            import traceback
-            logging.error(traceback.format_exc())
+            logger.exception("Erro ao fazer commit da ordem %s (%s): %s", order_id, type(e).__name__, e)
             
             # Verificar se é erro de tamanho de campo
             error_str = str(e).lower()
@@ -653,10 +524,7 @@ async def update_maintenance_order(
         raise
     except Exception as e:
         # Capturar qualquer outro erro não tratado
-        import logging
-        logging.error(f"ERRO NAO TRATADO no update_maintenance_order: {e}")
-        import traceback
-        logging.error(traceback.format_exc())
+        logger.exception("ERRO NAO TRATADO no update_maintenance_order: %s", e)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -667,35 +535,15 @@ async def update_maintenance_order(
 async def delete_maintenance_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    family_id: Optional[int] = Depends(get_current_family)
+    scope: TenantScope = Depends(get_tenant_scope)
 ):
     """Excluir ordem de manutenção"""
-    from app.api.deps import get_user_family_ids
     from sqlalchemy.orm import noload
     
-    # Se for admin sem family_id especificado, verificar se a ordem pertence a alguma das famílias do admin
-    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
-        family_ids = get_user_family_ids(current_user, db)
-        if not family_ids:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Ordem de manutenção não encontrada"
-            )
-        # Usar noload para evitar carregar o relacionamento images que pode ter problemas de schema
-        order = db.query(MaintenanceOrder).options(noload(MaintenanceOrder.images)).join(Equipment).filter(
-            MaintenanceOrder.id == order_id,
-            Equipment.family_id.in_(family_ids)
-        ).first()
-    else:
-        # Usuário normal ou admin com family_id específico
-        if family_id is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
-        # Usar noload para evitar carregar o relacionamento images que pode ter problemas de schema
-        order = db.query(MaintenanceOrder).options(noload(MaintenanceOrder.images)).join(Equipment).filter(
-            MaintenanceOrder.id == order_id,
-            Equipment.family_id == family_id
-        ).first()
+    # Usar noload para evitar carregar o relacionamento images que pode ter problemas de schema
+    order = db.query(MaintenanceOrder).options(noload(MaintenanceOrder.images)).filter(
+        *scope.owns(MaintenanceOrder, order_id)
+    ).first()
     
     if not order:
         raise HTTPException(
@@ -718,49 +566,62 @@ async def delete_maintenance_order(
 # ===== DASHBOARD & STATS =====
 @router.get("/dashboard/stats")
 async def get_maintenance_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Obter estatísticas de manutenção"""
+    # Sessão do primário: o resultado vai para o cache da família (ver finance.get_finance_summary)
+    from app.api.deps import get_user_family_ids
+    
+    # Equipamentos do usuário podem estar em qualquer família à qual ele tem acesso
+    family_ids = set(get_user_family_ids(current_user, db))
+    family_ids.add(current_user.family_id)
+    return await cached_response_async(
+        "maintenance:stats",
+        family_ids,
+        {"owner_id": current_user.id},
+        lambda: _build_maintenance_stats(db, current_user),
+    )
+
+
+async def _build_maintenance_stats(db: AsyncSession, current_user: User) -> dict:
+    """Calcula as estatísticas de manutenção do usuário (sem cache)"""
     from sqlalchemy import func
     from datetime import datetime, timedelta
     
-    # Total de equipamentos
-    total_equipment = db.query(func.count(Equipment.id)).filter(
+    owned_orders = select(func.count(MaintenanceOrder.id)).join(Equipment).where(
         Equipment.owner_id == current_user.id
-    ).scalar()
+    )
+    
+    # Total de equipamentos
+    total_equipment = await db.scalar(
+        select(func.count(Equipment.id)).where(Equipment.owner_id == current_user.id)
+    )
     
     # Total de ordens de manutenção
-    total_orders = db.query(func.count(MaintenanceOrder.id)).join(Equipment).filter(
-        Equipment.owner_id == current_user.id
-    ).scalar()
+    total_orders = await db.scalar(owned_orders)
     
     # Ordens pendentes
-    pending_orders = db.query(func.count(MaintenanceOrder.id)).join(Equipment).filter(
-        Equipment.owner_id == current_user.id,
-        MaintenanceOrder.status == 'pendente'
-    ).scalar()
+    pending_orders = await db.scalar(owned_orders.where(MaintenanceOrder.status == 'pendente'))
     
     # Ordens em andamento
-    in_progress_orders = db.query(func.count(MaintenanceOrder.id)).join(Equipment).filter(
-        Equipment.owner_id == current_user.id,
-        MaintenanceOrder.status == 'em_andamento'
-    ).scalar()
+    in_progress_orders = await db.scalar(owned_orders.where(MaintenanceOrder.status == 'em_andamento'))
     
     # Custo total dos últimos 30 dias
     thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_cost = db.query(func.sum(MaintenanceOrder.cost)).join(Equipment).filter(
-        Equipment.owner_id == current_user.id,
-        MaintenanceOrder.completion_date >= thirty_days_ago.date()
-    ).scalar() or 0
+    recent_cost = await db.scalar(
+        select(func.sum(MaintenanceOrder.cost)).join(Equipment).where(
+            Equipment.owner_id == current_user.id,
+            MaintenanceOrder.completion_date >= thirty_days_ago.date()
+        )
+    ) or 0
     
     # Equipamentos por tipo
-    equipment_by_type = db.query(
-        Equipment.type,
-        func.count(Equipment.id).label('count')
-    ).filter(
-        Equipment.owner_id == current_user.id
-    ).group_by(Equipment.type).all()
+    equipment_by_type = (await db.execute(
+        select(Equipment.type, func.count(Equipment.id).label('count'))
+        .where(Equipment.owner_id == current_user.id)
+        .group_by(Equipment.type)
+    )).all()
     
     return {
         "total_equipment": total_equipment,
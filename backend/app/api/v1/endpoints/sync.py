@@ -0,0 +1,113 @@
+import base64
+import binascii
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_current_family
+from app.core.config import settings
+from app.db.base import get_db
+from app.db.sync_log import TRACKED_MODELS, resource_name
+from app.db.tenancy import family_criterion
+from app.db.writes import returning_columns, row_to_dict
+from app.models.sync import SyncChange, SyncTombstone
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+
+router = APIRouter()
+
+TOKEN_VERSION = 1
+
+
+def encode_token(moment: datetime) -> str:
+    payload = json.dumps({"v": TOKEN_VERSION, "t": moment.isoformat()})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_token(token: str) -> datetime:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload.get("v") != TOKEN_VERSION:
+            raise ValueError("versão de token desconhecida")
+        return datetime.fromisoformat(payload["t"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de sincronização inválido")
+
+
+def _sync_columns(model) -> list:
+    """Colunas sem blobs; a presença de documentos/foto vai como flag"""
+    columns = returning_columns(model)
+    if "photo" in model.__mapper__.columns:
+        photo = model.__mapper__.columns["photo"]
+        columns.append((func.coalesce(func.length(photo), 0) > 0).label("has_photo"))
+    return columns
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    family_id: Optional[int] = Depends(get_current_family)
+):
+    """Sincronização incremental: registros criados/alterados e IDs excluídos desde `since`.
+
+    Sem token (ou com token expirado) devolve tudo com `full=true`. Blobs ficam de fora:
+    cada registro traz `has_documents`/`has_photo` e o conteúdo é baixado pelos endpoints
+    do próprio recurso.
+    """
+    from app.api.deps import get_user_family_ids
+
+    if (current_user.is_superuser or current_user.is_staff) and family_id is None:
+        family_ids = get_user_family_ids(current_user, db)
+    elif family_id is not None:
+        family_ids = [family_id]
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Família não especificada")
+
+    # Relógio do banco: o mesmo usado em sync_change/sync_tombstone
+    now = db.execute(select(func.now())).scalar()
+    since_time = decode_token(since) if since else None
+    if since_time is not None and (since_time.tzinfo is None) != (now.tzinfo is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de sincronização inválido")
+    if since_time is not None and since_time < now - timedelta(days=settings.SYNC_RETENTION_DAYS):
+        since_time = None
+    # Reenvia uma pequena janela: transações iniciadas antes do token podem ter sido confirmadas depois
+    cutoff = since_time - timedelta(seconds=settings.SYNC_TOKEN_OVERLAP_SECONDS) if since_time else None
+
+    changes = {}
+    for model in TRACKED_MODELS:
+        resource = resource_name(model)
+        query = select(*_sync_columns(model)).where(family_criterion(model, family_ids))
+        if cutoff is not None:
+            query = query.where(model.id.in_(
+                select(SyncChange.object_id).where(
+                    SyncChange.resource == resource,
+                    SyncChange.family_id.in_(family_ids),
+                    SyncChange.changed_at > cutoff,
+                )
+            ))
+        changes[resource] = [row_to_dict(model, row) for row in db.execute(query.order_by(model.id)).mappings()]
+
+    deleted = defaultdict(list)
+    if cutoff is not None:
+        tombstones = db.execute(
+            select(SyncTombstone.resource, SyncTombstone.object_id)
+            .where(SyncTombstone.family_id.in_(family_ids), SyncTombstone.deleted_at > cutoff)
+            .order_by(SyncTombstone.id)
+        )
+        for resource, object_id in tombstones:
+            deleted[resource].append(object_id)
+
+    return {
+        "token": encode_token(now),
+        "full": cutoff is None,
+        "changes": changes,
+        "deleted": dict(deleted),
+    }
@@ -1,6 +1,19 @@
-from fastapi import APIRouter
+import json
+from datetime import datetime, timedelta, timezone
 
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_admin
+from app.core.config import settings
+from app.core.profiler import collapsed, get_profile, list_profiles, speedscope
 from app.core.version import get_app_version_info
+from app.db.base import get_db
+from app.db.slow_queries import recent_slow_queries, top_offenders
+from app.models.system import SlowQueryLog
+from app.models.user import User
 
 router = APIRouter()
 
@@ -8,3 +21,70 @@ router = APIRouter()
 @router.get("/version")
 async def get_system_version():
     return get_app_version_info()
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    source: str = Query("memory", pattern="^(memory|table)$"),
+    hours: int = Query(24, ge=1, le=24 * 30),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Queries lentas agrupadas pelo SQL normalizado, ordenadas pelo tempo total (apenas admin).
+
+    source=memory lê o buffer deste processo/worker; source=table lê a tabela
+    system_slowquery (todos os workers, requer SLOW_QUERY_TABLE=true) nas últimas `hours` horas.
+    """
+    if source == "table":
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        rows = db.execute(
+            select(SlowQueryLog).where(SlowQueryLog.created_at >= since).order_by(SlowQueryLog.id.desc()).limit(5000)
+        ).scalars()
+        records = [
+            {
+                "sql": row.sql,
+                "params": json.loads(row.params) if row.params else None,
+                "duration_ms": row.duration_ms,
+                "route": row.route,
+                "family_id": row.family_id,
+                "plan": row.plan,
+                "created_at": row.created_at,
+            }
+            for row in rows
+        ]
+    else:
+        records = recent_slow_queries()
+
+    return {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "source": source,
+        "queries": top_offenders(records, limit),
+    }
+
+
+@router.get("/profiles")
+def list_request_profiles(current_user: User = Depends(get_current_admin)):
+    """Perfis de requisições (X-Profile: 1), do mais recente; sem as amostras (apenas admin)"""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def download_request_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed|raw)$"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Perfil completo: speedscope (abrir em speedscope.app), collapsed (flamegraph.pl) ou raw (apenas admin)"""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado")
+    if format == "collapsed":
+        samples = {tuple(stack): count for stack, count in profile["samples"]}
+        return PlainTextResponse(collapsed(samples))
+    if format == "speedscope":
+        return JSONResponse(
+            speedscope(profile),
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'},
+        )
+    return profile
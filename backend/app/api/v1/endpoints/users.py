@@ -1,19 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, insert, not_, select, update
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone
 from app.db.base import get_db
-from app.models.user import User, Profile
+from app.db.writes import insert_returning, update_returning
+from app.models.user import User, Profile, ApiToken
 from app.models.family import Family
-from app.schemas.user import User as UserSchema, UserWithProfile, ProfileUpdate, PasswordUpdate, UserCreate, PermissionsUpdate, UserUpdate, ApiTokenResponse
-from app.api.deps import get_current_user, get_current_admin
-from app.core.security import get_password_hash
+from app.schemas.user import User as UserSchema, UserWithProfile, ProfileUpdate, PasswordUpdate, UserCreate, PermissionsUpdate, UserUpdate, ApiTokenResponse, ApiTokenCreate, ApiTokenCreated, ApiTokenInfo
+from app.api.deps import get_current_user, get_current_admin, get_current_user_model
+from app.core.api_tokens import available_scopes, generate_api_token as new_api_token, normalize_scopes, parse_scopes
+from app.core.principals import Principal, bump_auth_version, mark_principal_changed
+from app.core.security import get_password_hash_async
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserWithProfile)
 async def read_user_me(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     db: Session = Depends(get_db)
 ):
     """Obter informações do usuário atual com perfil"""
@@ -32,7 +36,7 @@ async def read_user_me(
 @router.put("/me/profile", response_model=UserWithProfile)
 async def update_my_profile(
     profile_data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     db: Session = Depends(get_db)
 ):
     """Atualizar perfil do usuário atual"""
@@ -51,26 +55,94 @@ async def update_my_profile(
     
     return current_user
 
+API_TOKEN_COLUMNS = (ApiToken.id, ApiToken.name, ApiToken.prefix, ApiToken.scopes, ApiToken.created_at, ApiToken.last_used_at)
+
+def _token_info(row) -> dict:
+    return {**row._mapping, "scopes": list(parse_scopes(row.scopes))}
+
+def _create_api_token(db: Session, user_id: int, name: str, scopes: str) -> dict:
+    token, prefix, token_hash = new_api_token()
+    row = db.execute(
+        insert(ApiToken)
+        .values(user_id=user_id, name=name, prefix=prefix, token_hash=token_hash, scopes=scopes)
+        .returning(*API_TOKEN_COLUMNS)
+    ).one()
+    return {**_token_info(row), "api_token": token}
+
+def _revoke_api_tokens(db: Session, user_id: int, criteria: list) -> int:
+    """Apaga os tokens e invalida o principal em cache deles (auth_version) em todos os workers"""
+    deleted = db.execute(delete(ApiToken).where(ApiToken.user_id == user_id, *criteria)).rowcount
+    if deleted:
+        db.execute(update(User).where(User.id == user_id).values(**bump_auth_version()))
+        mark_principal_changed(db, [user_id])
+    return deleted
+
+@router.get("/me/api-tokens/scopes", response_model=List[str])
+async def list_api_token_scopes(
+    current_user: Principal = Depends(get_current_user)
+):
+    """Escopos disponíveis para tokens de API ("*" = mesmos acessos do usuário)"""
+    return available_scopes()
+
+@router.get("/me/api-tokens", response_model=List[ApiTokenInfo])
+async def list_api_tokens(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tokens de API do usuário atual (sem o token, que só aparece na criação)"""
+    rows = db.execute(
+        select(*API_TOKEN_COLUMNS).where(ApiToken.user_id == current_user.id).order_by(ApiToken.id)
+    ).all()
+    return [_token_info(row) for row in rows]
+
+@router.post("/me/api-tokens", response_model=ApiTokenCreated, status_code=status.HTTP_201_CREATED)
+async def create_api_token(
+    token_data: ApiTokenCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cria um token de API com os escopos pedidos. Use no header 'X-API-Token'."""
+    try:
+        scopes = normalize_scopes(token_data.scopes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    created = _create_api_token(db, current_user.id, token_data.name, scopes)
+    db.commit()
+    return created
+
+@router.delete("/me/api-tokens/{token_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_api_token(
+    token_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Revoga um token de API do usuário atual"""
+    if not _revoke_api_tokens(db, current_user.id, [ApiToken.id == token_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Token não encontrado"
+        )
+    db.commit()
+
 @router.post("/me/api-token", response_model=ApiTokenResponse)
 async def generate_api_token(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Gera ou regenera o token de API estático do usuário atual.
-    Use o token retornado no header 'X-API-Token' para autenticar requisições sem JWT."""
-    import secrets
-    new_token = secrets.token_urlsafe(48)
-    current_user.api_token = new_token
+    """Gera ou regenera o token de API do usuário atual, com todos os acessos.
+    Substitui os tokens com o nome padrão; tokens criados em /me/api-tokens são mantidos."""
+    _revoke_api_tokens(db, current_user.id, [ApiToken.name == "Token de API"])
+    created = _create_api_token(db, current_user.id, "Token de API", "*")
     db.commit()
-    return {"api_token": new_token}
+    return {"api_token": created["api_token"]}
 
 @router.delete("/me/api-token", status_code=status.HTTP_204_NO_CONTENT)
 async def revoke_api_token(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Revoga o token de API do usuário atual."""
-    current_user.api_token = None
+    """Revoga todos os tokens de API do usuário atual."""
+    _revoke_api_tokens(db, current_user.id, [])
     db.commit()
 
 @router.get("/", response_model=List[UserSchema])
@@ -82,14 +154,18 @@ async def list_users(
 ):
     """Listar todos os usuários (apenas administradores)"""
     from sqlalchemy.orm import joinedload
-    users = db.query(User).options(joinedload(User.families)).offset(skip).limit(limit).all()
+    # Famílias e perfil vêm na mesma query: nada de carregamento preguiçoso por usuário
+    users = (
+        db.query(User)
+        .options(joinedload(User.families), joinedload(User.profile))
+        .offset(skip).limit(limit).all()
+    )
     
     # Converter para dict e adicionar family_ids para admins
     result = []
     for user in users:
         # Carregar famílias se for admin
         if user.is_superuser:
-            db.refresh(user, ['families'])
             family_ids = [f.id for f in user.families] if user.families else []
             # Se não tiver famílias na relação many-to-many, usar family_id
             if not family_ids and user.family_id:
@@ -156,37 +232,33 @@ async def create_user(
             detail="É necessário fornecer family_id ou family_code"
         )
     
-    # Criar novo usuário
-    new_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        password=get_password_hash(user_data.password),
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        is_active=True,
-        is_staff=False,
-        is_superuser=False,
-        family_id=family_id,
-        date_joined=datetime.now(timezone.utc)
-    )
-    
+    password = await get_password_hash_async(user_data.password)
     try:
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        
-        # Criar perfil automaticamente
+        # Criar novo usuário
         now = datetime.now(timezone.utc)
-        profile = Profile(
-            user_id=new_user.id,
-            phone='',
-            address='',
-            city='',
-            state='',
-            created_at=now,
-            updated_at=now
-        )
-        db.add(profile)
+        new_user = insert_returning(db, User, {
+            "username": user_data.username,
+            "email": user_data.email,
+            "password": password,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "is_active": True,
+            "is_staff": False,
+            "is_superuser": False,
+            "family_id": family_id,
+            "date_joined": now,
+        })
+        
+        # Criar perfil automaticamente (mesma transação do usuário)
+        new_user["profile"] = insert_returning(db, Profile, {
+            "user_id": new_user["id"],
+            "phone": '',
+            "address": '',
+            "city": '',
+            "state": '',
+            "created_at": now,
+            "updated_at": now,
+        })
         db.commit()
         
         return new_user
@@ -209,17 +281,16 @@ async def update_user_password(
     current_user: User = Depends(get_current_admin)
 ):
     """Atualizar senha de um usuário (apenas administradores)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    # Atualizar senha
+    password = await get_password_hash_async(password_data.new_password)
+    user = update_returning(db, User, [User.id == user_id], {"password": password, **bump_auth_version()})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuário não encontrado"
         )
-    
-    # Atualizar senha
-    user.password = get_password_hash(password_data.new_password)
+    mark_principal_changed(db, [user_id])
     db.commit()
-    db.refresh(user)
     
     return user
 
@@ -230,23 +301,22 @@ async def toggle_user_active(
     current_user: User = Depends(get_current_admin)
 ):
     """Ativar/desativar usuário (apenas administradores)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
-        )
-    
     # Não permitir desativar a si mesmo
-    if user.id == current_user.id:
+    if user_id == current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Você não pode desativar sua própria conta"
         )
     
-    user.is_active = not user.is_active
+    # Inverte o status no próprio banco, sem carregar o usuário antes
+    user = update_returning(db, User, [User.id == user_id], {"is_active": not_(User.is_active), **bump_auth_version()})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
+    mark_principal_changed(db, [user_id])
     db.commit()
-    db.refresh(user)
     
     return user
 
@@ -332,12 +402,7 @@ async def update_user(
     current_user: User = Depends(get_current_admin)
 ):
     """Atualizar dados básicos de um usuário (apenas administradores)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuário não encontrado"
-        )
+    update_data = {}
     
     # Atualizar campos básicos
     if user_data.email is not None:
@@ -348,19 +413,28 @@ async def update_user(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email já está em uso por outro usuário"
             )
-        user.email = user_data.email
+        update_data["email"] = user_data.email
     
     if user_data.first_name is not None:
-        user.first_name = user_data.first_name
+        update_data["first_name"] = user_data.first_name
     
     if user_data.last_name is not None:
-        user.last_name = user_data.last_name
+        update_data["last_name"] = user_data.last_name
     
     # Nota: username não pode ser alterado por questões de segurança
     # Nota: password deve ser alterado através do endpoint específico /{user_id}/password
     
+    if update_data:
+        user = update_returning(db, User, [User.id == user_id], update_data)
+    else:
+        user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
+    
     db.commit()
-    db.refresh(user)
     return user
 
 @router.get("/{user_id}", response_model=UserSchema)
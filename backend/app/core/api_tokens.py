@@ -0,0 +1,154 @@
+"""
+Tokens de API (header X-API-Token): vários por usuário, cada um com escopos.
+
+O token tem o formato `gf_<aleatório>` e só é mostrado na criação. No banco ficam o
+SHA-256 (índice único: autenticar é uma consulta por igualdade) e o prefixo, para o
+usuário reconhecer o token na listagem.
+
+Escopos, por área da API (primeiro segmento depois de /api/v1):
+- `<área>:read` permite GET/HEAD/OPTIONS; `<área>:write` permite tudo na área;
+- `*` dá os mesmos acessos do usuário. Rotas fora de SCOPE_AREAS (usuários, famílias,
+  sistema, ...) exigem `*`.
+Os escopos só restringem o que o usuário já pode fazer, nunca ampliam.
+
+`last_used_at` não é gravado a cada requisição: os usos ficam em memória e uma thread
+por worker grava em lote a cada API_TOKEN_LAST_USED_FLUSH_SECONDS (um UPDATE por token
+usado no intervalo).
+"""
+import atexit
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "gf_"
+PREFIX_LENGTH = 10  # "gf_" + 7 caracteres exibidos na listagem
+FULL_ACCESS = "*"
+SCOPE_AREAS = ("dashboard", "finance", "healthcare", "maintenance", "sync", "telegram")
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def hash_api_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def generate_api_token() -> tuple[str, str, str]:
+    """(token, prefixo exibido, hash guardado)"""
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    return token, token[:PREFIX_LENGTH], hash_api_token(token)
+
+
+def available_scopes() -> list[str]:
+    return [FULL_ACCESS, *(f"{area}:{access}" for area in SCOPE_AREAS for access in ("read", "write"))]
+
+
+def normalize_scopes(scopes: Iterable[str]) -> str:
+    """Valida e serializa os escopos para a coluna (separados por vírgula)"""
+    requested = {scope.strip() for scope in scopes if scope and scope.strip()}
+    if not requested:
+        raise ValueError("Informe ao menos um escopo")
+    unknown = requested - set(available_scopes())
+    if unknown:
+        raise ValueError(f"Escopos inválidos: {', '.join(sorted(unknown))}")
+    if FULL_ACCESS in requested:
+        return FULL_ACCESS
+    return ",".join(sorted(requested))
+
+
+def parse_scopes(value: str) -> tuple[str, ...]:
+    return tuple(scope for scope in value.split(",") if scope)
+
+
+def scope_area(path: str) -> Optional[str]:
+    """Área da API de um path (/api/v1/finance/entries -> "finance")"""
+    if path.startswith(settings.API_V1_STR):
+        path = path[len(settings.API_V1_STR):]
+    return path.strip("/").split("/", 1)[0] or None
+
+
+def scope_allows(scopes: tuple[str, ...], method: str, path: str) -> bool:
+    if FULL_ACCESS in scopes:
+        return True
+    area = scope_area(path)
+    if area not in SCOPE_AREAS:
+        return False
+    if f"{area}:write" in scopes:
+        return True
+    return method.upper() in READ_METHODS and f"{area}:read" in scopes
+
+
+# ----- last_used_at em lote -----
+
+_pending: dict[int, datetime] = {}
+_pending_lock = threading.Lock()
+_flusher_pid: Optional[int] = None
+
+
+def record_use(token_id: int) -> None:
+    """Marca o uso do token (gravado no próximo lote)"""
+    with _pending_lock:
+        _pending[token_id] = datetime.now(timezone.utc)
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+
+
+def flush_last_used(session_factory=None) -> int:
+    """Grava os usos acumulados; devolve quantos tokens foram atualizados"""
+    from sqlalchemy import update
+
+    from app.db.base import SessionLocal
+    from app.models.user import ApiToken
+
+    with _pending_lock:
+        if not _pending:
+            return 0
+        pending = dict(_pending)
+        _pending.clear()
+    try:
+        with (session_factory or SessionLocal)() as db:
+            # UPDATE em lote por chave primária (executemany)
+            db.execute(update(ApiToken), [
+                {"id": token_id, "last_used_at": used_at} for token_id, used_at in pending.items()
+            ])
+            db.commit()
+    except Exception:
+        with _pending_lock:
+            for token_id, used_at in pending.items():
+                _pending.setdefault(token_id, used_at)  # Tenta de novo no próximo lote
+        raise
+    return len(pending)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(max(1, settings.API_TOKEN_LAST_USED_FLUSH_SECONDS))
+        try:
+            flush_last_used()
+        except Exception as e:
+            logger.warning(f"[API TOKEN] Falha ao gravar last_used_at: {e}")
+
+
+def _atexit_flush() -> None:
+    try:
+        flush_last_used()
+    except Exception as e:
+        logger.warning(f"[API TOKEN] Falha ao gravar last_used_at no encerramento: {e}")
+
+
+def _start_flusher() -> None:
+    """Uma thread por processo (com o gunicorn em preload, a do master não existe nos workers)"""
+    global _flusher_pid
+    with _pending_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name="api-token-last-used", daemon=True).start()
+    atexit.register(_atexit_flush)
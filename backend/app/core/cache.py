@@ -0,0 +1,383 @@
+"""
+Cache de respostas por família, invalidado por versão.
+
+Cada família tem um contador de versão. As chaves do cache incluem a versão atual
+das famílias envolvidas, então basta incrementar o contador (após o commit) para que
+todas as respostas antigas daquela família deixem de ser encontradas — não é preciso
+apagar nada; as entradas antigas expiram pelo TTL/LRU.
+
+Backends:
+- memory (padrão): LRU em memória do processo, com TTL. Só com um worker: com vários
+  (WEB_CONCURRENCY > 1, gunicorn), a versão incrementada num worker não invalidaria o
+  cache dos outros, então vira redis se CACHE_REDIS_URL estiver definida, senão none
+  (ver cache_backend).
+- redis: qualquer servidor que fale o protocolo RESP (Redis, KeyDB, Valkey, ...),
+  via um cliente mínimo por socket; as versões são compartilhadas entre os workers.
+- none: desabilitado.
+
+As versões são incrementadas em `after_commit` da Session para as famílias cujos
+registros foram alterados na transação (coletadas em `before_flush` para escritas via
+ORM e via `mark_families_changed` para escritas Core, ex.: app/db/writes.py).
+"""
+import hashlib
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+from urllib.parse import unquote, urlparse
+
+from pydantic_core import to_jsonable_python
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Chave em Session.info com as famílias alteradas na transação corrente
+CHANGED_FAMILIES_KEY = "cache_changed_families"
+
+KEY_PREFIX = "gf:"
+
+
+class MemoryCache:
+    """LRU em memória com TTL e versões por família (válido para um único processo)"""
+
+    def __init__(self, max_entries: int = 2000, ttl: int = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_versions(self, family_ids: list[int]) -> list[int]:
+        with self._lock:
+            return [self._versions.get(family_id, 0) for family_id in family_ids]
+
+    def bump_versions(self, family_ids: Iterable[int]) -> None:
+        with self._lock:
+            for family_id in family_ids:
+                self._versions[family_id] = self._versions.get(family_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+
+
+class RespError(Exception):
+    """Erro retornado pelo servidor RESP"""
+
+
+class RespClient:
+    """Cliente mínimo do protocolo RESP (Redis) sobre um único socket, com pipeline"""
+
+    def __init__(self, url: str, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip([("AUTH", self.password)])
+        if self.db:
+            self._roundtrip([("SELECT", self.db)])
+
+    def close(self) -> None:
+        # O makefile mantém uma referência ao socket: fecha os dois para liberar a conexão
+        for resource in (self._reader, self._sock):
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Conexão RESP encerrada pelo servidor")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RespError(f"Resposta RESP inválida: {line!r}")
+
+    def _roundtrip(self, commands: list[tuple]) -> list[Any]:
+        self._sock.sendall(b"".join(self._encode(command) for command in commands))
+        # Lê todas as respostas antes de propagar um erro, para não dessincronizar o pipeline
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(self._read_reply())
+            except RespError as exc:
+                error = error or exc
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def execute(self, *commands: tuple) -> list[Any]:
+        """Envia os comandos em pipeline e retorna as respostas na mesma ordem"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(list(commands))
+                except (OSError, ConnectionError):
+                    # Conexão ociosa derrubada pelo servidor: reconecta uma vez
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+
+class RedisCache:
+    """Backend RESP: respostas serializadas em JSON e versões via INCR (compartilhadas entre processos)"""
+
+    def __init__(self, url: str, ttl: int = 60):
+        self.client = RespClient(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            (raw,) = self.client.execute(("GET", KEY_PREFIX + key))
+        except (OSError, ConnectionError, RespError) as exc:
+            logger.warning(f"[CACHE] Falha ao ler do backend RESP: {exc}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        try:
+            self.client.execute(("SET", KEY_PREFIX + key, json.dumps(value), "EX", ttl or self.ttl))
+        except (OSError, ConnectionError, RespError) as exc:
+            logger.warning(f"[CACHE] Falha ao gravar no backend RESP: {exc}")
+
+    def get_versions(self, family_ids: list[int]) -> list[int]:
+        (raw,) = self.client.execute(("MGET", *(f"{KEY_PREFIX}ver:{family_id}" for family_id in family_ids)))
+        return [int(value) if value is not None else 0 for value in raw]
+
+    def bump_versions(self, family_ids: Iterable[int]) -> None:
+        self.client.execute(*(("INCR", f"{KEY_PREFIX}ver:{family_id}") for family_id in family_ids))
+
+    def clear(self) -> None:
+        self.client.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache_backend() -> str:
+    """Backend efetivo: CACHE_BACKEND, sem memory quando há mais de um worker"""
+    backend = settings.CACHE_BACKEND
+    if backend == "redis" and not settings.CACHE_REDIS_URL:
+        backend = "memory"
+    if backend == "memory" and settings.WEB_CONCURRENCY > 1:
+        # Cache por processo serviria respostas antigas nos outros workers até o TTL
+        return "redis" if settings.CACHE_REDIS_URL else "none"
+    return backend
+
+
+def get_cache():
+    """Retorna o backend configurado (cache_backend), ou None se desabilitado"""
+    global _cache
+    backend = cache_backend()
+    if _cache is None and backend != "none":
+        with _cache_lock:
+            if _cache is None:
+                if backend == "redis":
+                    _cache = RedisCache(settings.CACHE_REDIS_URL, ttl=settings.CACHE_TTL_SECONDS)
+                else:
+                    _cache = MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    return _cache
+
+
+def set_cache(cache) -> None:
+    """Substitui o backend (testes ou configuração manual)"""
+    global _cache
+    _cache = cache
+
+
+def make_key(namespace: str, family_ids: list[int], versions: list[int], params: dict) -> str:
+    """Chave = namespace + versão de cada família + hash dos parâmetros"""
+    scope = ",".join(f"{family_id}v{version}" for family_id, version in zip(family_ids, versions))
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{namespace}:{scope}:{digest}"
+
+
+def _lookup(namespace: str, family_ids: Iterable[Optional[int]], params: dict) -> tuple[Any, Optional[str], Any]:
+    """Retorna (backend, chave, valor em cache); backend None quando a resposta não deve ser cacheada.
+
+    As versões são lidas ANTES de executar o loader: se uma escrita acontecer durante o
+    cálculo, o resultado fica guardado sob a versão antiga e a próxima leitura recalcula.
+    """
+    cache = get_cache()
+    family_ids = sorted({family_id for family_id in family_ids if family_id})
+    if cache is None or not family_ids:
+        return None, None, None
+
+    try:
+        versions = cache.get_versions(family_ids)
+    except (OSError, ConnectionError, RespError) as exc:
+        logger.warning(f"[CACHE] Versões indisponíveis, ignorando cache: {exc}")
+        return None, None, None
+
+    key = make_key(namespace, family_ids, versions, params)
+    return cache, key, cache.get(key)
+
+
+def cached_response(
+    namespace: str,
+    family_ids: Iterable[Optional[int]],
+    params: dict,
+    loader: Callable[[], Any],
+) -> Any:
+    """Retorna a resposta do cache ou executa `loader` e guarda o resultado (já em formato JSON)."""
+    cache, key, value = _lookup(namespace, family_ids, params)
+    if value is not None:
+        return value
+
+    value = to_jsonable_python(loader())
+    if cache is not None:
+        cache.set(key, value)
+    return value
+
+
+async def cached_response_async(
+    namespace: str,
+    family_ids: Iterable[Optional[int]],
+    params: dict,
+    loader: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Igual a `cached_response`, para loaders assíncronos (endpoints com AsyncSession)."""
+    cache, key, value = _lookup(namespace, family_ids, params)
+    if value is not None:
+        return value
+
+    value = to_jsonable_python(await loader())
+    if cache is not None:
+        cache.set(key, value)
+    return value
+
+
+# ----- Invalidação -----
+
+def mark_families_changed(session: Session, family_ids: Iterable[Optional[int]]) -> None:
+    """Registra famílias alteradas na transação corrente (versão incrementada no commit)"""
+    changed = {family_id for family_id in family_ids if family_id}
+    if changed:
+        session.info.setdefault(CHANGED_FAMILIES_KEY, set()).update(changed)
+
+
+def resolve_family_id(session: Session, model, values: dict) -> Optional[int]:
+    """Descobre a família dona de um registro a partir dos valores das colunas.
+
+    Tabelas filhas sem family_id (anexos de equipamento, imagens de ordens) são
+    resolvidas pelo registro pai.
+    """
+    from app.models.family import Family
+    from app.models.healthcare import FamilyMember
+    from app.models.maintenance import Equipment, MaintenanceOrder
+
+    if model is Family:
+        return values.get("id")
+    if values.get("family_id"):
+        return values["family_id"]
+
+    with session.no_autoflush:
+        if values.get("family_member_id"):
+            return session.execute(
+                select(FamilyMember.family_id).where(FamilyMember.id == values["family_member_id"])
+            ).scalar()
+        if values.get("equipment_id"):
+            return session.execute(
+                select(Equipment.family_id).where(Equipment.id == values["equipment_id"])
+            ).scalar()
+        if values.get("maintenance_order_id"):
+            return session.execute(
+                select(MaintenanceOrder.family_id).where(MaintenanceOrder.id == values["maintenance_order_id"])
+            ).scalar()
+    return None
+
+
+_RESOLVABLE_COLUMNS = ("id", "family_id", "family_member_id", "equipment_id", "maintenance_order_id")
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_families(session, flush_context, instances):
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        values = {column: getattr(obj, column, None) for column in _RESOLVABLE_COLUMNS}
+        changed.add(resolve_family_id(session, type(obj), values))
+    mark_families_changed(session, changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_family_versions(session):
+    changed = session.info.pop(CHANGED_FAMILIES_KEY, None)
+    cache = get_cache()
+    if not changed or cache is None:
+        return
+    try:
+        cache.bump_versions(sorted(changed))
+    except (OSError, ConnectionError, RespError) as exc:
+        logger.error(f"[CACHE] Falha ao invalidar famílias {sorted(changed)}: {exc}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_families(session):
+    session.info.pop(CHANGED_FAMILIES_KEY, None)
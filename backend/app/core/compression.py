@@ -0,0 +1,234 @@
+"""
+Compressão das respostas: gzip, ou brotli quando o pacote `brotli` está instalado.
+
+Middleware ASGI, negociado pelo Accept-Encoding (br antes de gzip; q=0 recusa):
+- passam direto: respostas abaixo de COMPRESSION_MIN_SIZE bytes, já codificadas
+  (Content-Encoding), sem corpo (204/304, HEAD) e de tipos já comprimidos (imagens, PDF,
+  zip, áudio/vídeo) ou de streaming contínuo (text/event-stream);
+- corpo numa mensagem só: comprimido de uma vez (em thread acima de THREAD_MIN_SIZE, para
+  não travar o event loop);
+- streaming (StreamingResponse, `more_body`): comprimido por partes, sem Content-Length.
+
+Os bytes comprimidos de respostas com ETag ficam num LRU por processo
+(COMPRESSION_CACHE_MB), com chave (codificação, ETag, hash do corpo): listagens quentes são
+comprimidas uma vez por versão. O hash do corpo (blake2b, bem mais barato que comprimir)
+garante que um ETag repetido com outro conteúdo nunca devolve bytes de outra resposta. Os
+ETags das listagens são fracos (app/utils/conditional_get.py) e continuam valendo para a
+resposta comprimida.
+"""
+import asyncio
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # Dependência opcional: sem ela, só gzip
+    brotli = None
+
+# Corpos maiores que isto são comprimidos fora do event loop
+THREAD_MIN_SIZE = 256 * 1024
+# Tipos que já vêm comprimidos ou não podem ser bufferizados
+SKIP_CONTENT_TYPES = (
+    "image/", "video/", "audio/", "font/woff",
+    "application/pdf", "application/zip", "application/gzip", "application/x-gzip",
+    "application/x-7z-compressed", "application/x-rar-compressed", "application/octet-stream",
+    "text/event-stream",
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Codificação a usar, pela preferência do servidor entre as aceitas pelo cliente"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Interface comum de gzip (zlib) e brotli para compressão por partes"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._engine = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self.compress, self._finish = self._engine.process, self._engine.finish
+        else:
+            # wbits=31: formato gzip, sem nome nem data no cabeçalho (saída determinística)
+            self._engine = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self._finish = self._engine.compress, self._engine.flush
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    compressor = _Compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+class CompressedCache:
+    """LRU por tamanho total (bytes comprimidos)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+compressed_cache = CompressedCache(settings.COMPRESSION_CACHE_MB * 1024 * 1024)
+
+
+async def _compress_body(body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+    key = None
+    if etag and compressed_cache.max_bytes > 0:
+        key = f"{encoding}:{etag}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+        cached = compressed_cache.get(key)
+        if cached is not None:
+            return cached
+    if len(body) >= THREAD_MIN_SIZE:
+        compressed = await asyncio.to_thread(compress, body, encoding)
+    else:
+        compressed = compress(body, encoding)
+    if key is not None:
+        compressed_cache.set(key, compressed)
+    return compressed
+
+
+def _should_skip(message: dict) -> bool:
+    """Decide no início da resposta, só pelos headers"""
+    if message["status"] in (204, 304) or message["status"] < 200:
+        return True
+    headers = Headers(raw=message["headers"])
+    if "content-encoding" in headers:
+        return True
+    content_type = headers.get("content-type", "").lower()
+    if content_type.startswith(SKIP_CONTENT_TYPES):
+        return True
+    length = headers.get("content-length")
+    return length is not None and length.isdigit() and int(length) < settings.COMPRESSION_MIN_SIZE
+
+
+class _CompressingSend:
+    """`send` de uma requisição: segura o início da resposta até saber se comprime"""
+
+    def __init__(self, send, encoding: str):
+        self.send = send
+        self.encoding = encoding
+        self.start: Optional[dict] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    def _encoded_headers(self, length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+
+    async def __call__(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = _should_skip(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None and not more_body:
+            # Corpo inteiro numa mensagem (JSONResponse etc.)
+            if len(body) < settings.COMPRESSION_MIN_SIZE:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            etag = Headers(raw=self.start["headers"]).get("etag")
+            compressed = await _compress_body(body, self.encoding, etag)
+            self._encoded_headers(len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.compressor is None:
+            # Streaming: comprime por partes, sem Content-Length
+            self.compressor = _Compressor(self.encoding)
+            self._encoded_headers(None)
+            await self.send(self.start)
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    """Middleware ASGI de compressão (ver docstring do módulo)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding))
@@ -11,19 +11,108 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # Réplicas de leitura (opcional, URLs separadas por vírgula): usadas pelos endpoints de relatório/listagem
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_STICKY_SECONDS: int = 10  # Após uma escrita, o usuário lê do primário por esse tempo
     
     # Database Pool Settings (opcional - valores padrão otimizados)
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_RECYCLE: int = 3600  # 1 hora
+    # DB_POOL_SIZE=0: sem pool no processo (NullPool), cada sessão abre/fecha a conexão (útil atrás do PgBouncer)
+    # Verificação de conexão: pre_ping testa a cada checkout; DB_PING_IDLE_SECONDS > 0 substitui o
+    # pre_ping e só testa conexões que ficaram ociosas no pool por mais que isso
+    DB_POOL_PRE_PING: bool = True
+    DB_PING_IDLE_SECONDS: int = 0
+    # PgBouncer em pool_mode=transaction: desliga prepared statements nomeados do asyncpg
+    DB_PGBOUNCER: bool = False
+    # Workers do servidor (definido pelo gunicorn.conf.py). DB_POOL_SIZE e DB_MAX_OVERFLOW são o
+    # orçamento total da instância: cada worker (e cada servidor, primário e réplicas) recebe uma
+    # fração, dividida entre os engines sync (3/4) e async (1/4) (app/db/base.py:pool_limits)
+    WEB_CONCURRENCY: int = 1
+    # Conexões mínimas por worker e servidor: abaixo disso a inicialização falha (e o
+    # gunicorn.conf.py reduz o número automático de workers para caber no DB_POOL_SIZE)
+    DB_POOL_MIN_PER_WORKER: int = 4
     
+    # Startup: verifica se o banco está na última migração (uma consulta). Desligar pula a verificação
+    DB_SCHEMA_CHECK: bool = True
+
     # Debug SQL (desabilitado por padrão para performance)
     SQL_DEBUG: bool = False
+    # Contagem de queries por requisição: header Server-Timing e aviso de N+1 no log (app/db/query_stats.py)
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_REPEAT_THRESHOLD: int = 5  # Mesmo statement repetido N vezes na requisição = suspeita de N+1
+    # Queries lentas (app/db/slow_queries.py): limite em ms (0 desliga), buffer por processo, tabela opcional
+    SLOW_QUERY_MS: int = 500
+    SLOW_QUERY_BUFFER_SIZE: int = 500
+    SLOW_QUERY_TABLE: bool = False
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = 0.0  # Fração dos SELECTs lentos com EXPLAIN (ANALYZE, BUFFERS) (Postgres)
+    # Logging em fila, escrito por uma thread (app/core/logging_setup.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # Níveis por módulo: "app.api.v1.endpoints.healthcare=DEBUG,sqlalchemy.engine=INFO"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_FILE: str = ""  # Arquivo com rotação (ex.: app_debug.log); vazio: apenas stdout
+    LOG_FILE_MAX_MB: int = 20
+    LOG_FILE_BACKUPS: int = 3
+    # Linha de log por requisição: fração amostrada das respostas rápidas e sem erro (erros e lentas sempre)
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0
+    LOG_SLOW_REQUEST_MS: int = 1000
+    
+    # Profiler por amostragem para admins (X-Profile: 1, app/core/profiler.py)
+    PROFILE_INTERVAL_MS: int = 5
+    PROFILE_STORE_SIZE: int = 50
+    PROFILE_DIR: str = ""  # Perfis em disco, visíveis de todos os workers (definido pelo gunicorn.conf.py)
+    
+    # Métricas Prometheus em GET /metrics (app/core/metrics.py); METRICS_TOKEN exige "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    METRICS_DIR: str = ""  # Snapshots por worker somados no /metrics (definido pelo gunicorn.conf.py)
+    METRICS_FLUSH_SECONDS: int = 5
+    
+    # Cache de respostas por família (ver app/core/cache.py)
+    CACHE_BACKEND: str = "memory"  # memory | redis | none
+    CACHE_REDIS_URL: Optional[str] = None  # ex: redis://localhost:6379/0 (obrigatório para CACHE_BACKEND=redis)
+    CACHE_MAX_ENTRIES: int = 2000
+    CACHE_TTL_SECONDS: int = 60
+    # Listagens grandes (lançamentos, consultas, procedimentos, ordens) por SELECT de colunas + orjson,
+    # sem ORM nem revalidação pelo response_model (app/utils/fast_json.py)
+    FAST_LIST_RESPONSES: bool = False
+    # Compressão das respostas (app/core/compression.py): gzip, ou brotli se o pacote estiver instalado
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Bytes; respostas menores vão sem compressão
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; acima de 5 o custo de CPU cresce rápido
+    COMPRESSION_CACHE_MB: int = 32  # Bytes comprimidos de respostas com ETag, por processo; 0 desliga
+    # Usuário autenticado em cache por processo (app/core/principals.py); 0 desliga
+    PRINCIPAL_CACHE_TTL: int = 30  # Também o atraso máximo para mudanças de permissão valerem nos outros workers
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    # Tokens de API (app/core/api_tokens.py): intervalo de gravação em lote do last_used_at
+    API_TOKEN_LAST_USED_FLUSH_SECONDS: int = 60
+    # Senhas (app/core/security.py): custo do bcrypt; hashes com outro custo são refeitos no próximo login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # Threads por worker para hash/verificação (fora do event loop)
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Acima disso (rodando + na fila), 503 com Retry-After
+    
+    # Sincronização incremental (GET /sync)
+    SYNC_TOKEN_OVERLAP_SECONDS: int = 60  # Janela reenviada a cada sync (transações em andamento na emissão do token)
+    SYNC_RETENTION_DAYS: int = 90  # Tokens mais antigos recebem sync completo (tombstones podem ter sido removidos)
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens com rotação (app/core/refresh_tokens.py): POST /auth/refresh renova sem senha
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 30  # Reuso dentro da janela só é recusado; depois, revoga a sessão
+    # Limite de tentativas em /auth (app/core/rate_limit.py): "capacidade/segundos" por IP ou username
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis (usa CACHE_REDIS_URL; compartilhado entre workers)
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/60"
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = "5/60"
+    RATE_LIMIT_REGISTER_PER_IP: str = "5/600"
+    RATE_LIMIT_REFRESH_PER_IP: str = "60/60"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # true atrás de proxy reverso que define X-Forwarded-For
+    RATE_LIMIT_MAX_KEYS: int = 100000
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -0,0 +1,131 @@
+"""
+Configuração de logging sem I/O no event loop.
+
+Os handlers da aplicação só colocam o registro em uma fila (QueueHandler); uma thread
+(QueueListener) formata e escreve no stdout e, opcionalmente, em arquivo com rotação por
+tamanho. Saída em JSON (LOG_FORMAT=json) com os campos passados em `extra=` (ex.:
+`query_stats`), ou texto.
+
+Níveis por módulo em LOG_LEVELS, ex.: "app.api.v1.endpoints.healthcare=DEBUG,sqlalchemy.engine=INFO".
+
+Com o gunicorn (preload), a thread do master não existe nos workers: a fila e o listener
+são recriados no primeiro log de cada processo. A rotação do arquivo não é segura com
+vários processos escrevendo nele; em produção o gunicorn.conf.py loga apenas no stdout.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from app.core.config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Atributos padrão do LogRecord: o restante veio de `extra=` e vai para o JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """QueueHandler com o listener (thread) criado por processo, no primeiro registro"""
+
+    def __init__(self, handlers: list[logging.Handler]):
+        super().__init__(queue.SimpleQueue())
+        self.targets = handlers
+        self.listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Fila nova: a do master pode ter ficado com o lock interno preso no fork
+            self.queue = queue.SimpleQueue()
+            self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.stop)
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """Drena a fila e encerra a thread deste processo (também no atexit)"""
+        with self._start_lock:
+            listener, self.listener = self.listener, None
+            if listener is not None and self._pid == os.getpid():
+                listener.stop()
+            self._pid = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mensagem e traceback resolvidos aqui (args podem mudar depois); formatação final no listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        self.queue.put_nowait(record)
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """Converte LOG_LEVELS ("modulo=NIVEL,outro=NIVEL") em {"modulo": "NIVEL", ...}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> BackgroundQueueHandler:
+    """Substitui os handlers do root logger pelo handler em fila"""
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    targets: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        targets.append(RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=settings.LOG_FILE_MAX_MB * 1024 * 1024,
+            backupCount=settings.LOG_FILE_BACKUPS,
+            encoding="utf-8",
+        ))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    handler = BackgroundQueueHandler(targets)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    return handler
@@ -0,0 +1,463 @@
+"""
+Métricas no formato de texto do Prometheus (GET /metrics), sem dependências externas.
+
+Tipos: Counter, Gauge e Histogram com labels; os valores ficam em memória, protegidos
+por lock (endpoints síncronos rodam no threadpool). As métricas da aplicação estão
+definidas no fim deste módulo:
+- requisições HTTP por rota *templated* (`/api/v1/finance/entries/{entry_id}`, nunca a
+  URL crua): total, latência e erros, além das requisições em andamento (MetricsMiddleware);
+- espera no checkout do pool de conexões (app/db/base.py);
+- latência dos provedores de IA por provedor/modelo (observe_ai_call);
+- tempo de processamento de imagens com Pillow (thumbnails, compressão de comprovantes);
+- espera na fila e duração do bcrypt (app/core/security.py);
+- tentativas liberadas/limitadas nos endpoints de autenticação (app/core/rate_limit.py).
+
+Com vários workers do gunicorn, cada processo tem os seus valores e o scrape cai em um
+worker qualquer. Com METRICS_DIR definido (o gunicorn.conf.py define), cada worker grava
+um snapshot em `METRICS_DIR/metrics_<pid>.json` a cada METRICS_FLUSH_SECONDS e o /metrics
+soma os snapshots de todos os workers. Quando um worker termina (ex.: reciclado por
+max_requests), o master (hook child_exit do gunicorn) soma os counters e histogramas dele
+em `METRICS_DIR/exited_workers.json` e apaga o snapshot: os arquivos não se acumulam e
+um PID reaproveitado não sobrescreve (nem "zera") os valores do worker anterior. Gauges
+contam apenas de processos vivos.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from uuid import uuid4
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Segundos: de respostas em cache (ms) a análises de comprovante por IA (dezenas de s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, "_Metric"] = {}
+
+    def register(self, metric: "_Metric") -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self) -> dict[str, dict]:
+        """Valores atuais: {métrica: {(valores dos labels): valor}}"""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Optional[Registry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Valor por labels: [contagem por bucket (não cumulativa) + overflow, soma, total]"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observa a duração (s) do bloco, inclusive quando ele levanta exceção"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+# ----- Exposição -----
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(snapshot: dict[str, dict], registry: Registry = REGISTRY) -> str:
+    """Formato de texto do Prometheus (version 0.0.4)"""
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(snapshot.get(name, {}).items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip((*metric.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                bucket_labels = _labels((*metric.labelnames, "le"), (*key, _number(bound)))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def merge(snapshots: Iterable[dict[str, dict]], registry: Registry = REGISTRY) -> dict[str, dict]:
+    """Soma snapshots de vários processos (counters, gauges e histogramas)"""
+    merged: dict[str, dict] = {name: {} for name in registry.metrics}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            metric = registry.metrics.get(name)
+            if metric is None:
+                continue  # Métrica removida em outra versão do código
+            target = merged[name]
+            for key, value in values.items():
+                current = target.get(key)
+                if current is None:
+                    target[key] = [list(value[0]), value[1], value[2]] if metric.kind == "histogram" else value
+                elif metric.kind == "histogram":
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    target[key] = current + value
+    return merged
+
+
+# ----- Vários workers (METRICS_DIR) -----
+
+_flusher_lock = threading.Lock()
+_flusher_pid: Optional[int] = None
+
+
+# Identifica o processo no snapshot (o PID pode ser reaproveitado por um worker novo)
+WORKER_KEY = "_worker"
+# Agregado dos workers encerrados e os últimos workers já somados nele
+EXITED_FILE = "exited_workers.json"
+FOLDED_KEY = "_folded"
+FOLDED_HISTORY = 64
+
+_worker = (None, "")
+
+
+def _worker_id() -> str:
+    global _worker
+    if _worker[0] != os.getpid():
+        _worker = (os.getpid(), f"{os.getpid()}-{uuid4().hex[:8]}")
+    return _worker[1]
+
+
+def _snapshot_path(directory: str, pid: int) -> Path:
+    return Path(directory) / f"metrics_{pid}.json"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Escrita atômica: o leitor nunca vê arquivo pela metade"""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _encode(snapshot: dict[str, dict]) -> dict:
+    return {name: [[list(key), value] for key, value in values.items()] for name, values in snapshot.items()}
+
+
+def _decode(data: dict) -> dict[str, dict]:
+    return {name: {tuple(key): value for key, value in values} for name, values in data.items()}
+
+
+def write_snapshot(directory: str) -> None:
+    """Grava o snapshot deste processo"""
+    data = _encode(REGISTRY.snapshot())
+    data[WORKER_KEY] = _worker_id()
+    _write_json(_snapshot_path(directory, os.getpid()), data)
+
+
+def _read_snapshot(path: Path) -> tuple[Optional[str], dict[str, dict]]:
+    data = json.loads(path.read_text())
+    worker = data.pop(WORKER_KEY, None)
+    return worker, _decode(data)
+
+
+def _read_exited(directory: str) -> tuple[list[str], dict[str, dict]]:
+    path = Path(directory) / EXITED_FILE
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return [], {}
+    folded = data.pop(FOLDED_KEY, [])
+    return folded, _decode(data)
+
+
+def _cumulative(snapshot: dict[str, dict]) -> dict[str, dict]:
+    """Só counters e histogramas (gauges de processo encerrado não valem mais)"""
+    return {name: values for name, values in snapshot.items()
+            if name in REGISTRY.metrics and REGISTRY.metrics[name].kind != "gauge"}
+
+
+def fold_exited_worker(directory: str, pid: int) -> None:
+    """Soma o snapshot de um worker encerrado no agregado e apaga o arquivo dele.
+
+    Chamado pelo master do gunicorn (child_exit), um worker por vez. O agregado é gravado
+    antes de o snapshot ser apagado e registra o worker em FOLDED_KEY, para que um scrape
+    no meio do caminho não conte o worker duas vezes.
+    """
+    path = _snapshot_path(directory, pid)
+    try:
+        worker, snapshot = _read_snapshot(path)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"[METRICS] Snapshot ilegível {path.name} descartado: {e}")
+        path.unlink(missing_ok=True)
+        return
+    folded, exited = _read_exited(directory)
+    data = _encode(merge([exited, _cumulative(snapshot)]))
+    data[FOLDED_KEY] = (folded + [worker])[-FOLDED_HISTORY:] if worker else folded
+    _write_json(Path(directory) / EXITED_FILE, data)
+    path.unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _flush_loop(directory: str) -> None:
+    while True:
+        time.sleep(max(1, settings.METRICS_FLUSH_SECONDS))
+        try:
+            write_snapshot(directory)
+        except Exception as e:
+            logger.warning(f"[METRICS] Falha ao gravar snapshot: {e}")
+
+
+def start_flusher() -> None:
+    """Inicia a gravação periódica do snapshot (uma thread por worker; no-op sem METRICS_DIR)"""
+    global _flusher_pid
+    directory = settings.METRICS_DIR
+    if not directory or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=_flush_loop, args=(directory,), name="metrics-flusher", daemon=True).start()
+        atexit.register(write_snapshot, directory)
+        _flusher_pid = os.getpid()
+
+
+def exposition() -> str:
+    """Texto do /metrics: este processo + snapshots dos demais workers (METRICS_DIR)"""
+    snapshots = [REGISTRY.snapshot()]
+    directory = settings.METRICS_DIR
+    if directory and os.path.isdir(directory):
+        workers = []
+        for path in Path(directory).glob("metrics_*.json"):
+            pid = int(path.stem.split("_", 1)[1])
+            if pid == os.getpid():
+                continue
+            try:
+                workers.append((pid, *_read_snapshot(path)))
+            except FileNotFoundError:
+                continue  # Somado ao agregado (fold_exited_worker) depois do glob
+            except (OSError, ValueError) as e:
+                logger.warning(f"[METRICS] Snapshot ilegível {path.name}: {e}")
+        # Lido por último: inclui todo worker cujo snapshot sumiu depois do glob
+        folded, exited = _read_exited(directory)
+        snapshots.append(exited)
+        for pid, worker, snapshot in workers:
+            if worker in folded:
+                continue
+            snapshots.append(snapshot if _alive(pid) else _cumulative(snapshot))
+    return render(merge(snapshots))
+
+
+# ----- Middleware HTTP -----
+
+def route_template(scope) -> str:
+    """Caminho da rota (com {parâmetros}) que atendeu a requisição; 'unmatched' para 404.
+
+    Lido depois do roteamento: o APIRoute do FastAPI grava a si mesmo em scope["route"]
+    (sem varrer a lista de rotas a cada requisição).
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:  # Rotas do Starlette sem parâmetros (docs/openapi)
+        return scope["path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: contagem, latência e erros por rota; requisições em andamento por método"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_flusher()
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method=method)
+        started = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            HTTP_IN_PROGRESS.dec(method=method)
+            route = route_template(scope)
+            if error is None and status["code"] >= 500:
+                error = str(status["code"])
+            if error is not None:
+                HTTP_ERRORS.inc(method=method, route=route, error=error)
+            HTTP_DURATION.observe(duration, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status["code"]))
+
+
+@contextmanager
+def observe_ai_call(provider: str, model: str, operation: str) -> Iterator[None]:
+    """Latência de uma chamada ao provedor de IA, com resultado ok/error"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        AI_REQUEST_DURATION.observe(
+            time.perf_counter() - started, provider=provider, model=model, operation=operation, outcome=outcome,
+        )
+
+
+# ----- Métricas da aplicação -----
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requisições HTTP concluídas", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route"))
+# Por método: a rota só é conhecida depois do roteamento
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requisições HTTP em andamento", ("method",))
+HTTP_ERRORS = Counter(
+    "http_request_errors_total", "Respostas 5xx e exceções não tratadas (error = status ou exceção)",
+    ("method", "route", "error"),
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds", "Espera para obter uma conexão do pool (inclui abrir conexão nova)", ("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds", "Latência das chamadas aos provedores de IA",
+    ("provider", "model", "operation", "outcome"),
+)
+IMAGE_PROCESSING = Histogram(
+    "image_processing_seconds", "Tempo de processamento de imagens com Pillow", ("operation",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds", "Espera na fila do pool de hashing de senhas", ("operation",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_seconds", "Duração do bcrypt (hash ou verificação)", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Operações recusadas com 503 por excesso de fila", ("operation",),
+)
+RATE_LIMIT_REQUESTS = Counter(
+    "rate_limit_requests_total", "Decisões do limite de tentativas (outcome = allowed ou limited)", ("rule", "outcome"),
+)
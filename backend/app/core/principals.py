@@ -0,0 +1,270 @@
+"""
+Cache do usuário autenticado (principal) por processo.
+
+`get_current_user` (app/api/deps.py) carregava o usuário com as famílias (JOIN) em toda
+requisição. Agora guarda um registro compacto — id, flags, famílias acessíveis, ativo —
+por PRINCIPAL_CACHE_TTL segundos, com chave pelo id do usuário (JWT) ou pelo hash do
+token de API (o token em si nunca fica em memória). O principal de um token de API leva
+também o id e os escopos do token (app/core/api_tokens.py).
+
+Invalidação:
+- `auth_user.auth_version` é incrementado sempre que permissões, ativação, senha ou
+  famílias mudam, ou um token de API é revogado: automaticamente em flushes do ORM (before_flush) e
+  com `bump_auth_version()` em UPDATEs diretos (app/db/writes.py);
+- no commit, as entradas do usuário são descartadas neste processo;
+- nos demais workers, a entrada vencida é revalidada com uma consulta só da versão (sem
+  JOIN): se a versão mudou, o usuário é recarregado. Mudanças levam no máximo
+  PRINCIPAL_CACHE_TTL segundos para valer em todos os workers.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+
+# Chave em Session.info com os usuários alterados na transação corrente
+CHANGED_USERS_KEY = "principal_changed_users"
+# Atributos de User que mudam o que o principal pode acessar
+WATCHED_ATTRIBUTES = ("password", "is_active", "is_superuser", "is_staff", "family_id", "families")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuário autenticado, com os atributos usados pelos endpoints (id, flags, famílias)"""
+    id: int
+    username: str
+    is_superuser: bool
+    is_staff: bool
+    is_active: bool
+    family_id: Optional[int]
+    family_ids: tuple[int, ...]
+    auth_version: int
+    # Autenticado por token de API: id e escopos do token (None = JWT, sem restrição)
+    token_id: Optional[int] = None
+    scopes: Optional[tuple[str, ...]] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        if user.is_superuser:
+            family_ids = [family.id for family in user.families]
+            if not family_ids and user.family_id:
+                family_ids = [user.family_id]
+        else:
+            family_ids = [user.family_id] if user.family_id else []
+        return cls(
+            id=user.id,
+            username=user.username,
+            is_superuser=bool(user.is_superuser),
+            is_staff=bool(user.is_staff),
+            is_active=bool(user.is_active),
+            family_id=user.family_id,
+            family_ids=tuple(family_ids),
+            auth_version=user.auth_version or 0,
+        )
+
+
+class PrincipalCache:
+    """LRU com TTL; cada entrada guarda quando foi validada pela última vez"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[float, Principal]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key: str, principal: Principal) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), principal)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard_users(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        with self._lock:
+            for key in [key for key, (_, principal) in self._data.items() if principal.id in user_ids]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE)
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def token_key(api_token: str) -> str:
+    return "token:" + hashlib.sha256(api_token.encode()).hexdigest()
+
+
+def _token_query(api_token: str):
+    from app.core.api_tokens import hash_api_token
+    from app.models.user import ApiToken
+
+    return select(ApiToken.id, ApiToken.user_id, ApiToken.scopes).where(ApiToken.token_hash == hash_api_token(api_token))
+
+
+def _with_token(key: str, principal: Optional[Principal], token) -> Optional[Principal]:
+    from app.core.api_tokens import parse_scopes
+
+    if principal is None:
+        return None
+    principal = replace(principal, token_id=token.id, scopes=parse_scopes(token.scopes))
+    if settings.PRINCIPAL_CACHE_TTL > 0:
+        principal_cache.set(key, principal)
+    return principal
+
+
+def _cached(key: str) -> tuple[Optional[Principal], bool]:
+    """(principal em cache, ainda dentro do TTL)"""
+    if settings.PRINCIPAL_CACHE_TTL <= 0:
+        return None, False
+    item = principal_cache.get(key)
+    if item is None:
+        return None, False
+    validated_at, principal = item
+    return principal, time.monotonic() - validated_at < settings.PRINCIPAL_CACHE_TTL
+
+
+def _remember(key: str, user) -> Optional[Principal]:
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    if settings.PRINCIPAL_CACHE_TTL > 0:
+        principal_cache.set(key, principal)
+    return principal
+
+
+def _user_query(criteria: list):
+    from app.models.user import User
+
+    return select(User).options(joinedload(User.families)).where(*criteria)
+
+
+def _version_query(principal: Principal):
+    from app.models.user import User
+
+    return select(User.auth_version).where(User.id == principal.id)
+
+
+def load_principal(db: Session, key: str, criteria: list) -> Optional[Principal]:
+    """Principal do cache, revalidado pela versão após o TTL, ou carregado com as famílias"""
+    principal, fresh = _cached(key)
+    if principal is not None:
+        if fresh:
+            return principal
+        if db.execute(_version_query(principal)).scalar() == principal.auth_version:
+            principal_cache.set(key, principal)
+            return principal
+    return _remember(key, db.execute(_user_query(criteria)).unique().scalars().first())
+
+
+def load_token_principal(db: Session, api_token: str) -> Optional[Principal]:
+    """Principal de um token de API: uma consulta pelo hash (índice único) e o usuário pelo cache"""
+    from app.models.user import User
+
+    key = token_key(api_token)
+    principal, fresh = _cached(key)
+    if principal is not None:
+        if fresh:
+            return principal
+        if db.execute(_version_query(principal)).scalar() == principal.auth_version:
+            principal_cache.set(key, principal)
+            return principal
+    token = db.execute(_token_query(api_token)).first()
+    if token is None:
+        return None
+    return _with_token(key, load_principal(db, user_key(token.user_id), [User.id == token.user_id]), token)
+
+
+async def load_principal_async(db, key: str, criteria: list) -> Optional[Principal]:
+    """Igual a `load_principal`, com AsyncSession"""
+    principal, fresh = _cached(key)
+    if principal is not None:
+        if fresh:
+            return principal
+        if (await db.execute(_version_query(principal))).scalar() == principal.auth_version:
+            principal_cache.set(key, principal)
+            return principal
+    return _remember(key, (await db.execute(_user_query(criteria))).unique().scalars().first())
+
+
+async def load_token_principal_async(db, api_token: str) -> Optional[Principal]:
+    """Igual a `load_token_principal`, com AsyncSession"""
+    from app.models.user import User
+
+    key = token_key(api_token)
+    principal, fresh = _cached(key)
+    if principal is not None:
+        if fresh:
+            return principal
+        if (await db.execute(_version_query(principal))).scalar() == principal.auth_version:
+            principal_cache.set(key, principal)
+            return principal
+    token = (await db.execute(_token_query(api_token))).first()
+    if token is None:
+        return None
+    principal = await load_principal_async(db, user_key(token.user_id), [User.id == token.user_id])
+    return _with_token(key, principal, token)
+
+
+# ----- Invalidação -----
+
+def bump_auth_version() -> dict:
+    """Valores para incluir em UPDATEs diretos de auth_user que mudam o acesso do usuário"""
+    from app.models.user import User
+
+    return {"auth_version": User.auth_version + 1}
+
+
+def mark_principal_changed(session: Session, user_ids: Iterable[Optional[int]]) -> None:
+    """Registra usuários alterados na transação corrente (cache descartado no commit)"""
+    changed = {user_id for user_id in user_ids if user_id}
+    if changed:
+        session.info.setdefault(CHANGED_USERS_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_users(session, flush_context, instances):
+    from sqlalchemy import inspect
+
+    from app.models.user import User
+
+    for user in session.dirty:
+        if not isinstance(user, User):
+            continue
+        state = inspect(user)
+        if any(state.attrs[name].history.has_changes() for name in WATCHED_ATTRIBUTES):
+            user.auth_version = User.auth_version + 1
+            mark_principal_changed(session, [user.id])
+    for user in session.deleted:
+        if isinstance(user, User):
+            mark_principal_changed(session, [user.id])
+
+
+@event.listens_for(Session, "after_commit")
+def _discard_changed_users(session):
+    changed = session.info.pop(CHANGED_USERS_KEY, None)
+    if changed:
+        principal_cache.discard_users(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
@@ -0,0 +1,310 @@
+"""
+Profiler por amostragem, sob demanda, para requisições de administradores.
+
+Um admin envia o header `X-Profile: 1` (ou `?_profile=1`); só essa requisição é
+perfilada. Uma thread lê as pilhas de execução (`sys._current_frames()`) a cada
+PROFILE_INTERVAL_MS — sem instrumentar chamadas, o custo não depende do código perfilado.
+Cada amostra recebe uma categoria pela pilha: [db] (SQLAlchemy/drivers), [ai] (clientes
+dos provedores), [serialization] (pydantic/json/encoders) ou [app]; no thread do event
+loop, a espera por I/O de endpoints async aparece como [await]. O total e o tempo exato
+no banco (contagem de queries, app/db/query_stats.py) acompanham o perfil.
+
+O perfil fica em um store limitado (PROFILE_STORE_SIZE; em disco em PROFILE_DIR quando
+definido, para ser visto de qualquer worker) e o id volta no header `X-Profile-Id`.
+GET /system/profiles lista e GET /system/profiles/{id}?format=speedscope|collapsed
+baixa (speedscope.app ou flamegraph.pl).
+
+As pilhas são do processo inteiro: outras requisições simultâneas no mesmo worker
+também aparecem. Perfilar em horários de pouco tráfego dá o resultado mais limpo.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 128
+
+# Pilha parada em espera: thread ociosa (threadpool vazio, listeners, o próprio profiler)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+# Categoria pela presença de frames destes pacotes (na ordem: a primeira que casar)
+_CATEGORIES = (
+    ("ai", ("openai",)),
+    ("db", ("sqlalchemy", "asyncpg", "psycopg2")),
+    ("serialization", ("pydantic", "fastapi/encoders.py", "json", "orjson")),
+)
+
+
+def _frame_name(code) -> str:
+    path = code.co_filename.replace("\\", "/")
+    short = "/".join(path.split("/")[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+def _category(paths: list[str]) -> str:
+    for category, markers in _CATEGORIES:
+        if any(marker in path for path in paths for marker in markers):
+            return category
+    return "app"
+
+
+class SamplingProfiler:
+    """Amostra as pilhas de todos os threads até stop(); resultado em `samples` (pilha -> contagem)"""
+
+    def __init__(self, interval: float, loop_thread_id: Optional[int] = None):
+        self.interval = interval
+        self.loop_thread_id = loop_thread_id
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self._sample(thread_id, frame)
+
+    def _sample(self, thread_id: int, frame) -> None:
+        codes = []
+        while frame is not None and len(codes) < MAX_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+        if codes[0].co_filename.endswith(_IDLE_FILES):
+            if thread_id != self.loop_thread_id:
+                return
+            self.samples[("[await]", "event loop (I/O)")] += 1
+            return
+        codes.reverse()  # Raiz primeiro
+        paths = [code.co_filename.replace("\\", "/") for code in codes]
+        self.samples[(f"[{_category(paths)}]", *(_frame_name(code) for code in codes))] += 1
+
+
+# ----- Formatos -----
+
+def collapsed(samples: dict[tuple[str, ...], int]) -> str:
+    """Formato "collapsed" (flamegraph.pl / speedscope): frames separados por ';' e a contagem"""
+    return "\n".join(f"{';'.join(stack)} {count}" for stack, count in sorted(samples.items())) + "\n"
+
+
+def speedscope(profile: dict) -> dict:
+    """Arquivo no formato do speedscope.app (perfil "sampled", pesos em ms)"""
+    frames: list[dict] = []
+    index: dict[str, int] = {}
+    stacks, weights = [], []
+    for stack, count in profile["samples"]:
+        ids = []
+        for name in stack:
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            ids.append(index[name])
+        stacks.append(ids)
+        weights.append(round(count * profile["interval_ms"], 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"{profile['method']} {profile['path']}",
+        "exporter": "gestao-familiar",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile['method']} {profile['path']} ({profile['id']})",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stacks,
+            "weights": weights,
+        }],
+    }
+
+
+def build_profile(profile_id: str, profiler: SamplingProfiler, method: str, path: str, query: str,
+                  user_id: Optional[int], status_code: int, query_stats: Optional[dict]) -> dict:
+    interval_ms = profiler.interval * 1000
+    by_category: Counter[str] = Counter()
+    for stack, count in profiler.samples.items():
+        by_category[stack[0].strip("[]")] += count
+    return {
+        "id": profile_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "method": method,
+        "path": path,
+        "query": query,
+        "user_id": user_id,
+        "status": status_code,
+        "duration_ms": round(profiler.duration * 1000, 1),
+        "interval_ms": interval_ms,
+        "sample_count": sum(profiler.samples.values()),
+        "categories_ms": {category: round(count * interval_ms, 1) for category, count in by_category.most_common()},
+        "query_stats": query_stats,
+        "samples": [[list(stack), count] for stack, count in profiler.samples.most_common()],
+    }
+
+
+# ----- Store -----
+
+_store: deque = deque(maxlen=max(1, settings.PROFILE_STORE_SIZE))
+_store_lock = threading.Lock()
+
+
+def _summary(profile: dict) -> dict:
+    return {key: value for key, value in profile.items() if key != "samples"}
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0  # Já removido por outro worker
+
+
+def save_profile(profile: dict) -> None:
+    directory = settings.PROFILE_DIR
+    if not directory:
+        with _store_lock:
+            _store.append(profile)
+        return
+    os.makedirs(directory, exist_ok=True)
+    Path(directory, f"{profile['id']}.json").write_text(json.dumps(profile))
+    # Mantém só os PROFILE_STORE_SIZE mais recentes (todos os workers gravam no mesmo diretório)
+    files = list(Path(directory).glob("*.json"))
+    if len(files) > settings.PROFILE_STORE_SIZE:
+        files.sort(key=_mtime, reverse=True)
+        for old in files[settings.PROFILE_STORE_SIZE:]:
+            old.unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Resumo dos perfis guardados, do mais recente"""
+    directory = settings.PROFILE_DIR
+    if not directory:
+        with _store_lock:
+            return [_summary(profile) for profile in reversed(_store)]
+    profiles = []
+    for path in Path(directory).glob("*.json") if os.path.isdir(directory) else ():
+        try:
+            profiles.append(_summary(json.loads(path.read_text())))
+        except (OSError, ValueError):
+            continue  # Removido por outro worker durante a leitura
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    directory = settings.PROFILE_DIR
+    if not directory:
+        with _store_lock:
+            return next((profile for profile in _store if profile["id"] == profile_id), None)
+    if not profile_id.isalnum():
+        return None
+    try:
+        return json.loads(Path(directory, f"{profile_id}.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+# ----- Middleware -----
+
+def _requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value not in (b"", b"0")
+    query = scope.get("query_string", b"")
+    return b"_profile=1" in query and parse_qs(query.decode("latin-1")).get("_profile") == ["1"]
+
+
+def _bearer_user_id(scope) -> Optional[int]:
+    from app.core.security import decode_access_token
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            payload = decode_access_token(value[7:].decode("latin-1"))
+            if payload and payload.get("sub"):
+                return int(payload["sub"])
+    return None
+
+
+async def is_admin(user_id: int) -> bool:
+    """Mesmo critério de get_current_admin: apenas superuser ativo"""
+    from sqlalchemy import select
+
+    from app.db.base import AsyncSessionLocal
+    from app.models.user import User
+
+    async with AsyncSessionLocal() as db:
+        return bool(await db.scalar(
+            select(User.id).where(User.id == user_id, User.is_superuser.is_(True), User.is_active.is_(True))
+        ))
+
+
+class ProfileMiddleware:
+    """Perfila a requisição quando um admin pede (X-Profile: 1); as demais passam direto"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+        user_id = _bearer_user_id(scope)
+        if user_id is None or not await is_admin(user_id):
+            await self.app(scope, receive, send)  # Pedido ignorado: sem erro, sem perfil
+            return
+
+        from app.db.query_stats import track_queries
+
+        profile_id = uuid.uuid4().hex[:16]
+        status = {"code": 500}
+        profiler = SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000, loop_thread_id=threading.get_ident())
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            with track_queries() as stats:
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            profile = build_profile(
+                profile_id, profiler, scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"),
+                user_id, status["code"], stats.as_dict(settings.QUERY_REPEAT_THRESHOLD),
+            )
+            try:
+                await asyncio.to_thread(save_profile, profile)
+                logger.info(
+                    f"[PROFILE] {profile['id']} {scope['method']} {scope['path']} {profile['duration_ms']}ms "
+                    f"{profile['categories_ms']}"
+                )
+            except Exception as e:
+                logger.warning(f"[PROFILE] Falha ao guardar o perfil: {e}")
@@ -0,0 +1,187 @@
+"""
+Limite de tentativas nos endpoints de autenticação (token bucket).
+
+Cada regra tem um balde por chave (IP ou username) com `capacidade` fichas, repostas
+continuamente à taxa `capacidade/segundos` — ex.: "5/60" permite 5 tentativas seguidas e
+depois uma a cada 12 s. Sem ficha, a requisição recebe 429 com `Retry-After`, antes de
+qualquer consulta ao banco ou bcrypt.
+
+Backends (RATE_LIMIT_BACKEND):
+- memory (padrão): baldes no processo, LRU limitado a RATE_LIMIT_MAX_KEYS. Com N workers
+  (WEB_CONCURRENCY), cada processo aplica 1/N do limite (worker_share), para o total
+  ficar próximo do configurado; com CACHE_REDIS_URL definida, usa o redis.
+- redis: baldes compartilhados, atualizados atomicamente por um script Lua no servidor
+  RESP de CACHE_REDIS_URL (cliente de app/core/cache.py). Se o servidor falhar, a
+  requisição passa (fail open) e o erro é logado.
+
+Atrás de proxy reverso o IP do cliente chega em X-Forwarded-For; só é usado com
+RATE_LIMIT_TRUST_FORWARDED=true (senão qualquer cliente escolheria o próprio IP).
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "gf:rl:"
+
+# Atômico no servidor; o relógio é o do próprio Redis (workers em hosts diferentes)
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def parse_rate(spec: str) -> tuple[int, float]:
+    """"capacidade/segundos" -> (capacidade, fichas por segundo)"""
+    capacity, _, seconds = spec.partition("/")
+    capacity, seconds = int(capacity), float(seconds or 60)
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"Limite inválido: {spec!r}")
+    return capacity, capacity / seconds
+
+
+class MemoryBuckets:
+    """Baldes em memória do processo: chave -> [fichas, instante da última atualização]"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Consome uma ficha; devolve 0 ou quantos segundos faltam para a próxima"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBuckets:
+    """Baldes compartilhados entre processos no servidor RESP"""
+
+    def __init__(self, url: str):
+        from app.core.cache import RespClient
+
+        self.client = RespClient(url)
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        (wait,) = self.client.execute(("EVAL", _TAKE_SCRIPT, 1, KEY_PREFIX + key, capacity, rate))
+        return float(wait)
+
+    def clear(self) -> None:
+        self.client.close()
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def buckets_backend() -> str:
+    """Backend efetivo: RATE_LIMIT_BACKEND, trocando memory por redis com vários workers"""
+    if not settings.CACHE_REDIS_URL:
+        return "memory"
+    if settings.RATE_LIMIT_BACKEND == "redis" or settings.WEB_CONCURRENCY > 1:
+        return "redis"
+    return "memory"
+
+
+def worker_share(capacity: int, rate: float) -> tuple[int, float]:
+    """Fração do limite de um processo quando os baldes em memória são por worker.
+
+    O balanceamento entre os workers espalha as requisições de um cliente; com 1/N em cada
+    um, o total fica próximo do limite configurado (e não N vezes ele).
+    """
+    workers = max(1, settings.WEB_CONCURRENCY)
+    return max(1, math.ceil(capacity / workers)), rate / workers
+
+
+def get_buckets():
+    """Backend configurado (buckets_backend)"""
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                if buckets_backend() == "redis":
+                    _buckets = RedisBuckets(settings.CACHE_REDIS_URL)
+                else:
+                    _buckets = MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+    return _buckets
+
+
+def set_buckets(buckets) -> None:
+    """Substitui o backend (testes ou configuração manual)"""
+    global _buckets
+    _buckets = buckets
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # Último endereço: o que o nosso proxy viu (os anteriores vêm do cliente)
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce(rule: str, spec: str, key: Optional[str]) -> None:
+    """Consome uma ficha do balde `rule:key`; sem ficha, levanta 429 com Retry-After"""
+    if not settings.RATE_LIMIT_ENABLED or not key:
+        return
+    from app.core.metrics import RATE_LIMIT_REQUESTS
+
+    capacity, rate = parse_rate(spec)
+    buckets = get_buckets()
+    try:
+        if isinstance(buckets, MemoryBuckets):
+            wait = buckets.take(f"{rule}:{key}", *worker_share(capacity, rate))
+        else:
+            wait = await asyncio.to_thread(buckets.take, f"{rule}:{key}", capacity, rate)
+    except Exception as exc:
+        logger.warning(f"[RATE LIMIT] Falha no backend, requisição liberada: {exc}")
+        return
+    if wait <= 0:
+        RATE_LIMIT_REQUESTS.inc(rule=rule, outcome="allowed")
+        return
+    RATE_LIMIT_REQUESTS.inc(rule=rule, outcome="limited")
+    retry_after = max(1, math.ceil(wait))
+    logger.warning(f"[RATE LIMIT] {rule} excedido para {key} (retry em {retry_after}s)")
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Muitas tentativas. Tente novamente em {retry_after} segundos.",
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -0,0 +1,125 @@
+"""
+Refresh tokens com rotação.
+
+O access token (JWT) continua curto (ACCESS_TOKEN_EXPIRE_MINUTES). Em vez de refazer o
+login (bcrypt + consulta do usuário), o cliente troca o refresh token em POST
+/auth/refresh por um par novo: uma consulta pelo hash do token, um UPDATE e um INSERT,
+sem hashing de senha.
+
+- Rotação: cada refresh token vale uma troca; o novo herda a sessão (`session_id`).
+- Reuso: um token já trocado apresentado de novo indica vazamento e revoga a sessão
+  inteira. Dentro de REFRESH_TOKEN_REUSE_GRACE_SECONDS ele é só recusado (duas abas
+  renovando ao mesmo tempo).
+- Revogação: o logout revoga a sessão; mudar senha, ativação ou permissões
+  (auth_version, app/core/principals.py) invalida todos os tokens do usuário.
+
+No banco fica só o SHA-256 do token. Os tokens vencidos do usuário são apagados a cada
+novo login.
+"""
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import RefreshToken, User
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite devolve datetimes sem fuso
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _new_token(user_id: int, auth_version: int, session_id: Optional[str], now: datetime) -> tuple[str, dict]:
+    token = secrets.token_urlsafe(32)
+    return token, {
+        "user_id": user_id,
+        "token_hash": hash_refresh_token(token),
+        "session_id": session_id or uuid.uuid4().hex,
+        "auth_version": auth_version,
+        "created_at": now,
+        "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    }
+
+
+def issue_refresh_token(db: Session, user_id: int, auth_version: int) -> str:
+    """Token de uma sessão nova (login/registro); o commit fica com o chamador"""
+    now = datetime.now(timezone.utc)
+    db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at < now))
+    token, values = _new_token(user_id, auth_version, None, now)
+    db.execute(insert(RefreshToken).values(**values))
+    return token
+
+
+async def rotate_refresh_token(db, token: str) -> Optional[tuple[int, str]]:
+    """Troca o token por um novo na mesma sessão: (id do usuário, novo token), ou None se inválido"""
+    now = datetime.now(timezone.utc)
+    row = (await db.execute(
+        select(
+            RefreshToken.id, RefreshToken.user_id, RefreshToken.session_id, RefreshToken.auth_version,
+            RefreshToken.expires_at, RefreshToken.used_at, RefreshToken.revoked_at,
+            User.is_active, User.auth_version.label("current_version"),
+        )
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+    )).first()
+    if row is None or row.revoked_at is not None or _aware(row.expires_at) <= now:
+        return None
+    if row.used_at is not None:
+        if now - _aware(row.used_at) > timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+            logger.warning(f"[AUTH] Refresh token reutilizado; sessão {row.session_id} do usuário {row.user_id} revogada")
+            await _revoke_session(db, row.user_id, row.session_id, now)
+            await db.commit()
+        return None
+    if not row.is_active or row.auth_version != row.current_version:
+        return None
+
+    # Condição no UPDATE: duas trocas simultâneas do mesmo token, só uma vence
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None), RefreshToken.revoked_at.is_(None))
+        .values(used_at=now)
+    )
+    if claimed.rowcount != 1:
+        await db.rollback()
+        return None
+    new_token, values = _new_token(row.user_id, row.current_version, row.session_id, now)
+    await db.execute(insert(RefreshToken).values(**values))
+    await db.commit()
+    return row.user_id, new_token
+
+
+async def _revoke_session(db, user_id: int, session_id: str, now: datetime) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.session_id == session_id,
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=now)
+    )
+
+
+async def revoke_refresh_token(db, token: str) -> bool:
+    """Logout: revoga a sessão do token (todos os tokens da cadeia de rotação)"""
+    row = (await db.execute(
+        select(RefreshToken.user_id, RefreshToken.session_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+    )).first()
+    if row is None:
+        return False
+    await _revoke_session(db, row.user_id, row.session_id, datetime.now(timezone.utc))
+    await db.commit()
+    return True
@@ -1,10 +1,25 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds = max_rounds = BCRYPT_ROUNDS: hashes com outro custo são refeitos no login (verify_and_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha corresponde ao hash"""
@@ -14,6 +29,64 @@ def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
     return pwd_context.hash(password)
 
+
+# ----- bcrypt fora do event loop -----
+# Cada verificação custa centenas de ms de CPU (BCRYPT_ROUNDS=12); chamada direto em um
+# endpoint async, trava todas as requisições do worker. O bcrypt libera o GIL, então um
+# pool pequeno e dedicado (PASSWORD_HASH_WORKERS) roda em paralelo sem disputar o
+# threadpool dos endpoints síncronos. Além de PASSWORD_HASH_MAX_PENDING operações na
+# fila, a requisição recebe 503 em vez de esperar sem limite.
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_executor_pid: Optional[int] = None
+_hash_executor_lock = threading.Lock()
+_hash_pending = 0  # Alterado só no thread do event loop
+
+def _password_executor() -> ThreadPoolExecutor:
+    """Pool do processo atual (com o gunicorn em preload, as threads do master não existem nos workers)"""
+    global _hash_executor, _hash_executor_pid
+    if _hash_executor_pid != os.getpid():
+        with _hash_executor_lock:
+            if _hash_executor_pid != os.getpid():
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.PASSWORD_HASH_WORKERS), thread_name_prefix="password-hash"
+                )
+                _hash_executor_pid = os.getpid()
+    return _hash_executor
+
+async def _run_password_hashing(operation: str, func, *args):
+    global _hash_pending
+    from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_WAIT, PASSWORD_HASH_REJECTED
+
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        PASSWORD_HASH_REJECTED.inc(operation=operation)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": "1"},
+        )
+    submitted = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        PASSWORD_HASH_QUEUE_WAIT.observe(started - submitted, operation=operation)
+        with PASSWORD_HASH_DURATION.time(operation=operation):
+            return func(*args)
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor(), timed)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """(senha confere, novo hash) — o novo hash vem quando o armazenado usa outro custo/esquema"""
+    return await _run_password_hashing("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Igual a `get_password_hash`, no pool de hashing"""
+    return await _run_password_hashing("hash", pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria token JWT"""
     to_encode = data.copy()
@@ -34,3 +107,24 @@ def decode_access_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+
+# Cookie que fixa as leituras do usuário no banco primário logo após uma escrita (réplicas de leitura)
+READ_PRIMARY_COOKIE = "gf_primary"
+
+def _primary_signature(user_id: int, expires_at: int) -> str:
+    message = f"{user_id}:{expires_at}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+def create_primary_token(user_id: int, seconds: int) -> str:
+    """Token curto "leia do primário até T" para o usuário (assinado, sem estado no servidor)"""
+    expires_at = int(time.time()) + seconds
+    return f"{expires_at}.{_primary_signature(user_id, expires_at)}"
+
+def primary_token_valid(token: Optional[str], user_id: int) -> bool:
+    """True se o token é do usuário e ainda não expirou"""
+    try:
+        expires_at, signature = token.split(".", 1)
+        expires_at = int(expires_at)
+    except (AttributeError, ValueError):
+        return False
+    return expires_at >= time.time() and hmac.compare_digest(signature, _primary_signature(user_id, expires_at))
@@ -0,0 +1,71 @@
+"""
+Dimensionamento dos workers do servidor de produção (gunicorn.conf.py).
+
+Dentro de containers, `os.cpu_count()` retorna os CPUs do host, não a cota do
+container. A cota é lida do cgroup (v2: cpu.max; v1: cpu.cfs_quota_us/cpu.cfs_period_us)
+e limitada pela afinidade do processo.
+
+Este módulo não importa as configurações da aplicação: é carregado pelo gunicorn
+antes do app.
+"""
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """Cota de CPU do cgroup em número de CPUs (None se não houver limite)"""
+    # cgroup v2: "<quota> <period>" ou "max <period>"
+    cpu_max = _read(root / "cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1: quota -1 significa sem limite
+    quota = _read(root / "cpu" / "cpu.cfs_quota_us") or _read(root / "cpu,cpuacct" / "cpu.cfs_quota_us")
+    period = _read(root / "cpu" / "cpu.cfs_period_us") or _read(root / "cpu,cpuacct" / "cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """CPUs efetivamente disponíveis: afinidade do processo limitada pela cota do cgroup"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS/Windows
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota(root)
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def default_workers(per_cpu: int = 2, max_workers: Optional[int] = None, root: Path = CGROUP_ROOT) -> int:
+    """Número de workers: `per_cpu` por CPU disponível (mínimo 2, para reinícios sem indisponibilidade)"""
+    workers = max(2, available_cpus(root) * per_cpu)
+    if max_workers:
+        workers = min(workers, max_workers)
+    return workers
+
+
+def pool_capped_workers(workers: int, pool_size: int, min_per_worker: int, servers: int = 1) -> int:
+    """Limita `workers` para que cada um tenha ao menos `min_per_worker` conexões por servidor.
+
+    pool_size <= 0 (NullPool, atrás do PgBouncer) não limita. Nunca retorna menos que 1.
+    """
+    if pool_size <= 0:
+        return workers
+    return max(1, min(workers, pool_size // (max(1, min_per_worker) * max(1, servers))))
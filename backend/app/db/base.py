@@ -1,24 +1,201 @@
-from sqlalchemy import create_engine
+import logging
+import random
+import time
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKOUT
+
+logger = logging.getLogger(__name__)
+
+# Réplicas de leitura (DATABASE_REPLICA_URLS): cada uma tem engines sync e async próprios
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+def pool_limits(servers: Optional[int] = None) -> dict[str, tuple[int, int]]:
+    """Divide DB_POOL_SIZE/DB_MAX_OVERFLOW entre os workers, os servidores e os engines do processo.
+
+    Cada worker recebe DB_POOL_SIZE // workers, repartido entre o primário e as réplicas
+    (`servers`). Em cada servidor, o engine async (poucos endpoints: dashboards, auth)
+    fica com 1/4 (mínimo 1) e o sync com o resto. Assim o total de conexões da instância
+    fica dentro do orçamento configurado (abaixo do max_connections do Postgres).
+
+    Retorna {"sync": (pool_size, max_overflow), "async": (...)}. Se a fração por servidor
+    ficar abaixo de DB_POOL_MIN_PER_WORKER, falha na inicialização: o gunicorn.conf.py já
+    limita o número automático de workers; com WEB_CONCURRENCY fixo, aumente DB_POOL_SIZE.
+    """
+    if settings.DB_POOL_SIZE <= 0:
+        return {"sync": (0, 0), "async": (0, 0)}  # NullPool
+    if servers is None:
+        servers = 1 + len(REPLICA_URLS)
+    shares = max(1, settings.WEB_CONCURRENCY) * servers
+    size, overflow = settings.DB_POOL_SIZE // shares, settings.DB_MAX_OVERFLOW // shares
+    if size < max(2, settings.DB_POOL_MIN_PER_WORKER):
+        raise RuntimeError(
+            f"DB_POOL_SIZE={settings.DB_POOL_SIZE} dá {size} conexões por worker e servidor "
+            f"({settings.WEB_CONCURRENCY} workers x {servers} servidores; mínimo "
+            f"DB_POOL_MIN_PER_WORKER={settings.DB_POOL_MIN_PER_WORKER}). Aumente DB_POOL_SIZE, "
+            f"reduza WEB_CONCURRENCY ou use o PgBouncer com DB_POOL_SIZE=0"
+        )
+    async_size, async_overflow = max(1, size // 4), overflow // 4
+    return {"sync": (size - async_size, overflow - async_overflow), "async": (async_size, async_overflow)}
+
+POOL_LIMITS = pool_limits()
+
+class _TimedCheckout:
+    """Mede a espera no checkout (pool esgotado ou conexão nova) em db_pool_checkout_seconds.
+
+    O label `pool` é o pool_logging_name do engine (preservado no dispose/recreate).
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - started, pool=self.logging_name or "default")
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(pool_size: Optional[int] = None, max_overflow: Optional[int] = None, asyncio: bool = False) -> dict:
+    """Opções de pool comuns aos engines sync e async (tamanhos padrão: POOL_LIMITS).
+
+    pool_size 0 usa NullPool: a conexão é aberta no início da sessão e devolvida ao
+    PgBouncer no fim, sem conexões paradas no processo.
+    """
+    default_size, default_overflow = POOL_LIMITS["async" if asyncio else "sync"]
+    pool_size = default_size if pool_size is None else pool_size
+    max_overflow = default_overflow if max_overflow is None else max_overflow
+    if pool_size <= 0:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": TimedAsyncQueuePool if asyncio else TimedQueuePool,
+        "pool_size": pool_size,                   # fração de DB_POOL_SIZE por worker/servidor/engine
+        "max_overflow": max_overflow,             # fração de DB_MAX_OVERFLOW por worker/servidor/engine
+        "pool_pre_ping": settings.DB_POOL_PRE_PING and settings.DB_PING_IDLE_SECONDS <= 0,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+def install_idle_ping(sync_engine, idle_seconds: int) -> None:
+    """Testa a conexão no checkout apenas se ela ficou ociosa no pool por mais de `idle_seconds`.
+
+    Conexões usadas há pouco (o caso comum sob carga) saem do pool sem round trip extra.
+    Uma conexão morta é descartada e o pool abre outra (DisconnectionError).
+    """
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checkin_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checkin_at = connection_record.info.get("checkin_at")
+        if checkin_at is None or time.monotonic() - checkin_at < idle_seconds:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise exc.DisconnectionError(f"Conexão ociosa inválida: {e}") from e
 
-# Configuração otimizada do pool de conexões para produção
-# pool_size: número de conexões mantidas no pool
-# max_overflow: conexões adicionais que podem ser criadas além do pool_size
-# pool_pre_ping: verifica se a conexão está viva antes de usar (importante para conexões de longa duração)
+# Configuração do pool de conexões (ver pool_options/config.py)
 # pool_recycle: recicla conexões após X segundos (evita conexões antigas)
 # echo: desabilitado para melhor performance (usar SQL_DEBUG=true para ativar)
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_size=settings.DB_POOL_SIZE,              # configurável via env
-    max_overflow=settings.DB_MAX_OVERFLOW,         # configurável via env
-    pool_pre_ping=True,                           # verifica conexão antes de usar
-    pool_recycle=settings.DB_POOL_RECYCLE,        # configurável via env
-    echo=settings.SQL_DEBUG                        # logs SQL apenas se SQL_DEBUG=true
+    echo=settings.SQL_DEBUG,                      # logs SQL apenas se SQL_DEBUG=true
+    pool_logging_name="primary",
+    **pool_options()
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def async_database_url(url: str) -> str:
+    """Converte a DATABASE_URL (psycopg2) para o driver asyncpg.
+
+    O asyncpg não entende `sslmode` da libpq: o parâmetro é repassado como `ssl`.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return url
+    query = dict(parsed.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+
+def async_connect_args() -> dict:
+    """Argumentos do asyncpg. Atrás do PgBouncer (modo transaction) cada transação pode cair em
+    outra conexão do servidor: sem cache de prepared statements e com nomes únicos."""
+    if not settings.DB_PGBOUNCER:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+# Engine assíncrono (asyncpg) para os endpoints já migrados: as queries não bloqueiam o event loop.
+# O engine síncrono acima continua sendo usado pelos demais endpoints e pelos scripts.
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    echo=settings.SQL_DEBUG,
+    connect_args=async_connect_args(),
+    pool_logging_name="primary_async",
+    **pool_options(asyncio=True)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Engines das réplicas (REPLICA_URLS), com a mesma fração do orçamento que os do primário
+replica_engines = [
+    create_engine(url, echo=settings.SQL_DEBUG, pool_logging_name=f"replica{index}", **pool_options())
+    for index, url in enumerate(REPLICA_URLS)
+]
+async_replica_engines = [
+    create_async_engine(
+        async_database_url(url), echo=settings.SQL_DEBUG, connect_args=async_connect_args(),
+        pool_logging_name=f"replica{index}_async", **pool_options(asyncio=True),
+    )
+    for index, url in enumerate(REPLICA_URLS)
+]
+
+if settings.DB_PING_IDLE_SECONDS > 0 and POOL_LIMITS["sync"][0] > 0:
+    for _engine in (engine, *replica_engines, async_engine, *async_replica_engines):
+        install_idle_ping(getattr(_engine, "sync_engine", _engine), settings.DB_PING_IDLE_SECONDS)
+
+
+class RoutingSession(Session):
+    """Sessão de leitura: consultas vão para uma réplica, escritas para o primário.
+
+    Flushes do ORM e comandos DML (insert/update/delete via Core) sempre usam o
+    primário. A réplica é sorteada uma vez por sessão, para que todas as leituras da
+    requisição vejam o mesmo ponto da replicação.
+    """
+    primary = engine
+    replicas = replica_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or not self.replicas or getattr(clause, "is_dml", False):
+            return self.primary
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(self.replicas)
+        return self.info["replica"]
+
+
+class AsyncRoutingSession(RoutingSession):
+    """RoutingSession para AsyncSession (o roteamento usa os engines síncronos subjacentes)"""
+    primary = async_engine.sync_engine
+    replicas = [replica.sync_engine for replica in async_replica_engines]
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,3 +206,7 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco"""
+    async with AsyncSessionLocal() as db:
+        yield db
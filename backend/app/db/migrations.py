@@ -0,0 +1,60 @@
+"""
+Verificação da versão do esquema no startup.
+
+O esquema é mantido pelas migrações do Alembic (backend/migrations); a aplicação não
+cria tabelas. No startup basta uma consulta a `alembic_version` comparada com a
+revisão final lida dos arquivos locais — sem inspecionar o catálogo tabela a tabela.
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaOutdatedError(RuntimeError):
+    """Banco sem as migrações exigidas pelo código"""
+
+
+def _script_directory():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+
+
+def head_revision() -> Optional[str]:
+    return _script_directory().get_current_head()
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """Revisão aplicada ao banco (None se as migrações nunca rodaram)"""
+    with engine.connect() as conn:
+        try:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DBAPIError:
+            return None
+
+
+def check_schema(engine: Engine) -> None:
+    """Falha se o banco está atrás do código; só avisa se está à frente (deploy gradual)"""
+    head = head_revision()
+    current = current_revision(engine)
+    if current == head:
+        logger.info("Esquema do banco na revisão %s.", current)
+        return
+
+    script = _script_directory()
+    if current is not None and script.get_revision(current) is None:
+        # Revisão desconhecida para este código: migração de uma versão mais nova já aplicada
+        logger.warning("Banco na revisão %s, posterior à deste código (%s).", current, head)
+        return
+    raise SchemaOutdatedError(
+        f"Banco na revisão {current or '(nenhuma)'}, esperado {head}. Execute `alembic upgrade head`."
+    )
@@ -0,0 +1,111 @@
+"""
+Contagem de queries por requisição (e detector de N+1).
+
+Listeners nos eventos de cursor do `Engine` (todos os engines: sync, async e réplicas)
+somam, para o escopo corrente (`track_queries`), o número de queries, o tempo total
+no banco e quantas vezes cada formato de statement se repetiu. Como o SQLAlchemy gera
+o SQL com parâmetros ligados, o texto do statement já é o "formato" da query: o mesmo
+SELECT executado para cada item de uma lista aparece N vezes — o padrão N+1.
+
+O escopo é guardado em um ContextVar: o middleware abre um por requisição (ver
+app/main.py), que é herdado pelas dependências e endpoints (inclusive os síncronos,
+executados no threadpool). Nos testes, `assert_max_queries(n)` falha se o bloco
+executar mais de n queries.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """Queries executadas em um escopo (requisição ou bloco de teste)"""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0  # segundos
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        if self.parent is not None:
+            self.parent.record(statement, duration)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executados `threshold` vezes ou mais (suspeitos de N+1), do mais repetido"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        """Valor do header Server-Timing (visível no DevTools do navegador)"""
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+    def as_dict(self, threshold: int) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.duration * 1000, 1),
+            "repeated": [{"count": count, "statement": _shorten(statement)} for statement, count in self.repeated(threshold)],
+        }
+
+
+def _shorten(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def query_duration(context) -> Optional[float]:
+    """Duração (s) da query em execução, para listeners de after_cursor_execute"""
+    started_at = getattr(context, "_query_started_at", None)
+    return None if started_at is None else time.perf_counter() - started_at
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Abre um escopo de contagem; escopos aninhados também somam no escopo externo"""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Helper de teste: falha se o bloco executar mais de `limit` queries.
+
+        with assert_max_queries(3):
+            client.get("/api/v1/finance/entries")
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {count}x {_shorten(statement)}" for statement, count in stats.statements.most_common())
+        raise AssertionError(f"{stats.count} queries executadas (máximo {limit}):\n{listing}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    # Sempre marcado: também usado pela captura de queries lentas (app/db/slow_queries.py)
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    duration = query_duration(context)
+    if stats is not None and duration is not None:
+        stats.record(statement, duration)
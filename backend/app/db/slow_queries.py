@@ -0,0 +1,254 @@
+"""
+Captura de queries lentas.
+
+Toda query que excede SLOW_QUERY_MS é registrada com o SQL normalizado, os tipos dos
+parâmetros (nunca os valores), a duração, a rota e a família da requisição:
+- em um ring buffer por processo (SLOW_QUERY_BUFFER_SIZE entradas);
+- opcionalmente na tabela `system_slowquery` (SLOW_QUERY_TABLE=true), gravada por uma
+  thread em segundo plano — a requisição não espera pelo INSERT.
+
+Uma amostra (SLOW_QUERY_EXPLAIN_SAMPLE, 0 a 1) dos SELECTs lentos no Postgres recebe o
+plano de `EXPLAIN (ANALYZE, BUFFERS)`, executado na mesma conexão dentro de um
+SAVEPOINT (o ANALYZE executa a query de novo: mantenha a amostra pequena).
+
+GET /system/slow-queries (admin) lista os piores statements por tempo total.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.query_stats import query_duration
+
+logger = logging.getLogger(__name__)
+
+# Rota/família da requisição corrente (preenchidos pelo middleware e por app/api/deps.py)
+_request_info: ContextVar[Optional[dict]] = ContextVar("slow_query_request", default=None)
+# Desliga a captura (thread de gravação: o próprio INSERT não deve ser capturado)
+_suppressed: ContextVar[bool] = ContextVar("slow_query_suppressed", default=False)
+
+_buffer: deque = deque(maxlen=max(1, settings.SLOW_QUERY_BUFFER_SIZE))
+_buffer_lock = threading.Lock()
+
+_IN_LIST = re.compile(r"\(\s*(?:%\(\w+\)s|\?|\$\d+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+))*\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_ROUTE_ID = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL sem literais e com listas IN de tamanho variável colapsadas (mesmo formato = mesma chave)"""
+    statement = " ".join(statement.split())
+    statement = _STRING.sub("'?'", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _IN_LIST.sub("(...)", statement)
+
+
+def _shape(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """Tipos dos parâmetros ligados; em executemany, o formato da primeira linha e o total"""
+    if executemany and parameters:
+        return {"rows": len(parameters), "shape": _shape(parameters[0])}
+    return _shape(parameters)
+
+
+def normalize_route(method: str, path: str) -> str:
+    return f"{method} {_ROUTE_ID.sub('/{id}', path)}"
+
+
+@contextmanager
+def request_scope(method: str, path: str) -> Iterator[dict]:
+    """Associa as queries lentas do bloco à rota (usado pelo middleware de requisições)"""
+    token = _request_info.set({"route": normalize_route(method, path), "family_id": None})
+    try:
+        yield _request_info.get()
+    finally:
+        _request_info.reset(token)
+
+
+def set_request_family(family_id: Optional[int]) -> None:
+    info = _request_info.get()
+    if info is not None and family_id:
+        info["family_id"] = family_id
+
+
+def recent_slow_queries() -> list[dict]:
+    with _buffer_lock:
+        return list(_buffer)
+
+
+def clear_slow_queries() -> None:
+    with _buffer_lock:
+        _buffer.clear()
+
+
+def top_offenders(records: Iterable[dict], limit: int = 20) -> list[dict]:
+    """Agrupa por SQL normalizado e ordena pelo tempo total"""
+    groups: dict[str, dict] = {}
+    for record in records:
+        group = groups.setdefault(record["sql"], {
+            "sql": record["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "last_seen": None, "routes": set(), "family_ids": set(), "params": record["params"], "plan": None,
+        })
+        group["count"] += 1
+        group["total_ms"] += record["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        group["last_seen"] = max(filter(None, (group["last_seen"], record["created_at"])))
+        if record.get("route"):
+            group["routes"].add(record["route"])
+        if record.get("family_id"):
+            group["family_ids"].add(record["family_id"])
+        if record.get("plan"):
+            group["plan"] = record["plan"]
+
+    ranked = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+    for group in ranked:
+        group["total_ms"] = round(group["total_ms"], 1)
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 1)
+        group["max_ms"] = round(group["max_ms"], 1)
+        group["routes"] = sorted(group["routes"])
+        group["family_ids"] = sorted(group["family_ids"])
+    return ranked
+
+
+# ----- EXPLAIN -----
+
+def _explainable(statement: str) -> bool:
+    head = statement.lstrip().upper()
+    if not (head.startswith("SELECT") or head.startswith("WITH")):
+        return False
+    return not re.search(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR (UPDATE|SHARE)\b", head)
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[str]:
+    """EXPLAIN (ANALYZE, BUFFERS) na mesma conexão/transação, isolado por SAVEPOINT"""
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        logger.warning(f"[SLOW QUERY] Falha no EXPLAIN: {e}")
+        return None
+    finally:
+        cursor.close()
+
+
+# ----- Gravação na tabela -----
+
+_pending: "queue.Queue[dict]" = queue.Queue(maxsize=1000)
+_writer_lock = threading.Lock()
+_writer_pid: Optional[int] = None
+
+
+def persist(records: list[dict], bind) -> None:
+    """Insere os registros em system_slowquery"""
+    from app.models.system import SlowQueryLog
+
+    rows = [
+        {
+            "sql": record["sql"],
+            "params": json.dumps(record["params"]),
+            "duration_ms": record["duration_ms"],
+            "route": record["route"],
+            "family_id": record["family_id"],
+            "plan": record["plan"],
+        }
+        for record in records
+    ]
+    token = _suppressed.set(True)
+    try:
+        with bind.begin() as connection:
+            connection.execute(SlowQueryLog.__table__.insert(), rows)
+    finally:
+        _suppressed.reset(token)
+
+
+def _write_pending() -> None:
+    from app.db.base import engine
+
+    while True:
+        batch = [_pending.get()]
+        while len(batch) < 100:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            persist(batch, engine)
+        except Exception as e:
+            logger.error(f"[SLOW QUERY] Falha ao gravar {len(batch)} registros: {e}")
+
+
+def _enqueue(record: dict) -> None:
+    global _writer_pid
+    # Uma thread por processo (após o fork dos workers a thread do master não existe)
+    if _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer_pid != os.getpid():
+                threading.Thread(target=_write_pending, name="slow-query-writer", daemon=True).start()
+                _writer_pid = os.getpid()
+    try:
+        _pending.put_nowait(record)
+    except queue.Full:
+        logger.warning("[SLOW QUERY] Fila de gravação cheia, registro descartado")
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _capture_slow_query(conn, cursor, statement, parameters, context, executemany):
+    if settings.SLOW_QUERY_MS <= 0 or _suppressed.get():
+        return
+    duration = query_duration(context)
+    if duration is None or duration * 1000 < settings.SLOW_QUERY_MS:
+        return
+
+    info = _request_info.get() or {}
+    plan = None
+    if (
+        settings.SLOW_QUERY_EXPLAIN_SAMPLE > 0
+        and not executemany
+        and conn.dialect.name == "postgresql"
+        and _explainable(statement)
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE
+    ):
+        plan = _explain(conn, statement, parameters)
+
+    record = {
+        "sql": normalize_sql(statement),
+        "params": parameter_shape(parameters, executemany),
+        "duration_ms": round(duration * 1000, 1),
+        "route": info.get("route"),
+        "family_id": info.get("family_id"),
+        "plan": plan,
+        "created_at": datetime.now(timezone.utc),
+    }
+    with _buffer_lock:
+        _buffer.append(record)
+    logger.warning(f"[SLOW QUERY] {record['duration_ms']}ms {record['route'] or '-'}: {record['sql'][:200]}")
+    if settings.SLOW_QUERY_TABLE:
+        _enqueue(record)
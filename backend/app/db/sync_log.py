@@ -0,0 +1,101 @@
+"""
+Registro de alterações para sincronização incremental e GET condicional.
+
+- Exclusões: toda exclusão via ORM (`db.delete(obj)`, inclusive as em cascata pelos
+  relacionamentos) de um modelo rastreado gera um tombstone em `sync_tombstone`, na
+  mesma transação, com a família dona do registro.
+- Criações/edições: cada registro alterado tem uma linha em `sync_change` (uma por
+  registro, via upsert) com o horário da última alteração segundo o relógio do banco.
+  Escritas via ORM são capturadas no flush; escritas Core (app/db/writes.py) chamam
+  `record_changes` diretamente.
+
+Os horários vêm sempre do banco (now()), então não dependem do relógio nem do fuso
+do servidor da aplicação (vários `updated_at` são gravados com `datetime.now()` local).
+"""
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.core.cache import resolve_family_id
+from app.models.finance import FinanceCategory, FinanceEntry, FinanceRecurrence
+from app.models.healthcare import FamilyMember, MedicalAppointment, MedicalProcedure, Medication
+from app.models.maintenance import Equipment, MaintenanceOrder
+from app.models.sync import SyncChange, SyncTombstone
+
+# Modelos sincronizáveis (o recurso é o nome da tabela)
+TRACKED_MODELS = (
+    FinanceCategory,
+    FinanceEntry,
+    FinanceRecurrence,
+    FamilyMember,
+    MedicalAppointment,
+    MedicalProcedure,
+    Medication,
+    Equipment,
+    MaintenanceOrder,
+)
+
+_FAMILY_COLUMNS = ("family_id", "family_member_id", "equipment_id")
+
+
+def resource_name(model) -> str:
+    return model.__tablename__
+
+
+def _family_of(session: Session, obj) -> Optional[int]:
+    values = {column: getattr(obj, column, None) for column in _FAMILY_COLUMNS}
+    return resolve_family_id(session, type(obj), values)
+
+
+def record_changes(session: Session, model, object_ids: Iterable[int], family_id: Optional[int]) -> None:
+    """Registra (upsert) que os registros foram criados/alterados agora (não faz commit)"""
+    if model not in TRACKED_MODELS or not family_id:
+        return
+    rows = [
+        {"family_id": family_id, "resource": resource_name(model), "object_id": object_id}
+        for object_id in sorted(set(object_ids))
+    ]
+    if not rows:
+        return
+
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(SyncChange.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SyncChange.resource, SyncChange.object_id],
+        set_={"family_id": stmt.excluded.family_id, "changed_at": func.now()},
+    )
+    # Executa direto na conexão: tabela Core, sem disparar autoflush (chamado também dentro do flush)
+    session.connection().execute(stmt, rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session, flush_context, instances):
+    tombstones = []
+    for obj in session.deleted:
+        if type(obj) not in TRACKED_MODELS:
+            continue
+        family_id = _family_of(session, obj)
+        if family_id:
+            tombstones.append(SyncTombstone(family_id=family_id, resource=resource_name(type(obj)), object_id=obj.id))
+    if tombstones:
+        session.add_all(tombstones)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_orm_changes(session, flush_context):
+    # Em after_flush os ids já foram gerados e new/dirty ainda refletem o estado anterior ao flush
+    changed = defaultdict(set)
+    for obj in (*session.new, *session.dirty):
+        if type(obj) not in TRACKED_MODELS or obj in session.deleted:
+            continue
+        if obj not in session.new and not session.is_modified(obj, include_collections=False):
+            continue
+        changed[(type(obj), _family_of(session, obj))].add(obj.id)
+    for (model, family_id), object_ids in changed.items():
+        record_changes(session, model, object_ids, family_id)
@@ -0,0 +1,196 @@
+"""
+Escopo de família (tenancy) das consultas.
+
+`TenantScope` é resolvido uma vez por requisição (app/api/deps.py: get_tenant_scope) e
+substitui o bloco "admin sem family_id -> todas as famílias do admin" repetido nos
+endpoints:
+- `family_ids`: famílias visíveis (a escolhida, a do usuário ou todas as do admin);
+- `family_id`: família de destino de novos registros (a escolhida ou a primeira do admin).
+
+`scope.where(Model)` devolve o critério de família pelo caminho mais barato:
+- modelos com coluna `family_id` (inclusive denormalizada em tabela filha) filtram por
+  ela direto, sem JOIN;
+- os demais sobem pela chave estrangeira do pai (membro, equipamento, ordem) com
+  `fk IN (SELECT id FROM pai WHERE ...)`, até um modelo com `family_id`.
+O caminho de cada modelo é calculado uma vez por processo e o critério uma vez por
+requisição.
+
+Consultas, procedimentos, medicamentos e ordens de manutenção têm `family_id`
+denormalizado do membro/equipamento. Ele é mantido aqui:
+- INSERT/UPDATE Core (app/db/writes.py): `inherit_family` copia a família do pai
+  quando a coluna do pai está nos valores;
+- flush do ORM (eventos de mapper): registros novos ou com o pai trocado recebem a
+  família do pai;
+- pai que muda de família (flush do ORM ou UPDATE Core) leva os filhos junto.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Mapper, Session
+
+# Colunas que levam ao registro pai, na ordem de preferência
+PARENT_COLUMNS = ("family_member_id", "equipment_id", "maintenance_order_id")
+
+
+def _mapped_class(table):
+    from app.db.base import Base
+
+    for mapper in Base.registry.mappers:
+        if mapper.local_table is table:
+            return mapper.class_
+    raise LookupError(f"Tabela sem modelo mapeado: {table.name}")
+
+
+@lru_cache(maxsize=None)
+def parent_link(model) -> Optional[tuple[str, type]]:
+    """(coluna, modelo pai) do registro pai, ou None"""
+    name = next((name for name in PARENT_COLUMNS if name in model.__mapper__.columns), None)
+    if name is None:
+        return None
+    (foreign_key,) = model.__mapper__.columns[name].foreign_keys
+    return name, _mapped_class(foreign_key.column.table)
+
+
+@lru_cache(maxsize=None)
+def tenant_path(model) -> tuple[tuple[str, type], ...]:
+    """Saltos (coluna, modelo pai) até um modelo com family_id; vazio se o próprio modelo tem"""
+    path = []
+    while "family_id" not in model.__mapper__.columns:
+        link = parent_link(model)
+        if link is None:
+            raise ValueError(f"{model.__name__} não tem caminho até a família")
+        path.append(link)
+        model = link[1]
+    return tuple(path)
+
+
+def family_criterion(model, family_ids: Sequence[int]):
+    """Critério que restringe o modelo às famílias informadas"""
+    path = tenant_path(model)
+    target = path[-1][1] if path else model
+    family_ids = list(family_ids)
+    criterion = target.family_id == family_ids[0] if len(family_ids) == 1 else target.family_id.in_(family_ids)
+    # Do ancestral com family_id de volta ao modelo: um IN (subquery) por salto
+    for index in range(len(path) - 1, -1, -1):
+        name, parent = path[index]
+        child = path[index - 1][1] if index else model
+        criterion = getattr(child, name).in_(select(parent.id).where(criterion))
+    return criterion
+
+
+@dataclass(frozen=True)
+class TenantScope:
+    """Famílias visíveis na requisição e família de destino das escritas"""
+    family_ids: tuple[int, ...]
+    family_id: Optional[int] = None
+    _criteria: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def empty(self) -> bool:
+        """Admin sem nenhuma família: listagens vazias, registros não encontrados"""
+        return not self.family_ids
+
+    def where(self, model):
+        criterion = self._criteria.get(model)
+        if criterion is None:
+            criterion = self._criteria[model] = family_criterion(model, self.family_ids)
+        return criterion
+
+    def owns(self, model, object_id: int) -> list:
+        """Critérios de um registro pelo id, restrito às famílias do escopo"""
+        return [model.id == object_id, self.where(model)]
+
+    def require_family(self) -> int:
+        """Família para novos registros"""
+        if self.family_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma família encontrada")
+        return self.family_id
+
+
+# ----- family_id denormalizado -----
+
+def is_denormalized(model) -> bool:
+    """Tabela filha com cópia do family_id do pai"""
+    return "family_id" in model.__mapper__.columns and parent_link(model) is not None
+
+
+@lru_cache(maxsize=None)
+def denormalized_children(parent) -> tuple[tuple[type, str], ...]:
+    """(modelo filho, coluna do pai) das tabelas que copiam o family_id deste modelo"""
+    from app.db.base import Base
+
+    children = []
+    for mapper in Base.registry.mappers:
+        child = mapper.class_
+        if is_denormalized(child) and parent_link(child)[1] is parent:
+            children.append((child, parent_link(child)[0]))
+    return tuple(children)
+
+
+def inherit_family(model, values: dict) -> dict:
+    """Inclui o family_id do pai (subquery) quando o INSERT/UPDATE define a coluna do pai"""
+    if not is_denormalized(model):
+        return values
+    name, parent = parent_link(model)
+    if values.get(name) is None or "family_id" in values:
+        return values
+    return {**values, "family_id": select(parent.family_id).where(parent.id == values[name]).scalar_subquery()}
+
+
+def propagate_family(session: Session, parent, parent_ids, family_id: int) -> None:
+    """Leva os filhos denormalizados junto quando o pai muda de família"""
+    parent_ids = list(parent_ids)
+    for child, name in denormalized_children(parent):
+        session.execute(
+            update(child)
+            .where(getattr(child, name).in_(parent_ids), child.family_id != family_id)
+            .values(family_id=family_id)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _parent_relationship(model, name: str) -> Optional[str]:
+    """Nome do relationship que usa a coluna do pai"""
+    for relationship in model.__mapper__.relationships:
+        if any(column.key == name for column in relationship.local_columns):
+            return relationship.key
+    return None
+
+
+def _parent_family(connection, target) -> Optional[int]:
+    name, parent = parent_link(type(target))
+    relationship = _parent_relationship(type(target), name)
+    owner = target.__dict__.get(relationship) if relationship else None  # Sem lazy load no flush
+    if owner is not None and owner.family_id is not None:
+        return owner.family_id
+    return connection.execute(select(parent.family_id).where(parent.id == getattr(target, name))).scalar()
+
+
+# Eventos de mapper: rodam na ordem do flush, com o pai já gravado (inclusive pai novo)
+
+@event.listens_for(Mapper, "before_insert")
+def _inherit_on_insert(mapper, connection, target):
+    if is_denormalized(mapper.class_) and target.family_id is None:
+        target.family_id = _parent_family(connection, target)
+
+
+@event.listens_for(Mapper, "before_update")
+def _inherit_on_reassign(mapper, connection, target):
+    if is_denormalized(mapper.class_):
+        name, _ = parent_link(mapper.class_)
+        if inspect(target).attrs[name].history.has_changes():
+            target.family_id = _parent_family(connection, target)
+
+
+@event.listens_for(Mapper, "after_update")
+def _propagate_on_move(mapper, connection, target):
+    if denormalized_children(mapper.class_) and inspect(target).attrs["family_id"].history.has_changes():
+        for child, name in denormalized_children(mapper.class_):
+            connection.execute(
+                update(child)
+                .where(getattr(child, name) == target.id, child.family_id != target.family_id)
+                .values(family_id=target.family_id)
+            )
@@ -0,0 +1,129 @@
+"""
+Escritas com INSERT/UPDATE ... RETURNING.
+
+Evita o padrão `db.commit()` + `db.refresh(obj)`, que faz um SELECT extra da linha
+inteira (incluindo blobs base64 como `documents` e `photo`) só para serializar a resposta.
+A resposta é montada a partir da própria linha devolvida pelo RETURNING, com uma lista
+explícita de colunas (blobs ficam de fora, a não ser que sejam pedidos).
+"""
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.cache import mark_families_changed, resolve_family_id
+from app.db.sync_log import record_changes
+from app.db.tenancy import denormalized_children, inherit_family, propagate_family
+
+# Colunas com conteúdo pesado (base64) que não devem voltar nas respostas de escrita
+BLOB_COLUMNS = frozenset({"documents", "photo", "image"})
+
+# Colunas que nunca devem ser devolvidas ao cliente
+SENSITIVE_COLUMNS = frozenset({"password"})
+
+# Colunas gerenciadas pelo servidor que não podem ser alteradas pelo payload do cliente
+PROTECTED_COLUMNS = frozenset({"id", "family_id", "created_by_id", "created_at"})
+
+
+def column_values(model, data: dict[str, Any], *, exclude: Iterable[str] = PROTECTED_COLUMNS) -> dict[str, Any]:
+    """Filtra o payload para apenas colunas reais do modelo.
+
+    Os schemas de update aceitam campos extras (ex.: `category`, `has_documents`) que
+    o setattr no ORM ignorava silenciosamente; num UPDATE explícito eles quebrariam o SQL.
+    """
+    excluded = set(exclude)
+    columns = model.__mapper__.columns
+    return {key: value for key, value in data.items() if key in columns and key not in excluded}
+
+
+def returning_columns(
+    model,
+    *,
+    include_blobs: bool = False,
+    exclude: Iterable[str] = (),
+) -> list:
+    """Lista explícita de colunas para o RETURNING (sem blobs por padrão).
+
+    Quando o modelo tem `documents` e os blobs ficam de fora, devolve também
+    `has_documents` calculado no próprio banco (sem transferir o conteúdo).
+    """
+    excluded = set(exclude) | SENSITIVE_COLUMNS
+    if not include_blobs:
+        excluded |= BLOB_COLUMNS
+
+    columns = [
+        column for key, column in model.__mapper__.columns.items()
+        if key not in excluded
+    ]
+    if not include_blobs and "documents" in model.__mapper__.columns:
+        documents = model.__mapper__.columns["documents"]
+        columns.append((func.coalesce(func.length(documents), 0) > 2).label("has_documents"))
+    return columns
+
+
+def row_to_dict(model, row) -> dict[str, Any]:
+    """Converte a linha retornada para dict usando o nome dos atributos do modelo.
+
+    Necessário porque alguns atributos têm nome diferente da coluna
+    (ex.: FamilyMember.relationship_type -> coluna "relationship").
+    """
+    column_to_attr = {column.key: attr for attr, column in model.__mapper__.columns.items()}
+    return {column_to_attr.get(key, key): value for key, value in row.items()}
+
+
+def _mark_changed(db: Session, model, row: dict[str, Any]) -> None:
+    """Escritas Core não passam pelo flush do ORM: invalida o cache da família no commit
+    e registra a alteração para a sincronização incremental"""
+    family_id = resolve_family_id(db, model, row)
+    mark_families_changed(db, [family_id])
+    record_changes(db, model, [row["id"]], family_id)
+
+
+def insert_returning(
+    db: Session,
+    model,
+    values: dict[str, Any],
+    *,
+    include_blobs: bool = False,
+    extra_columns: Iterable = (),
+) -> dict[str, Any]:
+    """Executa INSERT ... RETURNING e devolve a linha criada como dict (não faz commit)."""
+    stmt = (
+        insert(model)
+        .values(**inherit_family(model, values))
+        .returning(*returning_columns(model, include_blobs=include_blobs), *extra_columns)
+    )
+    row = row_to_dict(model, db.execute(stmt).mappings().one())
+    _mark_changed(db, model, row)
+    return row
+
+
+def update_returning(
+    db: Session,
+    model,
+    criteria: Iterable,
+    values: dict[str, Any],
+    *,
+    include_blobs: bool = False,
+    extra_columns: Iterable = (),
+) -> Optional[dict[str, Any]]:
+    """Executa UPDATE ... WHERE <criteria> RETURNING e devolve a linha atualizada.
+
+    O filtro de tenancy vai no próprio WHERE, então a busca prévia do objeto também
+    deixa de ser necessária. Retorna None se nenhuma linha casou (não faz commit).
+    """
+    stmt = (
+        update(model)
+        .where(*criteria)
+        .values(**inherit_family(model, values))
+        .returning(*returning_columns(model, include_blobs=include_blobs), *extra_columns)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).mappings().first()
+    if row is None:
+        return None
+    row = row_to_dict(model, row)
+    if "family_id" in values and denormalized_children(model):
+        propagate_family(db, model, [row["id"]], row["family_id"])
+    _mark_changed(db, model, row)
+    return row
@@ -1,13 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, exposition
+from app.core.profiler import ProfileMiddleware
 from app.core.version import get_app_version_info
 from app.api.v1.api import api_router
-from app.db.base import Base, engine
+from app.core.security import READ_PRIMARY_COOKIE, create_primary_token
+from app.db.base import REPLICA_URLS, engine
+from app.db.migrations import SchemaOutdatedError, check_schema
+from app.db.query_stats import track_queries
+from app.db.slow_queries import request_scope
 
-# Registrar todos os modelos para create_all criar as tabelas (inclui family_telegram_config, family_ai_config)
-from app.models import *  # noqa: F401, F403
+# Registrar todos os modelos (relacionamentos declarados pelo nome da classe)
+import app.models  # noqa: F401
+# Listeners que registram alterações e exclusões (GET condicional / sincronização)
+import app.db.sync_log  # noqa: F401
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,40 +34,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Adicionar logging de requisições - com arquivo para debug
+# Logging em fila (stdout/arquivo escritos por uma thread, fora do event loop)
 import logging
-import sys
-
-# Configurar logging para console E arquivo
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app_debug.log', mode='a', encoding='utf-8')
-    ]
-)
+import random
+import time
+
+from app.core.logging_setup import setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 @app.middleware("http")
 async def log_requests(request, call_next):
-    logger.info(f"[REQUEST] {request.method} {request.url}")
+    """Uma linha por requisição (sem query string), amostrada por LOG_REQUEST_SAMPLE_RATE;
+    erros, requisições lentas e suspeitas de N+1 são sempre logados"""
+    started = time.perf_counter()
+    if not settings.QUERY_STATS_ENABLED:
+        with request_scope(request.method, request.url.path):
+            response = await call_next(request)
+        _log_response(request, response, (time.perf_counter() - started) * 1000, None)
+        return response
+
+    with track_queries() as stats, request_scope(request.method, request.url.path):
+        response = await call_next(request)
+    summary = stats.as_dict(settings.QUERY_REPEAT_THRESHOLD)
+    _log_response(request, response, (time.perf_counter() - started) * 1000, summary)
+    if summary["repeated"]:
+        repeated = "; ".join(f"{item['count']}x {item['statement']}" for item in summary["repeated"])
+        logger.warning(f"[N+1] {request.method} {request.url.path}: {repeated}", extra={"query_stats": summary})
+    response.headers["Server-Timing"] = stats.server_timing()
+    return response
+
+def _log_response(request, response, duration_ms: float, summary) -> None:
+    if (
+        response.status_code < 400
+        and duration_ms < settings.LOG_SLOW_REQUEST_MS
+        and random.random() >= settings.LOG_REQUEST_SAMPLE_RATE
+    ):
+        return
+    message = f"[RESPONSE] {request.method} {request.url.path} - Status: {response.status_code} - {duration_ms:.0f}ms"
+    extra = {"http": {"method": request.method, "path": request.url.path, "status": response.status_code, "ms": round(duration_ms, 1)}}
+    if summary is not None:
+        message += f" - queries={summary['queries']} db_ms={summary['db_ms']}"
+        extra["query_stats"] = summary
+    logger.info(message, extra=extra)
+
+@app.middleware("http")
+async def pin_reads_after_write(request, call_next):
+    """Com réplicas de leitura: após uma escrita bem-sucedida, o usuário lê do primário por
+    DB_REPLICA_STICKY_SECONDS (cookie assinado, ver app/api/deps.py:get_read_db)"""
     response = await call_next(request)
-    logger.info(f"[RESPONSE] {request.method} {request.url} - Status: {response.status_code}")
+    if not REPLICA_URLS or request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+        return response
+    # Definido pela autenticação (app/api/deps.py:_authenticated), qualquer que seja o esquema
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            create_primary_token(user_id, settings.DB_REPLICA_STICKY_SECONDS),
+            max_age=settings.DB_REPLICA_STICKY_SECONDS,
+            path=settings.API_V1_STR,
+            httponly=True,
+            samesite="lax",
+        )
     return response
 
+# Compressão por fora dos middlewares acima (Server-Timing e cookies já estão na resposta)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+# Métricas por rota (adicionado por último: envolve os middlewares acima e mede a requisição inteira)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Profiler sob demanda (X-Profile: 1, apenas admin); o mais externo, para cobrir toda a requisição
+app.add_middleware(ProfileMiddleware)
+
 # Incluir rotas da API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
 @app.on_event("startup")
-def startup_create_tables():
-    """Cria tabelas que não existem (ex.: family_telegram_config, family_ai_config)."""
+def startup_check_schema():
+    """Confere se o banco está na última migração (as tabelas são criadas por `alembic upgrade head`)."""
+    if not settings.DB_SCHEMA_CHECK:
+        return
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Tabelas do banco verificadas/criadas.")
+        check_schema(engine)
+    except SchemaOutdatedError:
+        raise
     except Exception as e:
-        logger.exception("Erro ao criar tabelas: %s", e)
+        logger.exception("Erro ao verificar a versão do esquema: %s", e)
 
 
 @app.exception_handler(Exception)
@@ -94,3 +158,13 @@ async def health_check():
         "releaseName": version_info["releaseName"],
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        """Métricas no formato Prometheus (somadas entre os workers quando METRICS_DIR está definido)"""
+        import hmac
+
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if settings.METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        return PlainTextResponse(exposition(), media_type=METRICS_CONTENT_TYPE)
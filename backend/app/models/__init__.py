@@ -1,4 +1,4 @@
-from app.models.user import User, Profile
+from app.models.user import User, Profile, RefreshToken, ApiToken
 from app.models.dashboard import DashboardPreference
 from app.models.family import Family
 from app.models.user_family import user_families
@@ -10,11 +10,15 @@ from app.models.telegram import (
     TelegramUserLink,
     TelegramLinkCode,
 )
-from app.models.finance import FinanceCategory, FinanceEntry, FinanceRecurrence
+from app.models.finance import FinanceCategory, FinanceEntry, FinanceRecurrence, FinanceCategoryUsage
+from app.models.sync import SyncTombstone, SyncChange
+from app.models.system import SlowQueryLog
 
 __all__ = [
     "User",
     "Profile",
+    "RefreshToken",
+    "ApiToken",
     "DashboardPreference",
     "Family",
     "user_families",
@@ -33,4 +37,8 @@ __all__ = [
     "FinanceCategory",
     "FinanceEntry",
     "FinanceRecurrence",
+    "FinanceCategoryUsage",
+    "SyncTombstone",
+    "SyncChange",
+    "SlowQueryLog",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Numeric, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Numeric, Boolean, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -20,6 +20,7 @@ class FinanceCategory(Base):
     
     created_by_id = Column(Integer, ForeignKey("auth_user.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relacionamentos
     family = relationship("Family", back_populates="finance_categories")
@@ -87,3 +88,22 @@ class FinanceRecurrence(Base):
     family = relationship("Family", back_populates="finance_recurrences")
     category = relationship("FinanceCategory", back_populates="recurrences")
     entries = relationship("FinanceEntry", back_populates="recurrence")
+
+class FinanceCategoryUsage(Base):
+    """
+    Uso diário de uma categoria (quantidade e total de lançamentos por dia).
+    Mantido incrementalmente nas escritas de lançamentos; as estatísticas de
+    uso (contagem, último uso, totais de 30/90 dias) são agregadas a partir daqui.
+    App: finance
+    """
+    __tablename__ = "finance_category_usage"
+    __table_args__ = (
+        UniqueConstraint("category_id", "day", name="uq_finance_category_usage_day"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    category_id = Column(Integer, ForeignKey("finance_category.id", ondelete="CASCADE"), nullable=False)
+    family_id = Column(Integer, ForeignKey("families.id", ondelete="CASCADE"), nullable=False, index=True)
+    day = Column(Date, nullable=False)
+    entry_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
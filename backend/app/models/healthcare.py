@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -40,9 +40,14 @@ class MedicalAppointment(Base):
     App: healthcare
     """
     __tablename__ = "healthcare_medicalappointment"
+    __table_args__ = (
+        Index("ix_healthcare_medicalappointment_family_date", "family_id", "appointment_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     family_member_id = Column(Integer, ForeignKey("healthcare_familymember.id"), nullable=False)
+    # Cópia da família do membro (tenancy sem JOIN); mantida por app/db/tenancy.py
+    family_id = Column(Integer, ForeignKey("families.id"), nullable=False)
     doctor_name = Column(String(100), nullable=False)
     specialty = Column(String(100), nullable=False)
     appointment_date = Column(DateTime(timezone=True), nullable=False)
@@ -65,9 +70,14 @@ class MedicalProcedure(Base):
     App: healthcare
     """
     __tablename__ = "healthcare_medicalprocedure"
+    __table_args__ = (
+        Index("ix_healthcare_medicalprocedure_family_date", "family_id", "procedure_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     family_member_id = Column(Integer, ForeignKey("healthcare_familymember.id"), nullable=False)
+    # Cópia da família do membro (tenancy sem JOIN); mantida por app/db/tenancy.py
+    family_id = Column(Integer, ForeignKey("families.id"), nullable=False)
     procedure_name = Column(String(200), nullable=False)
     procedure_date = Column(DateTime(timezone=True), nullable=False)
     doctor_name = Column(String(100), nullable=False)
@@ -93,9 +103,14 @@ class Medication(Base):
     App: healthcare
     """
     __tablename__ = "healthcare_medication"
+    __table_args__ = (
+        Index("ix_healthcare_medication_family_created", "family_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     family_member_id = Column(Integer, ForeignKey("healthcare_familymember.id"), nullable=False)
+    # Cópia da família do membro (tenancy sem JOIN); mantida por app/db/tenancy.py
+    family_id = Column(Integer, ForeignKey("families.id"), nullable=False)
     name = Column(String(100), nullable=False)
     dosage = Column(String(50), nullable=False)
     frequency = Column(String(20), nullable=False)  # once, twice, three_times, etc.
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Numeric, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -61,9 +61,14 @@ class MaintenanceOrder(Base):
     App: maintenance
     """
     __tablename__ = "maintenance_maintenanceorder"
+    __table_args__ = (
+        Index("ix_maintenance_maintenanceorder_family_completion", "family_id", "completion_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     equipment_id = Column(Integer, ForeignKey("maintenance_equipment.id"), nullable=False)
+    # Cópia da família do equipamento (tenancy sem JOIN); mantida por app/db/tenancy.py
+    family_id = Column(Integer, ForeignKey("families.id"), nullable=False)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     status = Column(String(20), nullable=False, default='PENDENTE')  # PENDENTE, EM_ANDAMENTO, CONCLUIDA, CANCELADA
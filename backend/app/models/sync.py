@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class SyncTombstone(Base):
+    """
+    Registro de exclusão (tombstone) dos recursos por família.
+    Permite que clientes detectem exclusões sem baixar a coleção inteira
+    (validador das listagens e sincronização incremental).
+    App: sync
+    """
+    __tablename__ = "sync_tombstone"
+    __table_args__ = (
+        Index("ix_sync_tombstone_family_resource", "family_id", "resource", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Sem FK: o tombstone precisa sobreviver à exclusão dos registros (e da própria família)
+    family_id = Column(Integer, nullable=False)
+    resource = Column(String(50), nullable=False)  # Nome da tabela do registro excluído
+    object_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class SyncChange(Base):
+    """
+    Última alteração (criação/edição) de cada registro sincronizável.
+    Uma linha por registro, atualizada via upsert; `changed_at` usa o relógio do banco.
+    App: sync
+    """
+    __tablename__ = "sync_change"
+    __table_args__ = (
+        UniqueConstraint("resource", "object_id", name="uq_sync_change_object"),
+        Index("ix_sync_change_family_changed", "family_id", "changed_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    family_id = Column(Integer, nullable=False)
+    resource = Column(String(50), nullable=False)  # Nome da tabela do registro
+    object_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
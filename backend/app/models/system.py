@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class SlowQueryLog(Base):
+    """
+    Query que excedeu SLOW_QUERY_MS (gravada apenas com SLOW_QUERY_TABLE=true).
+    Sem valores dos parâmetros: só os tipos (`params`, JSON).
+    App: system
+    """
+    __tablename__ = "system_slowquery"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sql = Column(Text, nullable=False)  # SQL normalizado
+    params = Column(Text, nullable=True)
+    duration_ms = Column(Float, nullable=False)
+    route = Column(String(200), nullable=True)
+    family_id = Column(Integer, nullable=True)  # Sem FK: o log sobrevive à exclusão da família
+    plan = Column(Text, nullable=True)  # EXPLAIN (ANALYZE, BUFFERS), quando amostrado
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
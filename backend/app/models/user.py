@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -23,7 +23,8 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     date_joined = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     family_id = Column(Integer, ForeignKey("families.id"), nullable=True, index=True)  # Mantido para compatibilidade (família principal para staff)
-    api_token = Column(String(100), unique=True, nullable=True, index=True)  # Token de API estático para acesso programático
+    # Incrementado quando permissões, ativação, senha, famílias ou tokens de API mudam (cache de principal, app/core/principals.py)
+    auth_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relacionamentos
     family = relationship("Family", back_populates="users", foreign_keys=[family_id])  # Família principal (para staff)
@@ -54,3 +55,43 @@ class Profile(Base):
     
     # Relacionamento
     user = relationship("User", back_populates="profile")
+
+class RefreshToken(Base):
+    """
+    Refresh token emitido no login (app/core/refresh_tokens.py).
+    Guarda só o hash SHA-256 do token. Cada uso gera um token novo na mesma sessão
+    (rotação); reutilizar um token já trocado revoga a sessão inteira.
+    App: auth
+    """
+    __tablename__ = "auth_refresh_token"
+    __table_args__ = (
+        Index("ix_auth_refresh_token_user_session", "user_id", "session_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("auth_user.id", ondelete="CASCADE"), nullable=False)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    session_id = Column(String(32), nullable=False)  # Mesma para todos os tokens de uma cadeia de rotação
+    auth_version = Column(Integer, nullable=False)  # auth_user.auth_version na emissão (senha/ativação mudou -> inválido)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    used_at = Column(DateTime(timezone=True), nullable=True)  # Trocado por um token novo
+    revoked_at = Column(DateTime(timezone=True), nullable=True)  # Logout ou reuso detectado
+
+class ApiToken(Base):
+    """
+    Token de API (header X-API-Token) para integrações; vários por usuário.
+    Guarda só o SHA-256 do token (busca por índice único) e o prefixo, para o usuário
+    reconhecer o token na listagem. `scopes` limita as áreas da API (app/core/api_tokens.py).
+    App: auth
+    """
+    __tablename__ = "auth_api_token"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("auth_user.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=False, default='')
+    prefix = Column(String(16), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    scopes = Column(String(500), nullable=False, default='*')  # Separados por vírgula; "*" = mesmos acessos do usuário
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)  # Gravado em lote (precisão de API_TOKEN_LAST_USED_FLUSH_SECONDS)
@@ -30,6 +30,11 @@ class FinanceCategory(FinanceCategoryBase):
     id: int
     family_id: int
     created_at: datetime.datetime
+    # Estatísticas de uso (preenchidas na listagem)
+    usage_count: int = 0
+    last_used_date: Optional[datetime.date] = None
+    total_30d: Decimal = Decimal("0")
+    total_90d: Decimal = Decimal("0")
 
     class Config:
         from_attributes = True
@@ -78,6 +83,7 @@ class FinanceEntry(FinanceEntryBase):
     created_at: datetime.datetime
     updated_at: datetime.datetime
     category: Optional[FinanceCategory] = None
+    has_documents: bool = False
 
     class Config:
         from_attributes = True
@@ -121,6 +121,7 @@ class MedicalAppointmentUpdate(BaseModel):
 class MedicalAppointment(MedicalAppointmentBase):
     id: int
     family_member_id: int
+    has_documents: Optional[bool] = None
     created_at: datetime
     updated_at: datetime
     
@@ -198,6 +199,7 @@ class Medication(MedicationBase):
     id: int
     family_member_id: int
     documents: Optional[str] = None
+    has_documents: Optional[bool] = None
     created_at: datetime
     updated_at: datetime
     
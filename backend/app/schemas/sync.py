@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+
+class SyncResponse(BaseModel):
+    token: str  # Token opaco para o próximo GET /sync?since=
+    full: bool  # True: o cliente deve substituir os dados locais (primeiro sync ou token expirado)
+    changes: Dict[str, List[Dict[str, Any]]]  # Registros criados/alterados por recurso (sem blobs)
+    deleted: Dict[str, List[int]]  # IDs excluídos por recurso
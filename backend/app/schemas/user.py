@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import datetime
 
@@ -61,7 +61,6 @@ class User(UserBase):
     family_id: Optional[int] = None
     profile: Optional[Profile] = None
     family_ids: Optional[list[int]] = None  # Para admins (múltiplas famílias)
-    api_token: Optional[str] = None  # Token de API estático
     
     class Config:
         from_attributes = True
@@ -72,3 +71,19 @@ class UserWithProfile(User):
 class ApiTokenResponse(BaseModel):
     api_token: str
     message: str = "Token gerado com sucesso. Use no header X-API-Token para autenticar."
+
+class ApiTokenCreate(BaseModel):
+    name: str = Field("Token de API", max_length=100)
+    scopes: list[str] = ["*"]  # Ver GET /users/me/api-tokens/scopes
+
+class ApiTokenInfo(BaseModel):
+    id: int
+    name: str
+    prefix: str  # Início do token, para identificá-lo (o token completo só aparece na criação)
+    scopes: list[str]
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+
+class ApiTokenCreated(ApiTokenInfo):
+    api_token: str
+    message: str = "Token gerado com sucesso. Copie agora: ele não será exibido novamente."
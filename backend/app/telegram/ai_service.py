@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 from openai import OpenAI, AzureOpenAI
 
 from app.models.user import User
+from app.core.metrics import observe_ai_call
 from app.models.telegram import FamilyAIConfig
 from app.models.healthcare import FamilyMember, MedicalAppointment, Medication
 from app.models.maintenance import Equipment, MaintenanceOrder
@@ -126,22 +127,18 @@ def _execute_tool(name: str, arguments: dict, db: Session, user: User) -> str:
     try:
         if name == "get_dashboard_stats":
             total_members = db.query(func.count(FamilyMember.id)).filter(FamilyMember.family_id == family_id).scalar() or 0
-            total_appointments = db.query(func.count(MedicalAppointment.id)).join(
-                FamilyMember, MedicalAppointment.family_member_id == FamilyMember.id
-            ).filter(
-                FamilyMember.family_id == family_id,
+            total_appointments = db.query(func.count(MedicalAppointment.id)).filter(
+                MedicalAppointment.family_id == family_id,
                 MedicalAppointment.appointment_date >= now
             ).scalar() or 0
             total_equipment = db.query(func.count(Equipment.id)).filter(Equipment.family_id == family_id).scalar() or 0
-            active_medications = db.query(func.count(Medication.id)).join(
-                FamilyMember, Medication.family_member_id == FamilyMember.id
-            ).filter(
-                FamilyMember.family_id == family_id,
+            active_medications = db.query(func.count(Medication.id)).filter(
+                Medication.family_id == family_id,
                 (Medication.end_date == None) | (Medication.end_date >= now.date())
             ).scalar() or 0
-            total_orders = db.query(func.count(MaintenanceOrder.id)).join(
-                Equipment, MaintenanceOrder.equipment_id == Equipment.id
-            ).filter(Equipment.family_id == family_id).scalar() or 0
+            total_orders = db.query(func.count(MaintenanceOrder.id)).filter(
+                MaintenanceOrder.family_id == family_id
+            ).scalar() or 0
             return json.dumps({
                 "total_members": total_members,
                 "total_appointments": total_appointments,
@@ -179,7 +176,7 @@ def _execute_tool(name: str, arguments: dict, db: Session, user: User) -> str:
                 db.query(MedicalAppointment, FamilyMember.name)
                 .join(FamilyMember, MedicalAppointment.family_member_id == FamilyMember.id)
                 .filter(
-                    FamilyMember.family_id == family_id,
+                    MedicalAppointment.family_id == family_id,
                     MedicalAppointment.appointment_date >= now
                 )
                 .order_by(MedicalAppointment.appointment_date)
@@ -202,7 +199,7 @@ def _execute_tool(name: str, arguments: dict, db: Session, user: User) -> str:
                 db.query(Medication, FamilyMember.name)
                 .join(FamilyMember, Medication.family_member_id == FamilyMember.id)
                 .filter(
-                    FamilyMember.family_id == family_id,
+                    Medication.family_id == family_id,
                     (Medication.end_date == None) | (Medication.end_date >= now.date())
                 )
                 .all()
@@ -217,7 +214,7 @@ def _execute_tool(name: str, arguments: dict, db: Session, user: User) -> str:
             q = (
                 db.query(MaintenanceOrder, Equipment.name)
                 .join(Equipment, MaintenanceOrder.equipment_id == Equipment.id)
-                .filter(Equipment.family_id == family_id)
+                .filter(MaintenanceOrder.family_id == family_id)
             )
             if arguments.get("status_filter"):
                 q = q.filter(MaintenanceOrder.status == arguments["status_filter"])
@@ -304,7 +301,8 @@ def process_message_with_ai(message: str, user: User, db: Session) -> str:
             if provider == "nvidia-nim":
                 request_kwargs["extra_body"] = {"chat_template_kwargs": {"thinking": False}}
 
-            response = client.chat.completions.create(**request_kwargs)
+            with observe_ai_call(provider, model, "telegram_chat"):
+                response = client.chat.completions.create(**request_kwargs)
         except Exception as e:
             logger.exception("Erro ao chamar LLM")
             return f"Erro ao processar com IA: {str(e)[:200]}"
@@ -5,6 +5,7 @@ from typing import Optional, Dict, Any
 import pymupdf
 from openai import OpenAI, AzureOpenAI
 from sqlalchemy.orm import Session
+from app.core.metrics import observe_ai_call
 from app.models.telegram import FamilyAIConfig
 
 logger = logging.getLogger(__name__)
@@ -142,9 +143,10 @@ def analyze_receipt(file_bytes: bytes, family_id: int, db: Session, mime_type: O
         if provider == "nvidia-nim":
             request_kwargs["extra_body"] = {"chat_template_kwargs": {"thinking": False}}
 
-        response = client.chat.completions.create(
-            **request_kwargs
-        )
+        with observe_ai_call(provider, vision_model, "receipt"):
+            response = client.chat.completions.create(
+                **request_kwargs
+            )
         
         content = (response.choices[0].message.content or "").strip()
         if not content:
@@ -0,0 +1,128 @@
+"""
+Estatísticas de uso das categorias financeiras.
+
+Cada escrita de lançamento gera deltas (quantidade e valor) por categoria/dia, que
+são somados na tabela `finance_category_usage` via upsert. A listagem de categorias
+agrega esses buckets diários em vez de varrer todos os lançamentos.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.finance import FinanceCategoryUsage
+
+# Chave do bucket: (family_id, category_id, dia)
+UsageKey = tuple[int, int, date]
+UsageDelta = tuple[int, Decimal]
+
+# Colunas de FinanceEntry necessárias para calcular os deltas de uso
+USAGE_FIELDS = ("family_id", "category_id", "date", "amount")
+
+
+def _snapshot(entry: Any) -> Optional[dict[str, Any]]:
+    """Normaliza um lançamento (dict ou objeto ORM) para os campos usados nas estatísticas"""
+    if entry is None:
+        return None
+    if isinstance(entry, Mapping):
+        return {field: entry.get(field) for field in USAGE_FIELDS}
+    return {field: getattr(entry, field, None) for field in USAGE_FIELDS}
+
+
+def build_usage_deltas(changes: Iterable[tuple[Any, Any]]) -> dict[UsageKey, UsageDelta]:
+    """Calcula os deltas de uso a partir de pares (antes, depois) de lançamentos.
+
+    - criação: (None, novo)
+    - exclusão: (antigo, None)
+    - edição: (antigo, novo)
+
+    Lançamentos sem categoria são ignorados e deltas nulos são descartados.
+    """
+    deltas: dict[UsageKey, list] = {}
+
+    def add(snapshot: Optional[dict[str, Any]], sign: int) -> None:
+        if not snapshot or not snapshot["category_id"] or not snapshot["date"]:
+            return
+        key = (snapshot["family_id"], snapshot["category_id"], snapshot["date"])
+        bucket = deltas.setdefault(key, [0, Decimal("0")])
+        bucket[0] += sign
+        bucket[1] += sign * Decimal(str(snapshot["amount"] or 0))
+
+    for old, new in changes:
+        add(_snapshot(old), -1)
+        add(_snapshot(new), 1)
+
+    return {
+        key: (count, amount)
+        for key, (count, amount) in deltas.items()
+        if count != 0 or amount != 0
+    }
+
+
+def apply_usage_deltas(db: Session, deltas: Mapping[UsageKey, UsageDelta]) -> None:
+    """Soma os deltas na tabela de uso com INSERT ... ON CONFLICT DO UPDATE (não faz commit).
+
+    As linhas são enviadas ordenadas pela chave para que transações concorrentes
+    travem os buckets sempre na mesma ordem.
+    """
+    if not deltas:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    rows = [
+        {
+            "family_id": family_id,
+            "category_id": category_id,
+            "day": day,
+            "entry_count": count,
+            "total_amount": amount,
+        }
+        for (family_id, category_id, day), (count, amount) in sorted(deltas.items())
+    ]
+    stmt = insert(FinanceCategoryUsage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FinanceCategoryUsage.category_id, FinanceCategoryUsage.day],
+        set_={
+            "entry_count": FinanceCategoryUsage.entry_count + stmt.excluded.entry_count,
+            "total_amount": FinanceCategoryUsage.total_amount + stmt.excluded.total_amount,
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def record_entry_usage(db: Session, changes: Iterable[tuple[Any, Any]]) -> None:
+    """Atalho: calcula e aplica os deltas de uso dos lançamentos alterados"""
+    apply_usage_deltas(db, build_usage_deltas(changes))
+
+
+def category_usage_stats(*criteria, today: Optional[date] = None):
+    """Subquery com as estatísticas agregadas por categoria (filtrada por `criteria`).
+
+    Colunas: category_id, usage_count, last_used_date, total_30d, total_90d.
+    Lançamentos futuros (ex.: recorrências já geradas) contam no total de uso,
+    mas não no último uso nem nas janelas de 30/90 dias.
+    """
+    today = today or date.today()
+    usage = FinanceCategoryUsage
+
+    def in_window(days: int):
+        return and_(usage.day > today - timedelta(days=days), usage.day <= today)
+
+    return (
+        select(
+            usage.category_id,
+            func.sum(usage.entry_count).label("usage_count"),
+            func.max(case((and_(usage.entry_count > 0, usage.day <= today), usage.day))).label("last_used_date"),
+            func.sum(case((in_window(30), usage.total_amount), else_=0)).label("total_30d"),
+            func.sum(case((in_window(90), usage.total_amount), else_=0)).label("total_90d"),
+        )
+        .where(*criteria)
+        .group_by(usage.category_id)
+        .subquery()
+    )
@@ -0,0 +1,135 @@
+"""
+GET condicional (ETag / Last-Modified) para as listagens por família.
+
+O estado de uma coleção é calculado numa única consulta agregada — quantidade de
+linhas, max(updated_at) e o último tombstone do recurso (exclusões) — sem carregar
+nem serializar as linhas. Se o cliente envia `If-None-Match` (ou `If-Modified-Since`)
+compatível com o estado atual, a resposta é 304 sem corpo.
+
+O ETag é fraco (W/): identifica o conteúdo, não os bytes (a resposta pode ser
+comprimida ou serializada de formas diferentes).
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+
+from app.db.sync_log import resource_name
+from app.models.sync import SyncTombstone
+
+# Fonte do validador: (modelo, critérios que restringem o modelo ao escopo das famílias)
+Source = tuple[type, Sequence]
+
+
+@dataclass(frozen=True)
+class CollectionState:
+    family_ids: tuple[int, ...]
+    values: tuple
+    last_modified: Optional[datetime]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def collection_state(db: Session, family_ids: Iterable[int], *sources: Source) -> CollectionState:
+    """Calcula o estado das coleções (contagem, max(updated_at) e último tombstone) numa consulta.
+
+    Listagens que embutem dados de outro recurso (ex.: nome do equipamento nas ordens)
+    devem passar também a fonte desse recurso.
+    """
+    family_ids = tuple(sorted(set(family_ids)))
+    aggregates = [
+        select(func.count().label("count"), func.max(model.updated_at).label("updated_at"))
+        .select_from(model)
+        .where(*criteria)
+        .subquery()
+        for model, criteria in sources
+    ]
+    tombstones = (
+        select(func.max(SyncTombstone.id).label("id"), func.max(SyncTombstone.deleted_at).label("deleted_at"))
+        .where(
+            SyncTombstone.family_id.in_(family_ids),
+            SyncTombstone.resource.in_([resource_name(model) for model, _ in sources]),
+        )
+        .subquery()
+    )
+    # Agregados sempre retornam uma linha: o produto cartesiano é explícito e barato
+    subqueries = [*aggregates, tombstones]
+    from_clause = subqueries[0]
+    for subquery in subqueries[1:]:
+        from_clause = from_clause.join(subquery, true())
+    columns = [column for subquery in subqueries for column in subquery.c]
+    row = tuple(db.execute(select(*columns).select_from(from_clause)).one())
+
+    timestamps = [_as_utc(value) for value in row if isinstance(value, datetime)]
+    return CollectionState(
+        family_ids=family_ids,
+        values=tuple(_as_utc(value).isoformat() if isinstance(value, datetime) else value for value in row),
+        last_modified=max(timestamps) if timestamps else None,
+    )
+
+
+def make_etag(request: Request, state: CollectionState) -> str:
+    """ETag fraco a partir do estado da coleção, da rota e dos parâmetros da consulta"""
+    payload = json.dumps(
+        [request.url.path, sorted(request.query_params.multi_items()), state.family_ids, state.values],
+        default=str,
+    )
+    return f'W/"{hashlib.sha1(payload.encode()).hexdigest()[:32]}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Comparação fraca (RFC 9110): ignora o prefixo W/"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified tem resolução de segundos
+    return last_modified.replace(microsecond=0) <= _as_utc(since)
+
+
+def conditional_response(request: Request, response: Response, state: CollectionState) -> Optional[Response]:
+    """Define ETag/Last-Modified na resposta e devolve um 304 se o cliente já tem a versão atual.
+
+    Deve ser chamada antes de carregar as linhas; se retornar uma resposta, o endpoint
+    a devolve diretamente.
+    """
+    headers = {
+        "ETag": make_etag(request, state),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if state.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(state.last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, state.last_modified)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,113 @@
+"""
+Caminho rápido das listagens grandes (opt-in: FAST_LIST_RESPONSES).
+
+No caminho padrão as listagens carregam objetos do ORM (identity map, relationships),
+o `response_model` valida cada item de novo (validators de data etc.) e o FastAPI
+serializa com o json da biblioteca padrão. Aqui:
+- o SELECT traz só as colunas dos campos do schema de resposta, como tuplas;
+- cada linha vira um dict direto, sem ORM e sem revalidar (os tipos vêm das colunas);
+- o corpo é serializado com orjson (json da biblioteca padrão se não estiver instalado).
+
+A saída é a mesma do caminho padrão: mesmos campos, na mesma ordem, e mesmos formatos
+(datas ISO 8601, UTC como "Z", Decimal como string).
+Benchmark: scripts/benchmark_fast_json.py.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any, Iterable, Optional
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional
+    orjson = None
+
+
+def _default(value: Any):
+    """Tipos que o orjson não serializa sozinho (e todos os não nativos, no fallback)"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).decode()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Resposta serializada com orjson, levando os headers já definidos no `response` injetado
+    (ETag, Last-Modified...): o FastAPI não os copia quando o endpoint devolve um Response"""
+    headers = {}
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return FastJSONResponse(content, headers=headers)
+
+
+def schema_select(model, schema, computed: Optional[dict] = None, skip: Iterable[str] = (),
+                  fields: Optional[Iterable[str]] = None):
+    """SELECT só com as colunas dos campos do schema, na ordem do schema.
+
+    `computed` define expressões para campos que não são colunas do modelo (rotuladas com o
+    nome do campo). Os campos em `skip` e os que não são colunas ficam de fora; `schema_rows`
+    preenche com o default do schema. `fields` restringe aos campos pedidos
+    (app/utils/sparse_fields.py).
+    """
+    computed = computed or {}
+    columns = model.__mapper__.columns
+    expressions = []
+    for name in _field_names(schema, fields):
+        if name in skip:
+            continue
+        if name in computed:
+            expressions.append(computed[name].label(name))
+        elif name in columns:
+            expressions.append(getattr(model, name))
+    return select(*expressions)
+
+
+def schema_rows(db: Session, statement, schema, fields: Optional[Iterable[str]] = None, **overrides) -> list[dict]:
+    """Executa o SELECT e monta um dict por linha (tuplas, sem identity map).
+
+    Campos do schema (ou de `fields`) fora do SELECT recebem `overrides[campo]` ou o default
+    do schema.
+    """
+    names = _field_names(schema, fields)
+    result = db.execute(statement)
+    keys = list(result.keys())
+    missing = [name for name in names if name not in keys]
+    if not missing and keys == names:
+        return [dict(zip(keys, row)) for row in result]
+    constants = tuple(overrides.get(name, schema.model_fields[name].default) for name in missing)
+    # Linha + constantes, reordenadas na ordem dos campos do schema (a do caminho padrão)
+    positions = {name: index for index, name in enumerate(keys + missing)}
+    order = [name for name in names if name in positions]
+    pick = itemgetter(*(positions[name] for name in order))
+    return [dict(zip(order, pick(tuple(row) + constants))) for row in result]
+
+
+def _field_names(schema, fields: Optional[Iterable[str]]) -> list[str]:
+    if fields is None:
+        return list(schema.model_fields)
+    fields = set(fields)
+    return [name for name in schema.model_fields if name in fields]
@@ -0,0 +1,49 @@
+"""
+Sparse fieldsets nas listagens: `?fields=id,description,amount`.
+
+Cada recurso declara um `FieldSet` (allow-list) a partir do schema de resposta. Os campos
+pedidos viram as colunas do SELECT (app/utils/fast_json.py: schema_select/schema_rows),
+então o payload e a leitura no banco diminuem juntos — textos longos (notes, diagnosis,
+documents...) nem saem do banco se não forem pedidos. A resposta traz só os campos
+pedidos, na ordem do schema, e sempre o `id`.
+
+Campo fora da allow-list responde 400 com a lista dos permitidos. Relacionamentos
+embutidos (categoria do lançamento) e campos calculados caros (foto do membro) ficam
+fora: pedir a listagem completa ou usar o id (`category_id`).
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+
+FIELDS_QUERY = Query(
+    None,
+    description="Campos da resposta, separados por vírgula (ex.: id,description,amount). Padrão: todos",
+)
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    """Allow-list de campos de um recurso: os do schema de resposta menos `exclude`"""
+    schema: type
+    exclude: tuple[str, ...] = ()
+
+    @property
+    def allowed(self) -> tuple[str, ...]:
+        return tuple(name for name in self.schema.model_fields if name not in self.exclude)
+
+    def parse(self, fields: Optional[str]) -> Optional[tuple[str, ...]]:
+        """Campos pedidos, validados e na ordem do schema; None = resposta completa"""
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        if not requested:
+            return None
+        unknown = requested - set(self.allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos inválidos: {', '.join(sorted(unknown))}. Permitidos: {', '.join(self.allowed)}",
+            )
+        requested.add("id")
+        return tuple(name for name in self.allowed if name in requested)
@@ -0,0 +1,118 @@
+"""
+Servidor de produção: gunicorn gerenciando N workers uvicorn.
+
+Uso:  gunicorn app.main:app -c gunicorn.conf.py
+
+Variáveis de ambiente:
+- WEB_CONCURRENCY: número fixo de workers (padrão: 2 por CPU da cota do container, limitado para
+  que cada worker tenha DB_POOL_MIN_PER_WORKER conexões do DB_POOL_SIZE por servidor)
+- WORKERS_PER_CPU / MAX_WORKERS: ajuste do cálculo automático
+- PORT: porta (padrão 8001)
+- GRACEFUL_TIMEOUT / TIMEOUT: segundos para o worker terminar as requisições / responder
+- LOG_FILE: arquivo de log com rotação (padrão aqui: vazio, apenas stdout — coletado pelo container)
+- METRICS_DIR: snapshots das métricas de cada worker, somados no /metrics (padrão: /tmp/gf-metrics)
+- CACHE_REDIS_URL: cache de respostas e rate limit compartilhados entre os workers. Sem ele,
+  com mais de um worker o cache fica desligado e o rate limit é dividido entre os workers
+
+Reinício gradual: `kill -HUP <pid do master>` sobe workers novos e encerra os antigos
+após concluírem as requisições em andamento. Com preload_app, o código novo só é
+carregado num restart do master (ex.: novo container).
+"""
+import os
+
+from app.core.workers import default_workers, pool_capped_workers
+
+workers = int(os.getenv("WEB_CONCURRENCY") or 0)
+if not workers:
+    # Automático: pela cota de CPU, sem passar do pool do banco (DB_POOL_SIZE, app/db/base.py).
+    # Lido do ambiente (mesmos padrões de app/core/config.py): as configurações ainda não foram carregadas
+    workers = pool_capped_workers(
+        default_workers(
+            per_cpu=int(os.getenv("WORKERS_PER_CPU", "2")),
+            max_workers=int(os.getenv("MAX_WORKERS", "0")) or None,
+        ),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        min_per_worker=int(os.getenv("DB_POOL_MIN_PER_WORKER", "4")),
+        servers=1 + len([url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]),
+    )
+# Exportado antes do preload: a aplicação divide o pool do banco entre os workers (app/db/base.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Sem isso, cada scrape do /metrics veria só o worker que o atendeu (app/core/metrics.py)
+os.environ.setdefault("METRICS_DIR", "/tmp/gf-metrics")
+os.environ.setdefault("PROFILE_DIR", "/tmp/gf-profiles")  # Perfis (X-Profile) listados de qualquer worker
+# Vários processos rotacionando o mesmo arquivo se atropelam: em produção, log só no stdout
+os.environ.setdefault("LOG_FILE", "")
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+
+# Carrega a aplicação uma vez no master (imports pesados) e faz fork dos workers
+preload_app = True
+
+timeout = int(os.getenv("TIMEOUT", "120"))  # Upload/análise de comprovantes pode demorar
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recicla workers periodicamente (memória de imagens/PDFs), com jitter para não reiniciar todos juntos
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = None  # A aplicação já loga as requisições
+errorlog = "-"
+
+
+def when_ready(server):
+    """Loga o pool do banco por worker e os backends de cache e rate limit escolhidos.
+
+    Estado em memória seria por worker: com mais de um, o cache vira redis ou none e o
+    rate limit vira redis ou 1/N do limite por worker (app/core/cache.py, app/core/rate_limit.py).
+    """
+    from app.core.cache import cache_backend
+    from app.core.rate_limit import buckets_backend
+
+    from app.db.base import POOL_LIMITS
+
+    cache, buckets = cache_backend(), buckets_backend()
+    server.log.info(
+        f"[WORKERS] {workers} workers; pool por worker (tamanho, overflow): sync {POOL_LIMITS['sync']}, "
+        f"async {POOL_LIMITS['async']}; cache: {cache}; rate limit: {buckets}"
+    )
+    if workers > 1 and cache == "none":
+        server.log.warning("[WORKERS] Cache de respostas desabilitado: defina CACHE_REDIS_URL para compartilhá-lo entre os workers")
+    if workers > 1 and buckets == "memory":
+        server.log.warning(f"[WORKERS] Rate limit em memória: cada worker aplica 1/{workers} do limite")
+
+
+def on_starting(server):
+    """Descarta snapshots e o agregado de métricas de uma execução anterior do master"""
+    from pathlib import Path
+
+    from app.core.metrics import EXITED_FILE
+
+    directory = Path(os.environ["METRICS_DIR"])
+    for path in directory.glob("metrics_*.json"):
+        path.unlink(missing_ok=True)
+    (directory / EXITED_FILE).unlink(missing_ok=True)
+
+
+def child_exit(server, worker):
+    """Soma os counters/histogramas do worker encerrado no agregado e apaga o snapshot dele"""
+    from app.core.metrics import fold_exited_worker
+
+    try:
+        fold_exited_worker(os.environ["METRICS_DIR"], worker.pid)
+    except Exception as e:
+        server.log.warning(f"[METRICS] Falha ao agregar o worker {worker.pid}: {e}")
+
+
+def post_fork(server, worker):
+    """Conexões abertas no master (preload) não podem ser compartilhadas entre processos"""
+    from app.core.cache import set_cache
+    from app.db.base import async_engine, async_replica_engines, engine, replica_engines
+
+    for sync_engine in (engine, *replica_engines):
+        sync_engine.dispose(close=False)
+    for engine_async in (async_engine, *async_replica_engines):
+        engine_async.sync_engine.dispose(close=False)
+    # O backend de cache é recriado sob demanda no worker (socket RESP próprio)
+    set_cache(None)
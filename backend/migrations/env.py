@@ -0,0 +1,69 @@
+"""
+Ambiente do Alembic: usa a DATABASE_URL da aplicação e o metadata dos modelos.
+
+Várias instâncias podem executar `alembic upgrade head` ao mesmo tempo (deploy com
+réplicas): no Postgres um advisory lock serializa as execuções e as seguintes
+encontram o banco já na revisão final.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool, text
+
+from app.core.config import settings
+from app.db.base import Base
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Chave arbitrária do advisory lock das migrações
+MIGRATION_LOCK_ID = 720_331
+
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL das migrações sem conectar (alembic upgrade head --sql)"""
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # Conexão fornecida por quem chamou (ex.: testes via config.attributes)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = create_engine(_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
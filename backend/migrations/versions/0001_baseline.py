@@ -0,0 +1,539 @@
+"""Esquema base
+
+Substitui o `Base.metadata.create_all` do startup e os scripts avulsos
+(scripts/create_tables.py, create_user_families_table.py, add_family_id_to_users.py,
+check_family_member_table.py, migrate_all_family_tables.py, migrate_users_to_family.py
+e update_finance_schema.py).
+
+Bancos existentes também podem rodar esta migração: tabelas já criadas são mantidas
+e as colunas que os scripts antigos adicionavam são criadas se faltarem.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 06:33:55.231384
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Colunas adicionadas pelos scripts antigos a bancos anteriores à v1.1: (tabela, coluna, tabela referenciada)
+_LEGACY_COLUMNS = (
+    ('auth_user', 'family_id', 'families'),
+    ('healthcare_familymember', 'family_id', 'families'),
+    ('maintenance_equipment', 'family_id', 'families'),
+    ('finance_category', 'created_by_id', 'auth_user'),
+)
+
+
+def _missing(inspector, table: str) -> bool:
+    # Sem inspector no modo offline (alembic upgrade head --sql): gera o esquema completo
+    return inspector is None or not inspector.has_table(table)
+
+
+def _upgrade_legacy_schema(inspector) -> None:
+    """Adiciona as colunas de família/autor que faltarem e associa os registros antigos
+    à família padrão (código DEFAULT) e ao primeiro usuário, como faziam os scripts"""
+    if inspector is None:
+        return
+    bind = op.get_bind()
+    added = []
+    for table, column, target in _LEGACY_COLUMNS:
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+        if bind.dialect.name != 'sqlite':
+            op.create_foreign_key(f'fk_{table}_{column[:-3]}', table, target, [column], ['id'])
+        if column == 'family_id':
+            op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+        added.append((table, column))
+    if not added:
+        return
+
+    if any(column == 'family_id' for _, column in added):
+        default_family = bind.execute(sa.text("SELECT id FROM families WHERE codigo_unico = 'DEFAULT'")).scalar()
+        if default_family is None:
+            bind.execute(sa.text(
+                "INSERT INTO families (name, codigo_unico, created_at, updated_at) "
+                "VALUES ('Família Padrão', 'DEFAULT', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            ))
+    for table, column in added:
+        source = (
+            "SELECT id FROM families WHERE codigo_unico = 'DEFAULT'" if column == 'family_id'
+            else 'SELECT MIN(id) FROM auth_user'
+        )
+        bind.execute(sa.text(f'UPDATE {table} SET {column} = ({source}) WHERE {column} IS NULL'))
+
+
+def upgrade() -> None:
+    """Esquema completo. Tabelas já existentes (bancos criados com create_all) são mantidas."""
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    if _missing(inspector, 'families'):
+        op.create_table('families',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('codigo_unico', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_families_codigo_unico'), 'families', ['codigo_unico'], unique=True)
+        op.create_index(op.f('ix_families_id'), 'families', ['id'], unique=False)
+    if _missing(inspector, 'sync_change'):
+        op.create_table('sync_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(length=50), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('resource', 'object_id', name='uq_sync_change_object')
+        )
+        op.create_index('ix_sync_change_family_changed', 'sync_change', ['family_id', 'changed_at'], unique=False)
+        op.create_index(op.f('ix_sync_change_id'), 'sync_change', ['id'], unique=False)
+    if _missing(inspector, 'sync_tombstone'):
+        op.create_table('sync_tombstone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(length=50), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_sync_tombstone_family_resource', 'sync_tombstone', ['family_id', 'resource', 'id'], unique=False)
+        op.create_index(op.f('ix_sync_tombstone_id'), 'sync_tombstone', ['id'], unique=False)
+    if _missing(inspector, 'auth_user'):
+        op.create_table('auth_user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('password', sa.String(length=128), nullable=False),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_superuser', sa.Boolean(), nullable=False),
+        sa.Column('username', sa.String(length=150), nullable=False),
+        sa.Column('first_name', sa.String(length=150), nullable=False),
+        sa.Column('last_name', sa.String(length=150), nullable=False),
+        sa.Column('email', sa.String(length=254), nullable=False),
+        sa.Column('is_staff', sa.Boolean(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('date_joined', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=True),
+        sa.Column('api_token', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_auth_user_api_token'), 'auth_user', ['api_token'], unique=True)
+        op.create_index(op.f('ix_auth_user_family_id'), 'auth_user', ['family_id'], unique=False)
+        op.create_index(op.f('ix_auth_user_id'), 'auth_user', ['id'], unique=False)
+        op.create_index(op.f('ix_auth_user_username'), 'auth_user', ['username'], unique=True)
+    if _missing(inspector, 'family_ai_config'):
+        op.create_table('family_ai_config',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('enabled', sa.Boolean(), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('openai_api_key', sa.Text(), nullable=True),
+        sa.Column('openai_model', sa.String(length=80), nullable=False),
+        sa.Column('azure_endpoint', sa.String(length=500), nullable=True),
+        sa.Column('azure_api_key', sa.Text(), nullable=True),
+        sa.Column('azure_deployment', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_family_ai_config_family_id'), 'family_ai_config', ['family_id'], unique=True)
+        op.create_index(op.f('ix_family_ai_config_id'), 'family_ai_config', ['id'], unique=False)
+    if _missing(inspector, 'family_telegram_config'):
+        op.create_table('family_telegram_config',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('bot_token', sa.String(length=200), nullable=False),
+        sa.Column('webhook_secret', sa.String(length=100), nullable=True),
+        sa.Column('bot_username', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_family_telegram_config_family_id'), 'family_telegram_config', ['family_id'], unique=True)
+        op.create_index(op.f('ix_family_telegram_config_id'), 'family_telegram_config', ['id'], unique=False)
+    if _missing(inspector, 'healthcare_familymember'):
+        op.create_table('healthcare_familymember',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('photo', sa.Text(), nullable=True),
+        sa.Column('birth_date', sa.Date(), nullable=False),
+        sa.Column('gender', sa.String(length=1), nullable=True),
+        sa.Column('relationship', sa.String(length=50), nullable=True),
+        sa.Column('blood_type', sa.String(length=5), nullable=False),
+        sa.Column('allergies', sa.Text(), nullable=False),
+        sa.Column('chronic_conditions', sa.Text(), nullable=False),
+        sa.Column('emergency_contact', sa.String(length=100), nullable=True),
+        sa.Column('emergency_phone', sa.String(length=20), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=False),
+        sa.Column('order', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_healthcare_familymember_family_id'), 'healthcare_familymember', ['family_id'], unique=False)
+        op.create_index(op.f('ix_healthcare_familymember_id'), 'healthcare_familymember', ['id'], unique=False)
+    if _missing(inspector, 'accounts_profile'):
+        op.create_table('accounts_profile',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('address', sa.String(length=200), nullable=False),
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('state', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+        op.create_index(op.f('ix_accounts_profile_id'), 'accounts_profile', ['id'], unique=False)
+    if _missing(inspector, 'dashboard_dashboardpreference'):
+        op.create_table('dashboard_dashboardpreference',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('show_pending_maintenance', sa.Boolean(), nullable=False),
+        sa.Column('show_equipment_stats', sa.Boolean(), nullable=False),
+        sa.Column('show_cost_analysis', sa.Boolean(), nullable=False),
+        sa.Column('show_upcoming_maintenance', sa.Boolean(), nullable=False),
+        sa.Column('days_to_alert', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+        op.create_index(op.f('ix_dashboard_dashboardpreference_id'), 'dashboard_dashboardpreference', ['id'], unique=False)
+    if _missing(inspector, 'finance_category'):
+        op.create_table('finance_category',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('icon', sa.String(length=50), nullable=True),
+        sa.Column('color', sa.String(length=20), nullable=True),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['auth_user.id'], ),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_finance_category_family_id'), 'finance_category', ['family_id'], unique=False)
+        op.create_index(op.f('ix_finance_category_id'), 'finance_category', ['id'], unique=False)
+    if _missing(inspector, 'healthcare_medicalappointment'):
+        op.create_table('healthcare_medicalappointment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_member_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_name', sa.String(length=100), nullable=False),
+        sa.Column('specialty', sa.String(length=100), nullable=False),
+        sa.Column('appointment_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=False),
+        sa.Column('reason', sa.Text(), nullable=False),
+        sa.Column('diagnosis', sa.Text(), nullable=False),
+        sa.Column('prescription', sa.Text(), nullable=False),
+        sa.Column('next_appointment', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=False),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_member_id'], ['healthcare_familymember.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_healthcare_medicalappointment_id'), 'healthcare_medicalappointment', ['id'], unique=False)
+    if _missing(inspector, 'healthcare_medicalprocedure'):
+        op.create_table('healthcare_medicalprocedure',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_member_id', sa.Integer(), nullable=False),
+        sa.Column('procedure_name', sa.String(length=200), nullable=False),
+        sa.Column('procedure_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('doctor_name', sa.String(length=100), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('results', sa.Text(), nullable=False),
+        sa.Column('follow_up_notes', sa.Text(), nullable=False),
+        sa.Column('next_procedure_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_member_id'], ['healthcare_familymember.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_healthcare_medicalprocedure_id'), 'healthcare_medicalprocedure', ['id'], unique=False)
+    if _missing(inspector, 'healthcare_medication'):
+        op.create_table('healthcare_medication',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_member_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('dosage', sa.String(length=50), nullable=False),
+        sa.Column('frequency', sa.String(length=20), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('prescribed_by', sa.String(length=100), nullable=False),
+        sa.Column('prescription_number', sa.String(length=50), nullable=False),
+        sa.Column('instructions', sa.Text(), nullable=False),
+        sa.Column('side_effects', sa.Text(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=False),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_member_id'], ['healthcare_familymember.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_healthcare_medication_id'), 'healthcare_medication', ['id'], unique=False)
+    if _missing(inspector, 'maintenance_equipment'):
+        op.create_table('maintenance_equipment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=True),
+        sa.Column('brand', sa.String(length=100), nullable=True),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('serial_number', sa.String(length=100), nullable=True),
+        sa.Column('purchase_date', sa.Date(), nullable=True),
+        sa.Column('warranty_expiry', sa.Date(), nullable=True),
+        sa.Column('service_provider', sa.String(length=200), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=False),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.ForeignKeyConstraint(['owner_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_maintenance_equipment_family_id'), 'maintenance_equipment', ['family_id'], unique=False)
+        op.create_index(op.f('ix_maintenance_equipment_id'), 'maintenance_equipment', ['id'], unique=False)
+    if _missing(inspector, 'telegram_link_code'):
+        op.create_table('telegram_link_code',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(length=20), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_telegram_link_code_code'), 'telegram_link_code', ['code'], unique=True)
+        op.create_index(op.f('ix_telegram_link_code_id'), 'telegram_link_code', ['id'], unique=False)
+        op.create_index(op.f('ix_telegram_link_code_user_id'), 'telegram_link_code', ['user_id'], unique=False)
+    if _missing(inspector, 'telegram_user_link'):
+        op.create_table('telegram_user_link',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('telegram_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('telegram_chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('telegram_username', sa.String(length=100), nullable=True),
+        sa.Column('use_ai', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_telegram_user_link_id'), 'telegram_user_link', ['id'], unique=False)
+        op.create_index(op.f('ix_telegram_user_link_telegram_chat_id'), 'telegram_user_link', ['telegram_chat_id'], unique=False)
+        op.create_index(op.f('ix_telegram_user_link_telegram_user_id'), 'telegram_user_link', ['telegram_user_id'], unique=True)
+        op.create_index(op.f('ix_telegram_user_link_user_id'), 'telegram_user_link', ['user_id'], unique=True)
+    if _missing(inspector, 'user_families'):
+        op.create_table('user_families',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'family_id')
+        )
+    if _missing(inspector, 'finance_category_usage'):
+        op.create_table('finance_category_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['finance_category.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('category_id', 'day', name='uq_finance_category_usage_day')
+        )
+        op.create_index(op.f('ix_finance_category_usage_family_id'), 'finance_category_usage', ['family_id'], unique=False)
+        op.create_index(op.f('ix_finance_category_usage_id'), 'finance_category_usage', ['id'], unique=False)
+    if _missing(inspector, 'finance_recurrence'):
+        op.create_table('finance_recurrence',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(length=200), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('day_of_month', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('last_generated_date', sa.Date(), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['finance_category.id'], ),
+        sa.ForeignKeyConstraint(['created_by_id'], ['auth_user.id'], ),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_finance_recurrence_family_id'), 'finance_recurrence', ['family_id'], unique=False)
+        op.create_index(op.f('ix_finance_recurrence_id'), 'finance_recurrence', ['id'], unique=False)
+    if _missing(inspector, 'maintenance_equipmentattachment'):
+        op.create_table('maintenance_equipmentattachment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('file', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('uploaded_by_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['equipment_id'], ['maintenance_equipment.id'], ),
+        sa.ForeignKeyConstraint(['uploaded_by_id'], ['auth_user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_maintenance_equipmentattachment_id'), 'maintenance_equipmentattachment', ['id'], unique=False)
+    if _missing(inspector, 'maintenance_maintenanceorder'):
+        op.create_table('maintenance_maintenanceorder',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('priority', sa.String(length=20), nullable=False),
+        sa.Column('service_provider', sa.String(length=200), nullable=False),
+        sa.Column('completion_date', sa.Date(), nullable=True),
+        sa.Column('cost', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('warranty_expiration', sa.Date(), nullable=True),
+        sa.Column('warranty_terms', sa.Text(), nullable=False),
+        sa.Column('invoice_number', sa.String(length=50), nullable=False),
+        sa.Column('invoice_file', sa.String(length=100), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=False),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['auth_user.id'], ),
+        sa.ForeignKeyConstraint(['equipment_id'], ['maintenance_equipment.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_maintenance_maintenanceorder_id'), 'maintenance_maintenanceorder', ['id'], unique=False)
+    if _missing(inspector, 'finance_entry'):
+        op.create_table('finance_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(length=200), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('is_paid', sa.Boolean(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('documents', sa.Text(), nullable=True),
+        sa.Column('recurrence_id', sa.Integer(), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['finance_category.id'], ),
+        sa.ForeignKeyConstraint(['created_by_id'], ['auth_user.id'], ),
+        sa.ForeignKeyConstraint(['family_id'], ['families.id'], ),
+        sa.ForeignKeyConstraint(['recurrence_id'], ['finance_recurrence.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_finance_entry_family_id'), 'finance_entry', ['family_id'], unique=False)
+        op.create_index(op.f('ix_finance_entry_id'), 'finance_entry', ['id'], unique=False)
+    if _missing(inspector, 'maintenance_maintenanceimage'):
+        op.create_table('maintenance_maintenanceimage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('maintenance_order_id', sa.Integer(), nullable=False),
+        sa.Column('image', sa.Text(), nullable=False),
+        sa.Column('description', sa.String(length=200), nullable=False),
+        sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['maintenance_order_id'], ['maintenance_maintenanceorder.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_maintenance_maintenanceimage_id'), 'maintenance_maintenanceimage', ['id'], unique=False)
+
+    _upgrade_legacy_schema(inspector)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_maintenance_maintenanceimage_id'), table_name='maintenance_maintenanceimage')
+    op.drop_table('maintenance_maintenanceimage')
+    op.drop_index(op.f('ix_finance_entry_id'), table_name='finance_entry')
+    op.drop_index(op.f('ix_finance_entry_family_id'), table_name='finance_entry')
+    op.drop_table('finance_entry')
+    op.drop_index(op.f('ix_maintenance_maintenanceorder_id'), table_name='maintenance_maintenanceorder')
+    op.drop_table('maintenance_maintenanceorder')
+    op.drop_index(op.f('ix_maintenance_equipmentattachment_id'), table_name='maintenance_equipmentattachment')
+    op.drop_table('maintenance_equipmentattachment')
+    op.drop_index(op.f('ix_finance_recurrence_id'), table_name='finance_recurrence')
+    op.drop_index(op.f('ix_finance_recurrence_family_id'), table_name='finance_recurrence')
+    op.drop_table('finance_recurrence')
+    op.drop_index(op.f('ix_finance_category_usage_id'), table_name='finance_category_usage')
+    op.drop_index(op.f('ix_finance_category_usage_family_id'), table_name='finance_category_usage')
+    op.drop_table('finance_category_usage')
+    op.drop_table('user_families')
+    op.drop_index(op.f('ix_telegram_user_link_user_id'), table_name='telegram_user_link')
+    op.drop_index(op.f('ix_telegram_user_link_telegram_user_id'), table_name='telegram_user_link')
+    op.drop_index(op.f('ix_telegram_user_link_telegram_chat_id'), table_name='telegram_user_link')
+    op.drop_index(op.f('ix_telegram_user_link_id'), table_name='telegram_user_link')
+    op.drop_table('telegram_user_link')
+    op.drop_index(op.f('ix_telegram_link_code_user_id'), table_name='telegram_link_code')
+    op.drop_index(op.f('ix_telegram_link_code_id'), table_name='telegram_link_code')
+    op.drop_index(op.f('ix_telegram_link_code_code'), table_name='telegram_link_code')
+    op.drop_table('telegram_link_code')
+    op.drop_index(op.f('ix_maintenance_equipment_id'), table_name='maintenance_equipment')
+    op.drop_index(op.f('ix_maintenance_equipment_family_id'), table_name='maintenance_equipment')
+    op.drop_table('maintenance_equipment')
+    op.drop_index(op.f('ix_healthcare_medication_id'), table_name='healthcare_medication')
+    op.drop_table('healthcare_medication')
+    op.drop_index(op.f('ix_healthcare_medicalprocedure_id'), table_name='healthcare_medicalprocedure')
+    op.drop_table('healthcare_medicalprocedure')
+    op.drop_index(op.f('ix_healthcare_medicalappointment_id'), table_name='healthcare_medicalappointment')
+    op.drop_table('healthcare_medicalappointment')
+    op.drop_index(op.f('ix_finance_category_id'), table_name='finance_category')
+    op.drop_index(op.f('ix_finance_category_family_id'), table_name='finance_category')
+    op.drop_table('finance_category')
+    op.drop_index(op.f('ix_dashboard_dashboardpreference_id'), table_name='dashboard_dashboardpreference')
+    op.drop_table('dashboard_dashboardpreference')
+    op.drop_index(op.f('ix_accounts_profile_id'), table_name='accounts_profile')
+    op.drop_table('accounts_profile')
+    op.drop_index(op.f('ix_healthcare_familymember_id'), table_name='healthcare_familymember')
+    op.drop_index(op.f('ix_healthcare_familymember_family_id'), table_name='healthcare_familymember')
+    op.drop_table('healthcare_familymember')
+    op.drop_index(op.f('ix_family_telegram_config_id'), table_name='family_telegram_config')
+    op.drop_index(op.f('ix_family_telegram_config_family_id'), table_name='family_telegram_config')
+    op.drop_table('family_telegram_config')
+    op.drop_index(op.f('ix_family_ai_config_id'), table_name='family_ai_config')
+    op.drop_index(op.f('ix_family_ai_config_family_id'), table_name='family_ai_config')
+    op.drop_table('family_ai_config')
+    op.drop_index(op.f('ix_auth_user_username'), table_name='auth_user')
+    op.drop_index(op.f('ix_auth_user_id'), table_name='auth_user')
+    op.drop_index(op.f('ix_auth_user_family_id'), table_name='auth_user')
+    op.drop_index(op.f('ix_auth_user_api_token'), table_name='auth_user')
+    op.drop_table('auth_user')
+    op.drop_index(op.f('ix_sync_tombstone_id'), table_name='sync_tombstone')
+    op.drop_index('ix_sync_tombstone_family_resource', table_name='sync_tombstone')
+    op.drop_table('sync_tombstone')
+    op.drop_index(op.f('ix_sync_change_id'), table_name='sync_change')
+    op.drop_index('ix_sync_change_family_changed', table_name='sync_change')
+    op.drop_table('sync_change')
+    op.drop_index(op.f('ix_families_id'), table_name='families')
+    op.drop_index(op.f('ix_families_codigo_unico'), table_name='families')
+    op.drop_table('families')
@@ -0,0 +1,40 @@
+"""Tabela de queries lentas (SLOW_QUERY_TABLE)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 07:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('system_slowquery',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sql', sa.Text(), nullable=False),
+    sa.Column('params', sa.Text(), nullable=True),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('route', sa.String(length=200), nullable=True),
+    sa.Column('family_id', sa.Integer(), nullable=True),
+    sa.Column('plan', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_system_slowquery_created_at'), 'system_slowquery', ['created_at'], unique=False)
+    op.create_index(op.f('ix_system_slowquery_id'), 'system_slowquery', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_system_slowquery_id'), table_name='system_slowquery')
+    op.drop_index(op.f('ix_system_slowquery_created_at'), table_name='system_slowquery')
+    op.drop_table('system_slowquery')
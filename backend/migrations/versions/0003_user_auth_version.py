@@ -0,0 +1,28 @@
+"""Versão de autenticação do usuário (invalidação do cache de principal)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('auth_user') as batch_op:
+        batch_op.add_column(sa.Column('auth_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('auth_user') as batch_op:
+        batch_op.drop_column('auth_version')
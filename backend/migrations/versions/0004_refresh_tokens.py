@@ -0,0 +1,45 @@
+"""Refresh tokens com rotação (auth_refresh_token)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('auth_refresh_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('session_id', sa.String(length=32), nullable=False),
+    sa.Column('auth_version', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index(op.f('ix_auth_refresh_token_id'), 'auth_refresh_token', ['id'], unique=False)
+    op.create_index(op.f('ix_auth_refresh_token_expires_at'), 'auth_refresh_token', ['expires_at'], unique=False)
+    op.create_index('ix_auth_refresh_token_user_session', 'auth_refresh_token', ['user_id', 'session_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_auth_refresh_token_user_session', table_name='auth_refresh_token')
+    op.drop_index(op.f('ix_auth_refresh_token_expires_at'), table_name='auth_refresh_token')
+    op.drop_index(op.f('ix_auth_refresh_token_id'), table_name='auth_refresh_token')
+    op.drop_table('auth_refresh_token')
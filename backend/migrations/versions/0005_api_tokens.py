@@ -0,0 +1,75 @@
+"""Tokens de API com hash e escopos (auth_api_token)
+
+Migra o token em texto puro de auth_user.api_token para a tabela nova (só o SHA-256,
+com todos os acessos, como antes) e remove a coluna.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    api_token = op.create_table('auth_api_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('prefix', sa.String(length=16), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('scopes', sa.String(length=500), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['auth_user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index(op.f('ix_auth_api_token_id'), 'auth_api_token', ['id'], unique=False)
+    op.create_index(op.f('ix_auth_api_token_prefix'), 'auth_api_token', ['prefix'], unique=False)
+    op.create_index(op.f('ix_auth_api_token_user_id'), 'auth_api_token', ['user_id'], unique=False)
+
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    if 'api_token' not in {column['name'] for column in inspector.get_columns('auth_user')}:
+        return  # Banco antigo sem a coluna: nada a migrar
+    legacy = connection.execute(sa.text("SELECT id, api_token FROM auth_user WHERE api_token IS NOT NULL")).fetchall()
+    if legacy:
+        op.bulk_insert(api_token, [
+            {
+                "user_id": user_id,
+                "name": "Token de API",
+                "prefix": token[:8],
+                "token_hash": hashlib.sha256(token.encode()).hexdigest(),
+                "scopes": "*",
+            }
+            for user_id, token in legacy
+        ])
+
+    indexes = {index['name'] for index in inspector.get_indexes('auth_user')}
+    with op.batch_alter_table('auth_user') as batch_op:
+        if 'ix_auth_user_api_token' in indexes:
+            batch_op.drop_index('ix_auth_user_api_token')
+        batch_op.drop_column('api_token')
+
+
+def downgrade() -> None:
+    # Os tokens não podem ser recuperados a partir do hash: voltam vazios
+    with op.batch_alter_table('auth_user') as batch_op:
+        batch_op.add_column(sa.Column('api_token', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_auth_user_api_token', ['api_token'], unique=True)
+    op.drop_index(op.f('ix_auth_api_token_user_id'), table_name='auth_api_token')
+    op.drop_index(op.f('ix_auth_api_token_prefix'), table_name='auth_api_token')
+    op.drop_index(op.f('ix_auth_api_token_id'), table_name='auth_api_token')
+    op.drop_table('auth_api_token')
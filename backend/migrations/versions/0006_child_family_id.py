@@ -0,0 +1,58 @@
+"""family_id denormalizado em consultas, procedimentos, medicamentos e ordens
+
+Copia a família do membro/equipamento pai para as tabelas filhas (filtro de tenancy
+sem JOIN) e cria índices compostos (family_id, data da listagem).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna do pai, tabela do pai, coluna do índice composto, nome do índice)
+_CHILD_TABLES = (
+    ('healthcare_medicalappointment', 'family_member_id', 'healthcare_familymember', 'appointment_date',
+     'ix_healthcare_medicalappointment_family_date'),
+    ('healthcare_medicalprocedure', 'family_member_id', 'healthcare_familymember', 'procedure_date',
+     'ix_healthcare_medicalprocedure_family_date'),
+    ('healthcare_medication', 'family_member_id', 'healthcare_familymember', 'created_at',
+     'ix_healthcare_medication_family_created'),
+    ('maintenance_maintenanceorder', 'equipment_id', 'maintenance_equipment', 'completion_date',
+     'ix_maintenance_maintenanceorder_family_completion'),
+)
+
+
+def upgrade() -> None:
+    for table, parent_column, parent_table, date_column, index_name in _CHILD_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('family_id', sa.Integer(), nullable=True))
+
+        # Backfill: uma instrução por tabela, no servidor
+        op.execute(
+            f"UPDATE {table} SET family_id = "
+            f"(SELECT {parent_table}.family_id FROM {parent_table} WHERE {parent_table}.id = {table}.{parent_column})"
+        )
+
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('family_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table}_family', 'families', ['family_id'], ['id'])
+            batch_op.create_index(index_name, ['family_id', date_column], unique=False)
+
+
+def downgrade() -> None:
+    for table, _, _, _, index_name in reversed(_CHILD_TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(index_name)
+            batch_op.drop_constraint(f'fk_{table}_family', type_='foreignkey')
+            batch_op.drop_column('family_id')
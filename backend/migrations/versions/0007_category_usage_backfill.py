@@ -0,0 +1,38 @@
+"""Estatísticas de uso das categorias a partir dos lançamentos existentes
+
+A tabela finance_category_usage (migração base) nasce vazia; sem este backfill as
+estatísticas de uso só refletiriam os lançamentos criados após o deploy. Recalcula os
+buckets diários do zero (DELETE + INSERT ... SELECT), então pode rodar sobre uma tabela
+já preenchida (ex.: pelo scripts/backfill_category_usage.py).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM finance_category_usage")
+    op.execute(
+        "INSERT INTO finance_category_usage (category_id, family_id, day, entry_count, total_amount) "
+        "SELECT category_id, family_id, date, COUNT(*), COALESCE(SUM(amount), 0) "
+        "FROM finance_entry "
+        "WHERE category_id IS NOT NULL "
+        "GROUP BY category_id, family_id, date"
+    )
+
+
+def downgrade() -> None:
+    # Migração só de dados: os buckets continuam válidos (e mantidos pela aplicação)
+    pass
@@ -0,0 +1,36 @@
+"""updated_at nas categorias financeiras
+
+A categoria vai embutida nos lançamentos: a listagem passa a usar o updated_at da
+categoria no ETag, em vez de reescrever o updated_at de todos os lançamentos dela.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('finance_category') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.execute("UPDATE finance_category SET updated_at = created_at")
+
+    with op.batch_alter_table('finance_category') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('finance_category') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,38 @@
+"""
+Script para reconstruir a tabela finance_category_usage a partir dos lançamentos.
+O preenchimento inicial é feito no deploy pela migração 0007 (alembic upgrade head);
+use este script só se precisar reconstruir os contadores depois.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import engine
+from sqlalchemy import text
+
+def backfill_category_usage():
+    """Reconstrói os buckets diários de uso das categorias"""
+    print("[INICIO] Recalculando uso das categorias...\n")
+
+    try:
+        # O esquema é das migrações (alembic upgrade head): a tabela já existe
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM finance_category_usage"))
+            result = conn.execute(text("""
+                INSERT INTO finance_category_usage (category_id, family_id, day, entry_count, total_amount)
+                SELECT category_id, family_id, date, COUNT(*), COALESCE(SUM(amount), 0)
+                FROM finance_entry
+                WHERE category_id IS NOT NULL
+                GROUP BY category_id, family_id, date
+            """))
+            print(f"[OK] {result.rowcount} buckets de uso gerados.")
+
+    except Exception as e:
+        print(f"[ERRO] Erro ao recalcular uso das categorias: {e}")
+        raise
+
+if __name__ == "__main__":
+    backfill_category_usage()
+    print("\n[FIM] Processo concluido!")
@@ -0,0 +1,131 @@
+"""
+Benchmark das listagens grandes: caminho padrão (ORM + response_model + json) vs. caminho
+rápido (FAST_LIST_RESPONSES: SELECT de colunas + orjson), com N linhas por listagem num
+SQLite em memória.
+
+    python scripts/benchmark_fast_json.py            # 10000 linhas
+    python scripts/benchmark_fast_json.py 50000 5    # linhas, repetições
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")  # Não conecta: o benchmark usa SQLite em memória
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("QUERY_STATS_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "none")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("LOG_FILE", "")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.models import *  # Importar todos os modelos para que sejam registrados
+
+PATHS = (
+    "/api/v1/finance/entries",
+    "/api/v1/healthcare/appointments",
+    "/api/v1/healthcare/procedures",
+    "/api/v1/maintenance/orders",
+)
+
+
+def populate(factory, rows: int) -> int:
+    """Cria uma família com `rows` lançamentos, consultas, procedimentos e ordens; devolve o id do usuário"""
+    documents = json.dumps([{"name": "laudo.pdf", "type": "application/pdf", "content": "JVBERi0=" * 8}])
+    now = datetime(2024, 1, 1, 12)
+    with factory() as db:
+        family = Family(name="Benchmark", codigo_unico="benchmark")
+        db.add(family)
+        db.flush()
+        user = User(username="benchmark", password="x", is_active=True, family_id=family.id)
+        db.add(user)
+        db.flush()
+        member = FamilyMember(family_id=family.id, name="Bia", birth_date=date(2000, 1, 1))
+        equipment = Equipment(family_id=family.id, name="Geladeira", owner_id=user.id)
+        category = FinanceCategory(family_id=family.id, name="Mercado", type="EXPENSE", created_by_id=user.id)
+        db.add_all([member, equipment, category])
+        db.flush()
+
+        stamps = {"created_at": now, "updated_at": now}
+        db.execute(insert(FinanceEntry), [
+            {"family_id": family.id, "category_id": category.id, "description": f"Compra {i}",
+             "amount": Decimal("10.50"), "date": date(2024, 1, 1) + timedelta(days=i % 365), "type": "EXPENSE",
+             "is_paid": True, "documents": documents if i % 10 == 0 else None, "created_by_id": user.id, **stamps}
+            for i in range(rows)
+        ])
+        db.execute(insert(MedicalAppointment), [
+            {"family_member_id": member.id, "family_id": family.id, "doctor_name": "Dr. Silva",
+             "specialty": "Clínica", "appointment_date": now - timedelta(days=i), "location": "Consultório",
+             "reason": "Rotina", "diagnosis": "", "prescription": "", "notes": "", **stamps}
+            for i in range(rows)
+        ])
+        db.execute(insert(MedicalProcedure), [
+            {"family_member_id": member.id, "family_id": family.id, "procedure_name": "Raio-X",
+             "procedure_date": now - timedelta(days=i), "doctor_name": "Dr. Silva", "location": "Hospital",
+             "description": "Tórax", "results": "", "follow_up_notes": "", **stamps}
+            for i in range(rows)
+        ])
+        db.execute(insert(MaintenanceOrder), [
+            {"equipment_id": equipment.id, "family_id": family.id, "title": f"Revisão {i}",
+             "description": "Filtro", "status": "CONCLUIDA", "priority": "MEDIA", "service_provider": "",
+             "completion_date": date(2024, 1, 1) + timedelta(days=i % 365), "cost": Decimal("150.00"),
+             "warranty_terms": "", "invoice_number": "", "notes": "", "created_by_id": user.id, **stamps}
+            for i in range(rows)
+        ])
+        db.commit()
+        return user.id
+
+
+def measure(client, path: str, headers: dict, repeat: int) -> tuple[float, bytes]:
+    """Melhor tempo (ms) de `repeat` requisições e o corpo da resposta"""
+    best, body = None, b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        body = response.content
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main(rows: int = 10000, repeat: int = 3) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    print(f"[INICIO] Populando {rows} linhas por listagem...")
+    user_id = populate(factory, rows)
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    print(f"{'listagem':<36} {'padrão (ms)':>12} {'rápido (ms)':>12} {'ganho':>7}")
+    for path in PATHS:
+        settings.FAST_LIST_RESPONSES = False
+        default_ms, default_body = measure(client, path, headers, repeat)
+        settings.FAST_LIST_RESPONSES = True
+        fast_ms, fast_body = measure(client, path, headers, repeat)
+        same = "" if fast_body == default_body else "  [AVISO] corpos diferentes"
+        print(f"{path:<36} {default_ms:>12.1f} {fast_ms:>12.1f} {default_ms / fast_ms:>6.1f}x{same}")
+    app.main.app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
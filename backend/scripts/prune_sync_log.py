@@ -0,0 +1,37 @@
+"""
+Script para remover registros antigos do log de sincronização
+(sync_change e sync_tombstone). Tokens mais antigos que SYNC_RETENTION_DAYS
+já recebem sync completo, então esses registros não são mais necessários.
+Pode ser agendado (ex.: cron diário).
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.db.base import engine
+from app.models import *  # Importar todos os modelos para que sejam registrados
+from sqlalchemy import delete
+
+def prune_sync_log():
+    """Remove alterações e tombstones fora da janela de retenção"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_RETENTION_DAYS)
+    print(f"[INICIO] Removendo registros de sincronização anteriores a {cutoff:%Y-%m-%d %H:%M}...\n")
+
+    try:
+        with engine.begin() as conn:
+            changes = conn.execute(delete(SyncChange).where(SyncChange.changed_at < cutoff))
+            tombstones = conn.execute(delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff))
+            print(f"[OK] {changes.rowcount} alterações e {tombstones.rowcount} tombstones removidos.")
+
+    except Exception as e:
+        print(f"[ERRO] Erro ao limpar o log de sincronização: {e}")
+        raise
+
+if __name__ == "__main__":
+    prune_sync_log()
+    print("\n[FIM] Processo concluido!")
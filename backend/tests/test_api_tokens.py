@@ -0,0 +1,111 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core import api_tokens
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.models.user import ApiToken, User
+
+
+def test_scope_rules():
+    scopes = ("finance:read", "healthcare:write")
+    assert api_tokens.scope_allows(scopes, "GET", "/api/v1/finance/entries")
+    assert not api_tokens.scope_allows(scopes, "POST", "/api/v1/finance/entries")
+    assert api_tokens.scope_allows(scopes, "DELETE", "/api/v1/healthcare/members/1")
+    assert not api_tokens.scope_allows(scopes, "GET", "/api/v1/users/me")  # Fora das áreas: só "*"
+    assert api_tokens.scope_allows(("*",), "GET", "/api/v1/users/me")
+    assert api_tokens.normalize_scopes(["finance:read", "*"]) == "*"
+
+
+def test_scoped_token_lifecycle():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        user = User(username="ana", password="x", is_active=True)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    jwt = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    try:
+        created = client.post("/api/v1/users/me/api-tokens", headers=jwt, json={"name": "n8n", "scopes": ["finance:read"]})
+        assert created.status_code == 201
+        token = created.json()["api_token"]
+        assert token.startswith(created.json()["prefix"]) and created.json()["scopes"] == ["finance:read"]
+        assert client.post("/api/v1/users/me/api-tokens", headers=jwt, json={"scopes": ["admin"]}).status_code == 400
+
+        scoped = {"X-API-Token": token}
+        assert client.get("/api/v1/users/me/api-tokens", headers=scoped).status_code == 403
+        assert client.post("/api/v1/finance/entries", headers=scoped, json={}).status_code == 403
+
+        assert api_tokens.flush_last_used(factory) == 1
+        with factory() as db:
+            stored = db.execute(select(ApiToken)).scalar_one()
+            assert stored.token_hash == api_tokens.hash_api_token(token) and stored.last_used_at is not None
+
+        listed = client.get("/api/v1/users/me/api-tokens", headers=jwt).json()
+        assert [item["name"] for item in listed] == ["n8n"] and "api_token" not in listed[0]
+        assert client.delete(f"/api/v1/users/me/api-tokens/{listed[0]['id']}", headers=jwt).status_code == 204
+        assert client.post("/api/v1/finance/entries", headers=scoped, json={}).status_code == 401
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
+
+
+def test_api_token_write_pins_reads_to_primary(monkeypatch):
+    from app.core.security import READ_PRIMARY_COOKIE, primary_token_valid
+    from app.models.family import Family
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        family = Family(name="Nossa", codigo_unico="a")
+        db.add(family)
+        db.flush()
+        user = User(username="ana", password="x", is_active=True, family_id=family.id)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    monkeypatch.setattr(app.main, "REPLICA_URLS", ["postgresql://u:p@replica/d"])
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    jwt = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    try:
+        token = client.post(
+            "/api/v1/users/me/api-tokens", headers=jwt, json={"name": "n8n", "scopes": ["healthcare:write"]}
+        ).json()["api_token"]
+        client.cookies.clear()
+
+        # Escrita com X-API-Token também fixa as leituras seguintes no primário
+        created = client.post(
+            "/api/v1/healthcare/members", headers={"X-API-Token": token},
+            json={"name": "Bia", "birth_date": "2010-01-01"},
+        )
+        assert created.status_code < 300, created.text
+        assert primary_token_valid(created.cookies.get(READ_PRIMARY_COOKIE), user_id)
+        # Escrita sem autenticação não fixa nada
+        client.cookies.clear()
+        assert READ_PRIMARY_COOKIE not in client.post("/api/v1/healthcare/members", json={}).cookies
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.api.deps import get_current_family_async, get_current_user_async
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, async_database_url
+from app.models.family import Family
+from app.models.user import User
+
+
+def test_async_database_url_uses_asyncpg_and_translates_sslmode():
+    assert async_database_url("postgresql://u:p%40ss@db:5432/app?sslmode=require") == (
+        "postgresql+asyncpg://u:p%40ss@db:5432/app?ssl=require"
+    )
+    assert async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("sqlite:///./local.db") == "sqlite:///./local.db"
+
+
+def test_async_dependencies_resolve_user_and_family(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session
+
+    path = tmp_path / "app.db"
+    with Session(create_engine(f"sqlite:///{path}")) as db:
+        Base.metadata.create_all(db.get_bind())
+        family, other = Family(name="Silva", codigo_unico="ABC123"), Family(name="Souza", codigo_unico="XYZ789")
+        db.add_all([family, other])
+        db.flush()
+        user = User(username="ana", password="x", family_id=family.id, is_active=True)
+        db.add(user)
+        db.commit()
+        user_id, family_id, other_id = user.id, family.id, other.id
+
+    principal_cache.clear()  # Outros testes usam o mesmo id de usuário em outros bancos
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            token = create_access_token({"sub": str(user_id)})
+            current = await get_current_user_async(token=token, api_key=None, db=db)
+            assert current.id == user_id
+            assert current.family_ids == (family_id,)
+            assert await get_current_family_async(current_user=current, family_id=None, db=db) == family_id
+
+            # Usuário comum não escolhe família pelo parâmetro
+            assert await get_current_family_async(current_user=current, family_id=other_id, db=db) == family_id
+
+            with pytest.raises(HTTPException) as exc:
+                await get_current_user_async(token=None, api_key="invalido", db=db)
+            assert exc.value.status_code == 401
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,175 @@
+import socketserver
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.cache import MemoryCache, RedisCache, cached_response, set_cache
+from app.db.base import Base
+from app.db.writes import insert_returning
+from app.models.family import Family
+from app.models.healthcare import FamilyMember, Medication
+
+
+class _RespStandIn(socketserver.ThreadingTCPServer):
+    """Servidor RESP mínimo (GET/SET/MGET/INCR) para testar o backend sem Redis"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        self.data = {}
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        data = self.server.data
+        while (command := self._read_command()) is not None:
+            name = command[0].upper()
+            if name == b"GET":
+                self.wfile.write(self._bulk(data.get(command[1])))
+            elif name == b"SET":
+                data[command[1]] = command[2]
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"MGET":
+                self.wfile.write(b"*%d\r\n" % (len(command) - 1) + b"".join(self._bulk(data.get(k)) for k in command[1:]))
+            elif name == b"INCR":
+                data[command[1]] = str(int(data.get(command[1], b"0")) + 1).encode()
+                self.wfile.write(b":%s\r\n" % data[command[1]])
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def memory_cache():
+    cache = MemoryCache(max_entries=10, ttl=60)
+    set_cache(cache)
+    yield cache
+    set_cache(None)
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set("a", 1, ttl=-1)
+
+    assert cache.get("a") is None
+
+
+def test_cached_response_serves_hits_until_family_version_changes(memory_cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"total": len(calls)}
+
+    assert cached_response("ns", [1], {"p": 1}, loader) == {"total": 1}
+    assert cached_response("ns", [1], {"p": 1}, loader) == {"total": 1}
+    assert cached_response("ns", [1], {"p": 2}, loader) == {"total": 2}
+
+    memory_cache.bump_versions([1])
+
+    assert cached_response("ns", [1], {"p": 1}, loader) == {"total": 3}
+
+
+def test_cached_response_skips_cache_without_family(memory_cache):
+    assert cached_response("ns", [None], {}, lambda: {"x": 1}) == {"x": 1}
+    assert len(memory_cache._data) == 0
+
+
+def test_commit_bumps_version_of_changed_families(memory_cache):
+    with _session() as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        other = Family(name="Souza", codigo_unico="XYZ789")
+        db.add_all([family, other])
+        db.commit()
+        before = memory_cache.get_versions([family.id, other.id])
+
+        # Escrita via ORM em tabela filha (família resolvida pelo membro)
+        member = FamilyMember(family_id=family.id, name="Ana", birth_date=datetime(1990, 1, 1).date(), relationship_type="mae")
+        db.add(member)
+        db.commit()
+        after_orm = memory_cache.get_versions([family.id, other.id])
+
+        # Escrita Core com RETURNING
+        now = datetime.now()
+        insert_returning(db, Medication, {
+            "family_member_id": member.id, "name": "Dipirona", "dosage": "1", "frequency": "8/8h",
+            "start_date": now.date(), "created_at": now, "updated_at": now,
+        })
+        db.commit()
+        after_core = memory_cache.get_versions([family.id, other.id])
+
+        assert after_orm[0] == before[0] + 1
+        assert after_core[0] == after_orm[0] + 1
+        assert after_core[1] == before[1]
+
+
+def test_rollback_discards_pending_invalidation(memory_cache):
+    with _session() as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.commit()
+        before = memory_cache.get_versions([family.id])
+
+        family.name = "Silva Santos"
+        db.flush()
+        db.rollback()
+
+        assert memory_cache.get_versions([family.id]) == before
+
+
+def test_redis_cache_against_resp_stand_in():
+    server = _RespStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.server_address
+        cache = RedisCache(f"redis://{host}:{port}/0")
+
+        assert cache.get_versions([1, 2]) == [0, 0]
+        cache.bump_versions([1])
+        cache.bump_versions([1, 2])
+        assert cache.get_versions([1, 2]) == [2, 1]
+
+        cache.set("k", {"total": "10.50", "items": [1, 2]})
+        assert cache.get("k") == {"total": "10.50", "items": [1, 2]}
+        assert cache.get("missing") is None
+        cache.clear()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.db.base import Base
+from app.models.family import Family
+from app.models.finance import FinanceCategory
+from app.models.user import User
+from app.utils.category_usage import build_usage_deltas, category_usage_stats, record_entry_usage
+
+
+def _entry(category_id, day, amount, family_id=1):
+    return {"family_id": family_id, "category_id": category_id, "date": day, "amount": Decimal(amount)}
+
+
+def test_build_usage_deltas_counts_new_and_deleted_entries():
+    deltas = build_usage_deltas([
+        (None, _entry(1, date(2024, 3, 1), "10.00")),
+        (None, _entry(1, date(2024, 3, 1), "5.50")),
+        (_entry(2, date(2024, 3, 2), "7.00"), None),
+    ])
+
+    assert deltas == {
+        (1, 1, date(2024, 3, 1)): (2, Decimal("15.50")),
+        (1, 2, date(2024, 3, 2)): (-1, Decimal("-7.00")),
+    }
+
+
+def test_build_usage_deltas_moves_entry_between_categories():
+    deltas = build_usage_deltas([
+        (_entry(1, date(2024, 3, 1), "10.00"), _entry(2, date(2024, 3, 1), "10.00")),
+    ])
+
+    assert deltas == {
+        (1, 1, date(2024, 3, 1)): (-1, Decimal("-10.00")),
+        (1, 2, date(2024, 3, 1)): (1, Decimal("10.00")),
+    }
+
+
+def test_build_usage_deltas_only_amount_change_keeps_count():
+    deltas = build_usage_deltas([
+        (_entry(1, date(2024, 3, 1), "10.00"), _entry(1, date(2024, 3, 1), "12.00")),
+    ])
+
+    assert deltas == {(1, 1, date(2024, 3, 1)): (0, Decimal("2.00"))}
+
+
+def test_build_usage_deltas_ignores_uncategorized_and_noop_changes():
+    same = _entry(1, date(2024, 3, 1), "10.00")
+
+    assert build_usage_deltas([(None, _entry(None, date(2024, 3, 1), "3.00")), (same, dict(same))]) == {}
+
+
+def test_record_entry_usage_upserts_buckets_and_aggregates_windows():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        user = User(username="ana", password="x")
+        db.add_all([family, user])
+        db.flush()
+        category = FinanceCategory(
+            family_id=family.id, name="Mercado", type="EXPENSE", created_by_id=user.id, created_at=datetime.now()
+        )
+        db.add(category)
+        db.flush()
+
+        today = date(2024, 6, 30)
+        record_entry_usage(db, [
+            (None, _entry(category.id, date(2024, 6, 29), "100.00", family.id)),
+            (None, _entry(category.id, date(2024, 4, 15), "50.00", family.id)),
+        ])
+        record_entry_usage(db, [
+            (None, _entry(category.id, date(2024, 6, 29), "20.00", family.id)),
+            (None, _entry(category.id, date(2024, 7, 10), "999.00", family.id)),
+        ])
+
+        stats = category_usage_stats(today=today)
+        row = db.execute(select(stats).where(stats.c.category_id == category.id)).one()
+
+        assert row.usage_count == 4
+        assert row.last_used_date == date(2024, 6, 29)
+        assert Decimal(str(row.total_30d)) == Decimal("120.00")
+        assert Decimal(str(row.total_90d)) == Decimal("170.00")
@@ -0,0 +1,69 @@
+import gzip
+import json
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, compressed_cache, negotiate
+
+PAYLOAD = [{"id": i, "notes": "texto repetido " * 4} for i in range(200)]
+
+
+def _client() -> TestClient:
+    api = FastAPI()
+    api.add_middleware(CompressionMiddleware)
+
+    @api.get("/list")
+    def listing():
+        return JSONResponse(PAYLOAD, headers={"ETag": 'W/"v1"'})
+
+    @api.get("/small")
+    def small():
+        return {"ok": True}
+
+    @api.get("/pdf")
+    def pdf():
+        return Response(b"%PDF" * 1000, media_type="application/pdf")
+
+    @api.get("/stream")
+    def stream():
+        return StreamingResponse((json.dumps(item).encode() for item in PAYLOAD), media_type="application/json")
+
+    return TestClient(api)
+
+
+def test_negotiation_prefers_the_server_order_and_respects_q_zero():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") in ("br", "gzip")
+    assert negotiate("") is None
+
+
+def test_large_responses_are_compressed_and_cached_by_etag():
+    client = _client()
+    compressed_cache.clear()
+
+    response = client.get("/list", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == PAYLOAD  # httpx descomprime
+    assert len(compressed_cache) == 1
+
+    # Mesma versão (ETag e corpo): bytes do cache
+    again = client.get("/list", headers={"Accept-Encoding": "gzip"})
+    assert again.json() == PAYLOAD and len(compressed_cache) == 1
+
+    # Sem suporte no cliente, abaixo do limite ou já comprimido: sem compressão
+    assert "content-encoding" not in client.get("/list", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/pdf", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_streaming_responses_are_compressed_in_chunks():
+    client = _client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == b"".join(json.dumps(item).encode() for item in PAYLOAD)
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.db.base import Base
+from app.models.family import Family
+from app.models.healthcare import FamilyMember, MedicalAppointment
+from app.models.sync import SyncTombstone
+from app.utils.conditional_get import CollectionState, collection_state, conditional_response
+
+
+def _request(path="/api/v1/healthcare/members", query="", headers=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+    })
+
+
+def _member(family_id, name="Ana"):
+    return FamilyMember(family_id=family_id, name=name, birth_date=date(1990, 1, 1), relationship_type="mae")
+
+
+def test_conditional_response_returns_304_for_matching_etag():
+    state = CollectionState(family_ids=(1,), values=(2, "2024-01-01T00:00:00+00:00", None, None),
+                            last_modified=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    response = Response()
+    assert conditional_response(_request(), response, state) is None
+    etag = response.headers["etag"]
+
+    assert etag.startswith('W/"')
+    assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert conditional_response(_request(headers={"If-None-Match": f'"x", {etag}'}), Response(), state).status_code == 304
+    # Mesmo estado, outros parâmetros: outro ETag
+    assert conditional_response(_request(query="include_photos=false", headers={"If-None-Match": etag}), Response(), state) is None
+    assert conditional_response(
+        _request(headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}), Response(), state
+    ).status_code == 304
+
+
+def test_delete_records_tombstones_including_cascaded_children():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        member = _member(family.id)
+        member.appointments.append(MedicalAppointment(
+            doctor_name="Dr. José", specialty="Clínico", appointment_date=datetime(2024, 1, 1, 10), reason="Rotina"
+        ))
+        db.add(member)
+        db.commit()
+        member_id, appointment_id = member.id, member.appointments[0].id
+
+        db.delete(member)
+        db.commit()
+
+        tombstones = {(t.family_id, t.resource, t.object_id) for t in db.query(SyncTombstone)}
+        assert tombstones == {
+            (family.id, "healthcare_familymember", member_id),
+            (family.id, "healthcare_medicalappointment", appointment_id),
+        }
+
+
+def test_collection_state_changes_when_row_is_replaced():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        first = _member(family.id)
+        db.add(first)
+        db.commit()
+
+        def state():
+            return collection_state(db, [family.id], (FamilyMember, [FamilyMember.family_id == family.id]))
+
+        before = state()
+        assert before.values[0] == 1
+        assert state() == before
+
+        # Exclui e cria outro com o mesmo updated_at: só o tombstone diferencia os estados
+        updated_at = first.updated_at
+        db.delete(first)
+        db.add(FamilyMember(family_id=family.id, name="Bia", birth_date=date(1990, 1, 1), updated_at=updated_at))
+        db.commit()
+
+        after = state()
+        assert after.values[:2] == before.values[:2]
+        assert after != before
@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.db import base
+
+
+def test_pool_options_null_pool_and_pgbouncer_connect_args(monkeypatch):
+    assert base.pool_options(0, 0) == {"poolclass": NullPool}
+
+    monkeypatch.setattr(base.settings, "DB_PING_IDLE_SECONDS", 30)
+    assert base.pool_options(2, 1)["pool_pre_ping"] is False
+
+    monkeypatch.setattr(base.settings, "DB_PGBOUNCER", False)
+    assert base.async_connect_args() == {}
+    monkeypatch.setattr(base.settings, "DB_PGBOUNCER", True)
+    args = base.async_connect_args()
+    assert args["statement_cache_size"] == 0 and args["prepared_statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
+
+
+def test_idle_ping_only_checks_connections_idle_for_too_long(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1)
+    pings = []
+    monkeypatch.setattr(engine.dialect, "do_ping", lambda dbapi_connection: pings.append(1))
+    clock = [1000.0]
+    monkeypatch.setattr(base.time, "monotonic", lambda: clock[0])
+    base.install_idle_ping(engine, idle_seconds=30)
+
+    def use():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    use()  # conexão nova: sem ping
+    clock[0] += 5
+    use()
+    assert pings == []
+
+    clock[0] += 60
+    use()
+    assert pings == [1]
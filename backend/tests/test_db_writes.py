@@ -0,0 +1,101 @@
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, not_, select
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.db.base import Base
+from app.db.writes import column_values, insert_returning, update_returning
+from app.models.family import Family
+from app.models.finance import FinanceEntry
+from app.models.healthcare import FamilyMember, Medication
+from app.models.user import User
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+
+def _member(db: Session) -> tuple[dict, dict]:
+    family = insert_returning(db, Family, {"name": "Silva", "codigo_unico": "ABC123"})
+    now = datetime.now()
+    member = insert_returning(db, FamilyMember, {
+        "family_id": family["id"],
+        "name": "Ana",
+        "birth_date": date(1990, 5, 1),
+        "relationship_type": "mae",
+        "photo": "iVBORw0KGgo=",
+        "created_at": now,
+        "updated_at": now,
+    })
+    return family, member
+
+
+def test_column_values_drops_unknown_and_protected_fields():
+    data = {"description": "Mercado", "category": {"id": 1}, "has_documents": True, "family_id": 9, "id": 3}
+
+    assert column_values(FinanceEntry, data) == {"description": "Mercado"}
+
+
+def test_insert_returning_maps_attribute_names_and_skips_blobs():
+    with _session() as db:
+        _, member = _member(db)
+
+        assert member["id"] is not None
+        assert member["relationship_type"] == "mae"
+        assert "relationship" not in member
+        assert "photo" not in member
+
+
+def test_insert_returning_reports_has_documents_without_content():
+    with _session() as db:
+        _, member = _member(db)
+        now = datetime.now()
+        medication = insert_returning(db, Medication, {
+            "family_member_id": member["id"],
+            "name": "Dipirona",
+            "dosage": "500mg",
+            "frequency": "8/8h",
+            "start_date": date(2024, 1, 1),
+            "prescribed_by": "Dr. X",
+            "documents": '[{"name": "receita.pdf", "content": "JVBERi0x"}]',
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        assert medication["has_documents"] is True
+        assert "documents" not in medication
+
+
+def test_update_returning_applies_tenancy_criteria():
+    with _session() as db:
+        family, member = _member(db)
+
+        updated = update_returning(
+            db,
+            FamilyMember,
+            [FamilyMember.id == member["id"], FamilyMember.family_id == family["id"]],
+            {"name": "Ana Maria"},
+        )
+        other_family = update_returning(
+            db,
+            FamilyMember,
+            [FamilyMember.id == member["id"], FamilyMember.family_id == family["id"] + 1],
+            {"name": "Intrusa"},
+        )
+
+        assert updated["name"] == "Ana Maria"
+        assert other_family is None
+        assert db.scalar(select(FamilyMember.name).where(FamilyMember.id == member["id"])) == "Ana Maria"
+
+
+def test_update_returning_accepts_sql_expressions_and_hides_password():
+    with _session() as db:
+        user = insert_returning(db, User, {"username": "ana", "password": "hash", "is_active": True})
+
+        toggled = update_returning(db, User, [User.id == user["id"]], {"is_active": not_(User.is_active)})
+
+        assert toggled["is_active"] is False
+        assert "password" not in toggled
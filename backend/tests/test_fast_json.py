@@ -0,0 +1,93 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.config import settings
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.models.family import Family
+from app.models.finance import FinanceCategory, FinanceEntry
+from app.models.healthcare import FamilyMember, MedicalAppointment, MedicalProcedure
+from app.models.maintenance import Equipment, MaintenanceOrder
+from app.models.user import User
+from app.utils.fast_json import dumps
+
+
+def test_dumps_matches_pydantic_formats():
+    value = {
+        "when": datetime(2024, 1, 2, 3, 4, 5, 120000, tzinfo=timezone.utc),
+        "day": date(2024, 1, 2),
+        "amount": Decimal("10.50"),
+    }
+    assert json.loads(dumps(value)) == {"when": "2024-01-02T03:04:05.120000Z", "day": "2024-01-02", "amount": "10.50"}
+
+
+def test_fast_lists_match_the_default_path(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    documents = json.dumps([{"name": "a.txt", "type": "text/plain", "content": "b2k="}])
+    with factory() as db:
+        family = Family(name="Nossa", codigo_unico="a")
+        db.add(family)
+        db.flush()
+        user = User(username="ana", password="x", is_active=True, family_id=family.id)
+        db.add(user)
+        db.flush()
+        member = FamilyMember(family_id=family.id, name="Bia", birth_date=date(2000, 1, 1))
+        equipment = Equipment(family_id=family.id, name="Geladeira", owner_id=user.id)
+        category = FinanceCategory(family_id=family.id, name="Mercado", type="EXPENSE", created_by_id=user.id)
+        db.add_all([member, equipment, category])
+        db.flush()
+        db.add_all([
+            FinanceEntry(family_id=family.id, category=category, description="Feira", amount=Decimal("10.50"),
+                         date=date(2024, 1, 2), type="EXPENSE", documents=documents, created_by_id=user.id),
+            FinanceEntry(family_id=family.id, description="Salário", amount=Decimal("100"),
+                         date=date(2024, 1, 1), type="INCOME", created_by_id=user.id),
+            MedicalAppointment(family_member_id=member.id, doctor_name="Dr", specialty="Clínica", reason="Rotina",
+                               appointment_date=datetime(2024, 1, 1, 10), documents=documents),
+            MedicalProcedure(family_member_id=member.id, procedure_name="Raio-X", procedure_date=datetime(2024, 1, 1),
+                             doctor_name="Dr", location="Hospital", description="Tórax", documents=documents),
+            MaintenanceOrder(equipment_id=equipment.id, title="Troca", description="Filtro", cost=Decimal("150.00"),
+                             completion_date=date(2024, 1, 3), created_by_id=user.id),
+        ])
+        db.commit()
+        user_id = user.id
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    paths = [
+        "/api/v1/finance/entries",
+        "/api/v1/healthcare/appointments",
+        "/api/v1/healthcare/appointments?include_documents=false",
+        "/api/v1/healthcare/procedures",
+        "/api/v1/healthcare/procedures?include_documents=false",
+        "/api/v1/maintenance/orders",
+        "/api/v1/maintenance/orders?include_documents=false",
+    ]
+    try:
+        for path in paths:
+            monkeypatch.setattr(settings, "FAST_LIST_RESPONSES", False)
+            default = client.get(path, headers=headers)
+            monkeypatch.setattr(settings, "FAST_LIST_RESPONSES", True)
+            fast = client.get(path, headers=headers)
+            assert fast.status_code == default.status_code == 200
+            assert fast.content == default.content, path
+            assert fast.headers.get("etag") == default.headers.get("etag")
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
@@ -0,0 +1,46 @@
+import json
+import logging
+import time
+
+from app.core.logging_setup import BackgroundQueueHandler, JsonFormatter, parse_levels
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_queue_handler_writes_json_in_background_thread():
+    target = _Collect()
+    target.setFormatter(JsonFormatter())
+    handler = BackgroundQueueHandler([target])
+    logger = logging.getLogger("tests.logging_setup")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.info("[RESPONSE] %s %s", "GET", "/health", extra={"http": {"status": 200}})
+        try:
+            raise ValueError("falhou")
+        except ValueError:
+            logger.exception("erro")
+        handler.stop()  # Drena a fila
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    first, second = (json.loads(line) for line in target.lines)
+    assert first["message"] == "[RESPONSE] GET /health"
+    assert first["level"] == "INFO" and first["logger"] == "tests.logging_setup"
+    assert first["http"] == {"status": 200}
+    assert "ValueError: falhou" in second["exc"]
+
+
+def test_parse_levels():
+    assert parse_levels("app.api=debug, sqlalchemy.engine=INFO,,invalido") == {
+        "app.api": "DEBUG",
+        "sqlalchemy.engine": "INFO",
+    }
@@ -0,0 +1,103 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import app.main
+from app.core import metrics
+from app.core.config import settings
+from app.db.base import TimedQueuePool
+
+
+def test_render_prometheus_text_format():
+    registry = metrics.Registry()
+    requests = metrics.Counter("jobs_total", "Jobs", ("queue",), registry=registry)
+    latency = metrics.Histogram("job_seconds", "Latência", ("queue",), buckets=(0.1, 1), registry=registry)
+    requests.inc(queue='a"b')
+    requests.inc(2, queue='a"b')
+    for value in (0.05, 0.5, 3):
+        latency.observe(value, queue="q")
+
+    output = metrics.render(registry.snapshot(), registry)
+
+    assert "# TYPE jobs_total counter" in output
+    assert 'jobs_total{queue="a\\"b"} 3' in output
+    assert 'job_seconds_bucket{queue="q",le="0.1"} 1' in output
+    assert 'job_seconds_bucket{queue="q",le="1"} 2' in output
+    assert 'job_seconds_bucket{queue="q",le="+Inf"} 3' in output
+    assert 'job_seconds_sum{queue="q"} 3.55' in output
+    assert 'job_seconds_count{queue="q"} 3' in output
+
+
+def test_middleware_uses_route_template_and_exposes_metrics():
+    client = TestClient(app.main.app)
+    client.get("/health")
+    client.get("/api/v1/finance/entries/123/receipt")
+    client.get("/nao-existe/42")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert 'route="/api/v1/finance/entries/{entry_id}/receipt"' in body
+    assert "/entries/123" not in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in body
+
+
+def test_metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "segredo")
+    client = TestClient(app.main.app)
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer segredo"}).status_code == 200
+
+
+def test_exposition_sums_worker_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_DIR", str(tmp_path))
+    key = ["GET", "/probe-workers"]
+    dead_pid = 2 ** 22 + 1  # Acima do pid_max padrão: processo encerrado
+    (tmp_path / f"metrics_{dead_pid}.json").write_text(json.dumps({
+        "http_requests_total": [[key + ["200"], 4]],
+        "http_requests_in_progress": [[key, 3]],
+    }))
+    metrics.HTTP_REQUESTS.inc(method="GET", route="/probe-workers", status="200")
+    metrics.write_snapshot(str(tmp_path))
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+
+    body = metrics.exposition()
+
+    assert 'http_requests_total{method="GET",route="/probe-workers",status="200"} 5' in body
+    assert 'http_requests_in_progress{method="GET",route="/probe-workers"}' not in body
+
+
+def test_pool_checkout_is_timed(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1, pool_logging_name="probe",
+    )
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    counts, total, count = metrics.DB_POOL_CHECKOUT.snapshot()[("probe",)]
+    assert count == 1 and total >= 0
+
+
+def test_exited_worker_is_folded_into_the_aggregate(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_DIR", str(tmp_path))
+    key = ["GET", "/probe-exited"]
+    dead_pid = 2 ** 22 + 2
+    snapshot = tmp_path / f"metrics_{dead_pid}.json"
+    snapshot.write_text(json.dumps({"_worker": "a", "http_requests_total": [[key + ["200"], 4]]}))
+
+    metrics.fold_exited_worker(str(tmp_path), dead_pid)
+    assert not snapshot.exists()
+    # PID reaproveitado por um worker novo: os valores se somam, não se substituem
+    snapshot.write_text(json.dumps({"_worker": "b", "http_requests_total": [[key + ["200"], 1]]}))
+    metrics.fold_exited_worker(str(tmp_path), dead_pid)
+
+    assert 'http_requests_total{method="GET",route="/probe-exited",status="200"} 5' in metrics.exposition()
+    # Snapshot ainda não apagado de um worker já somado: não conta duas vezes
+    snapshot.write_text(json.dumps({"_worker": "b", "http_requests_total": [[key + ["200"], 1]]}))
+    assert 'http_requests_total{method="GET",route="/probe-exited",status="200"} 5' in metrics.exposition()
@@ -0,0 +1,97 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.db.base import Base
+from app.db.migrations import ALEMBIC_INI, SchemaOutdatedError, check_schema, head_revision
+
+
+def _upgrade(engine, revision="head"):
+    config = Config(str(ALEMBIC_INI))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def test_migrations_build_the_models_schema():
+    engine = create_engine("sqlite://")
+    with pytest.raises(SchemaOutdatedError):
+        check_schema(engine)
+
+    _upgrade(engine)
+
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    assert diff == []
+    check_schema(engine)
+
+
+def test_baseline_adopts_database_created_by_legacy_create_all():
+    engine = create_engine("sqlite://")
+    # Banco criado pelo antigo create_all: esquema da migração base, sem alembic_version
+    _upgrade(engine, "0001")
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+        # Banco anterior à v1.1: equipamentos sem family_id
+        connection.execute(text("DROP TABLE maintenance_equipment"))
+        connection.execute(text("CREATE TABLE maintenance_equipment (id INTEGER PRIMARY KEY, name VARCHAR(200))"))
+        connection.execute(text("INSERT INTO maintenance_equipment (id, name) VALUES (1, 'Geladeira')"))
+
+    _upgrade(engine)
+
+    assert "family_id" in {c["name"] for c in inspect(engine).get_columns("maintenance_equipment")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == head_revision()
+        family_id = connection.execute(text("SELECT family_id FROM maintenance_equipment")).scalar()
+        assert family_id == connection.execute(text("SELECT id FROM families WHERE codigo_unico = 'DEFAULT'")).scalar()
+
+
+def test_child_family_id_backfill():
+    engine = create_engine("sqlite://")
+    _upgrade(engine, "0005")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO families (id, name, codigo_unico, created_at, updated_at) "
+            "VALUES (7, 'Silva', 'S', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+        connection.execute(text(
+            "INSERT INTO healthcare_familymember (id, family_id, name, birth_date, blood_type, allergies, "
+            "chronic_conditions, notes, \"order\", created_at, updated_at) "
+            "VALUES (3, 7, 'Ana', '2000-01-01', '', '', '', '', 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+        connection.execute(text(
+            "INSERT INTO healthcare_medication (family_member_id, name, dosage, frequency, start_date, prescribed_by, "
+            "prescription_number, instructions, side_effects, notes, created_at, updated_at) "
+            "VALUES (3, 'Dipirona', '1g', 'once', '2024-01-01', '', '', '', '', '', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+
+    _upgrade(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT family_id FROM healthcare_medication")).scalar() == 7
+
+
+def test_category_usage_backfill():
+    engine = create_engine("sqlite://")
+    _upgrade(engine, "0006")
+    with engine.begin() as connection:
+        for amount, day in ((10, "2024-01-05"), (15, "2024-01-05"), (7, "2024-02-01")):
+            connection.execute(text(
+                "INSERT INTO finance_entry (family_id, category_id, description, amount, date, type, is_paid, "
+                "created_by_id, created_at, updated_at) "
+                f"VALUES (7, 3, 'Mercado', {amount}, '{day}', 'EXPENSE', 1, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            ))
+
+    _upgrade(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT day, entry_count, total_amount FROM finance_category_usage WHERE category_id = 3 ORDER BY day"
+        )).all()
+    assert [(str(day), count, float(total)) for day, count, total in rows] == [
+        ("2024-01-05", 2, 25.0), ("2024-02-01", 1, 7.0),
+    ]
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_QUEUE_WAIT
+
+
+def test_verify_runs_off_loop_and_rehashes_other_cost():
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("segredo")
+    current_hash = security.get_password_hash("segredo")
+
+    async def run():
+        return (
+            await security.verify_password_async("segredo", old_hash),
+            await security.verify_password_async("errada", old_hash),
+            await security.verify_password_async("segredo", current_hash),
+        )
+
+    (valid, new_hash), (wrong, _), (current, no_update) = asyncio.run(run())
+    assert valid and not wrong and current
+    assert new_hash.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$") and security.verify_password("segredo", new_hash)
+    assert no_update is None
+    assert PASSWORD_HASH_QUEUE_WAIT.snapshot()[("verify",)][2] >= 3
+
+
+def test_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(security.get_password_hash_async("segredo"))
+    assert exc.value.status_code == 503 and exc.value.headers["Retry-After"] == "1"
@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.principals import load_principal, principal_cache, user_key
+from app.db.base import Base
+from app.db.query_stats import track_queries
+from app.models.family import Family
+from app.models.user import User
+
+
+def _database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        user = User(username="ana", password="x", family_id=family.id, is_active=True)
+        db.add(user)
+        db.commit()
+        return engine, user.id, family.id
+
+
+def test_principal_is_cached_and_revalidated_by_version(tmp_path):
+    principal_cache.clear()
+    engine, user_id, family_id = _database(tmp_path)
+    key, criteria = user_key(user_id), [User.id == user_id]
+
+    with Session(engine) as db:
+        with track_queries() as stats:
+            first = load_principal(db, key, criteria)
+            second = load_principal(db, key, criteria)
+        assert stats.count == 1 and first is second
+        assert first.family_ids == (family_id,) and not first.is_superuser
+
+        # TTL vencido, versão igual: só a consulta da versão, sem JOIN
+        principal_cache._data[key] = (0.0, first)
+        with track_queries() as stats:
+            assert load_principal(db, key, criteria) is first
+        assert stats.count == 1 and "auth_version" in next(iter(stats.statements))
+
+        # Outro worker alterou o usuário (versão incrementada): recarrega
+        db.execute(update(User).where(User.id == user_id).values(is_staff=True, auth_version=User.auth_version + 1))
+        db.commit()
+        principal_cache._data[key] = (0.0, first)
+        assert load_principal(db, key, criteria).is_staff
+
+
+def test_orm_permission_change_bumps_version_and_discards_cache(tmp_path):
+    principal_cache.clear()
+    engine, user_id, _ = _database(tmp_path)
+    key, criteria = user_key(user_id), [User.id == user_id]
+
+    with Session(engine) as db:
+        assert load_principal(db, key, criteria).auth_version == 0
+        user = db.get(User, user_id)
+        user.first_name = "Ana"  # Não altera o acesso
+        db.commit()
+        assert principal_cache.get(key) is not None
+
+        user.is_superuser = True
+        db.commit()
+        assert principal_cache.get(key) is None
+        reloaded = load_principal(db, key, criteria)
+        assert reloaded.is_superuser and reloaded.auth_version == 1
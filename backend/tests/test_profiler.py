@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import app.main
+from app.api.deps import get_current_admin
+from app.core import profiler
+from app.core.security import create_access_token
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        json.dumps({"value": list(range(50))})
+
+
+def test_sampling_profiler_categorizes_stacks_and_exports():
+    sampler = profiler.SamplingProfiler(interval=0.002)
+    worker = threading.Thread(target=_busy, args=(0.2,))
+    sampler.start()
+    worker.start()
+    worker.join()
+    sampler.stop()
+
+    busy_stacks = {stack: count for stack, count in sampler.samples.items() if any("_busy" in frame for frame in stack)}
+    assert busy_stacks
+    assert {stack[0] for stack in busy_stacks} <= {"[serialization]", "[app]"}
+
+    profile = profiler.build_profile("abc", sampler, "GET", "/x", "", 1, 200, None)
+    assert profile["sample_count"] >= len(busy_stacks)
+    document = profiler.speedscope(profile)
+    assert document["profiles"][0]["type"] == "sampled"
+    assert len(document["profiles"][0]["samples"]) == len(document["profiles"][0]["weights"])
+    line = profiler.collapsed(busy_stacks).splitlines()[0]
+    assert ";" in line and line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_profile_header_only_for_admins(monkeypatch):
+    async def admin(user_id):
+        return user_id == 1
+
+    monkeypatch.setattr(profiler, "is_admin", admin)
+    client = TestClient(app.main.app)
+
+    def get(user_id):
+        token = create_access_token({"sub": str(user_id)})
+        return client.get("/health", headers={"X-Profile": "1", "Authorization": f"Bearer {token}"})
+
+    assert "x-profile-id" not in get(2).headers
+    response = get(1)
+    profile_id = response.headers["x-profile-id"]
+    stored = profiler.get_profile(profile_id)
+    assert stored["path"] == "/health" and stored["user_id"] == 1 and stored["status"] == 200
+
+    app.main.app.dependency_overrides[get_current_admin] = lambda: None
+    try:
+        listed = client.get("/api/v1/system/profiles").json()["profiles"]
+        collapsed = client.get(f"/api/v1/system/profiles/{profile_id}", params={"format": "collapsed"})
+    finally:
+        app.main.app.dependency_overrides.clear()
+    assert listed[0]["id"] == profile_id and "samples" not in listed[0]
+    assert collapsed.status_code == 200
@@ -0,0 +1,103 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.cache import set_cache
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.db.query_stats import assert_max_queries
+from app.models.family import Family
+from app.models.finance import FinanceCategory, FinanceEntry
+from app.models.healthcare import FamilyMember, MedicalAppointment, MedicalProcedure, Medication
+from app.models.maintenance import Equipment, MaintenanceOrder
+from app.models.user import Profile, User
+
+# Máximo de queries por listagem (autenticação incluída), independente do número de linhas:
+# um N+1 novo estoura o orçamento já com as poucas linhas do teste
+BUDGETS = {
+    "/api/v1/finance/entries": 3,
+    "/api/v1/users/": 2,
+    "/api/v1/healthcare/members": 3,
+    "/api/v1/healthcare/appointments": 3,
+    "/api/v1/healthcare/procedures": 2,
+    "/api/v1/healthcare/medications": 2,
+    "/api/v1/maintenance/equipment": 3,
+    "/api/v1/maintenance/orders": 3,
+}
+
+
+def _client(rows: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        family = Family(name="Nossa", codigo_unico="a")
+        db.add(family)
+        db.flush()
+        admin = User(username="admin", email="admin@x.com", password="x", is_active=True, is_superuser=True, family_id=family.id)
+        db.add(admin)
+        db.flush()
+        for i in range(rows):
+            user = User(username=f"u{i}", email=f"u{i}@x.com", password="x", is_active=True, is_superuser=True, family_id=family.id)
+            user.families.append(family)
+            user.profile = Profile()
+            member = FamilyMember(family_id=family.id, name=f"M{i}", birth_date=date(2000, 1, 1))
+            equipment = Equipment(family_id=family.id, name=f"E{i}", owner_id=admin.id)
+            category = FinanceCategory(family_id=family.id, name=f"C{i}", type="EXPENSE", created_by_id=admin.id)
+            db.add_all([user, member, equipment, category])
+            db.flush()
+            db.add_all([
+                FinanceEntry(family_id=family.id, category=category, description="Feira", amount=Decimal("10"),
+                             date=date(2024, 1, 2), type="EXPENSE", created_by_id=admin.id),
+                MedicalAppointment(family_member_id=member.id, doctor_name="Dr", specialty="Clínica",
+                                   reason="Rotina", appointment_date=datetime(2024, 1, 1, 10)),
+                MedicalProcedure(family_member_id=member.id, procedure_name="Raio-X", procedure_date=datetime(2024, 1, 1),
+                                 doctor_name="Dr", location="Hospital", description="Tórax"),
+                Medication(family_member_id=member.id, name="Dipirona", dosage="1g", frequency="8/8h",
+                           start_date=date(2024, 1, 1)),
+                MaintenanceOrder(equipment_id=equipment.id, title="Troca", description="Filtro",
+                                 cost=Decimal("150"), completion_date=date(2024, 1, 3), created_by_id=admin.id),
+            ])
+        db.commit()
+        admin_id = admin.id
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    app.main.app.dependency_overrides[get_db] = override_db
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(admin_id)})}"}
+    return TestClient(app.main.app), headers
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(app.main.settings, "CACHE_BACKEND", "none")
+    set_cache(None)
+    principal_cache.clear()
+    yield
+    app.main.app.dependency_overrides.clear()
+    principal_cache.clear()
+
+
+@pytest.mark.parametrize("path", sorted(BUDGETS))
+def test_list_endpoints_stay_within_query_budget(path, no_response_cache):
+    counts = []
+    for rows in (2, 6):
+        principal_cache.clear()
+        client, headers = _client(rows)
+        with assert_max_queries(BUDGETS[path]) as stats:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        assert len(response.json()) >= rows
+        counts.append(stats.count)
+    # Sem N+1: o número de queries não cresce com as linhas
+    assert counts[0] == counts[1], f"{path}: {counts[0]} queries com 2 linhas, {counts[1]} com 6"
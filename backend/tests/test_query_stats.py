@@ -0,0 +1,63 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.main  # noqa: F401 - middleware de contagem de queries
+from app.db.base import Base
+from app.db.query_stats import assert_max_queries, track_queries
+from app.models.family import Family
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add_all([Family(name=f"F{i}", codigo_unico=f"C{i}") for i in range(6)])
+    db.commit()
+    return db
+
+
+def test_track_queries_counts_repeated_statements():
+    db = _session()
+    with track_queries() as outer:
+        with track_queries() as inner:
+            for family_id in range(1, 7):
+                db.execute(select(Family.name).where(Family.id == family_id)).scalar()
+        db.execute(select(Family.id)).all()
+
+    assert inner.count == 6
+    assert outer.count == 7 and outer.duration > 0
+    [(statement, count)] = outer.repeated(threshold=5)
+    assert count == 6 and "WHERE families.id" in statement
+    assert outer.server_timing().endswith('desc="7 queries"')
+
+
+def test_assert_max_queries_fails_on_regression():
+    db = _session()
+    with assert_max_queries(1):
+        db.execute(select(Family.id)).all()
+    with pytest.raises(AssertionError, match="2 queries executadas"):
+        with assert_max_queries(1):
+            db.execute(select(Family.id)).all()
+            db.execute(select(Family.name)).all()
+
+
+def test_middleware_sets_server_timing_header():
+    db = _session()
+    api = app.main.app
+    probe = FastAPI()
+
+    @probe.get("/probe")
+    def probe_endpoint(session: Session = Depends(lambda: db)):
+        return {"families": len(session.execute(select(Family.id)).all())}
+
+    api.mount("/__probe", probe)
+    try:
+        response = TestClient(api).get("/__probe/probe")
+    finally:
+        api.routes.pop()
+    assert response.json() == {"families": 6}
+    assert response.headers["server-timing"].endswith('desc="1 queries"')
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+import app.main
+from app.core import rate_limit
+from app.core.metrics import RATE_LIMIT_REQUESTS
+
+
+def test_memory_bucket_refills_at_configured_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    buckets = rate_limit.MemoryBuckets(max_keys=2)
+    capacity, rate = rate_limit.parse_rate("3/60")
+
+    assert [buckets.take("a", capacity, rate) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a", capacity, rate) == 20  # Uma ficha a cada 20 s
+    clock[0] += 20
+    assert buckets.take("a", capacity, rate) == 0
+
+    buckets.take("b", capacity, rate)
+    buckets.take("c", capacity, rate)
+    assert buckets.take("a", capacity, rate) == 0  # "a" saiu do LRU: balde cheio de novo
+
+
+def test_login_limited_per_username_before_database(monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOGIN_PER_USERNAME", "2/60")
+    rate_limit.set_buckets(rate_limit.MemoryBuckets())
+    client = TestClient(app.main.app)
+    try:
+        for _ in range(2):
+            rate_limit.get_buckets().take("login-username:ana", 2, 2 / 60)  # Tentativas anteriores
+        response = client.post("/api/v1/auth/login", data={"username": " Ana ", "password": "x"})
+    finally:
+        rate_limit.set_buckets(None)
+
+    # O banco de teste não existe: 429 prova que nada foi consultado
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+    assert RATE_LIMIT_REQUESTS.snapshot()[("login-username", "limited")] >= 1
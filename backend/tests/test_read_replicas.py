@@ -0,0 +1,117 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.api import deps
+from app.core import security
+from app.core.cache import MemoryCache, set_cache
+from app.core.principals import principal_cache
+from app.core.security import READ_PRIMARY_COOKIE, create_access_token, create_primary_token, primary_token_valid
+from app.db.base import Base, RoutingSession, get_db
+from app.models.family import Family
+from app.models.finance import FinanceEntry
+from app.models.user import User
+
+
+def test_routing_session_reads_from_replica_and_writes_to_primary(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        Base.metadata.create_all(engine)
+
+    class TestRoutingSession(RoutingSession):
+        pass
+
+    TestRoutingSession.primary = primary
+    TestRoutingSession.replicas = [replica]
+
+    with TestRoutingSession() as db:
+        db.add(Family(name="Silva", codigo_unico="ABC123"))
+        db.commit()
+        # Réplica ainda sem o registro (replicação simulada: nada é copiado)
+        assert db.scalar(select(func.count(Family.id))) == 0
+
+    with primary.connect() as connection:
+        assert connection.scalar(select(func.count(Family.id))) == 1
+
+
+def test_primary_token_is_per_user_and_expires(monkeypatch):
+    token = create_primary_token(7, seconds=10)
+    assert primary_token_valid(token, 7)
+    assert not primary_token_valid(token, 8)
+    assert not primary_token_valid("abc", 7)
+    assert not primary_token_valid(None, 7)
+
+    monkeypatch.setattr(security.time, "time", lambda: 10**12)
+    assert not primary_token_valid(token, 7)
+
+
+def test_read_db_stays_on_primary_session_after_a_write(monkeypatch):
+    monkeypatch.setattr(deps, "REPLICA_URLS", ["postgresql://u:p@replica/d"])
+    user = User(id=7)
+    primary_db = object()
+
+    def resolve(cookies):
+        header = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        request = Request({"type": "http", "headers": [(b"cookie", header.encode())] if header else []})
+        dependency = deps.get_read_db(request, user, primary_db)
+        db = next(dependency)
+        dependency.close()
+        return db
+
+    assert resolve({READ_PRIMARY_COOKIE: create_primary_token(7, seconds=10)}) is primary_db
+    assert isinstance(resolve({}), RoutingSession)
+
+    monkeypatch.setattr(deps, "REPLICA_URLS", [])
+    assert resolve({}) is primary_db
+
+
+def test_cached_summary_is_computed_on_primary_while_replica_lags(tmp_path, monkeypatch):
+    primary = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'primary.db'}"))
+    replica = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'replica.db'}"))
+    for factory in (primary, replica):
+        Base.metadata.create_all(factory.kw["bind"])
+        with factory() as db:
+            db.add(Family(id=1, name="Silva", codigo_unico="ABC123"))
+            db.add_all([User(id=1, username="ana", password="x", is_active=True, family_id=1),
+                        User(id=2, username="bia", password="x", is_active=True, family_id=1)])
+            db.commit()
+
+    def override_db():
+        with primary() as db:
+            yield db
+
+    monkeypatch.setattr(deps, "REPLICA_URLS", ["postgresql://u:p@replica/d"])
+    monkeypatch.setattr(deps, "ReadSessionLocal", replica)
+    set_cache(MemoryCache())
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    today = date.today()
+    params = {"year": today.year, "month": today.month}
+
+    def auth(user_id):
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    try:
+        assert client.get("/api/v1/finance/summary", params=params, headers=auth(1)).json()["month_income"] == "0.00"
+        # Escrita de outro membro só no primário (réplica atrasada)
+        with primary() as db:
+            db.add(FinanceEntry(family_id=1, description="Salário", amount=100, date=today, type="INCOME",
+                                is_paid=True, created_by_id=2))
+            db.commit()
+
+        # Leitor sem cookie de primário: listagens vão para a réplica...
+        assert client.get("/api/v1/finance/entries", headers=auth(1)).json() == []
+        # ...mas o resumo (em cache por versão da família) é calculado no primário
+        assert client.get("/api/v1/finance/summary", params=params, headers=auth(1)).json()["month_income"] == "100.00"
+        assert client.get("/api/v1/finance/summary", params=params, headers=auth(2)).json()["month_income"] == "100.00"
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
+        set_cache(None)
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.config import settings
+from app.core.refresh_tokens import issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+from app.db.base import Base
+from app.models.user import User
+
+
+def _setup(tmp_path):
+    path = tmp_path / "app.db"
+    with Session(create_engine(f"sqlite:///{path}")) as db:
+        Base.metadata.create_all(db.get_bind())
+        user = User(username="ana", password="x", is_active=True)
+        db.add(user)
+        db.commit()
+        token = issue_refresh_token(db, user.id, 0)
+        db.commit()
+        return path, user.id, token
+
+
+def _run(path, scenario):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            await scenario(db)
+        await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_rotation_and_reuse_revokes_session(tmp_path, monkeypatch):
+    path, user_id, token = _setup(tmp_path)
+
+    async def scenario(db):
+        rotated_user, second = await rotate_refresh_token(db, token)
+        assert rotated_user == user_id and second != token
+        # Reuso dentro da janela: recusado, a sessão continua válida
+        assert await rotate_refresh_token(db, token) is None
+        _, third = await rotate_refresh_token(db, second)
+
+        # Reuso depois da janela: a sessão inteira é revogada
+        monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", -1)
+        assert await rotate_refresh_token(db, second) is None
+        assert await rotate_refresh_token(db, third) is None
+
+    _run(path, scenario)
+
+
+def test_auth_version_change_and_logout_invalidate(tmp_path):
+    path, user_id, token = _setup(tmp_path)
+
+    async def scenario(db):
+        _, second = await rotate_refresh_token(db, token)
+        assert await revoke_refresh_token(db, second)
+        assert await rotate_refresh_token(db, second) is None
+
+        with Session(create_engine(f"sqlite:///{path}")) as sync_db:
+            fresh = issue_refresh_token(sync_db, user_id, 0)
+            sync_db.execute(update(User).where(User.id == user_id).values(auth_version=1))  # ex.: senha trocada
+            sync_db.commit()
+        assert await rotate_refresh_token(db, fresh) is None
+
+    _run(path, scenario)
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select, text
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.db import slow_queries
+from app.db.base import Base
+from app.db.slow_queries import normalize_sql, parameter_shape, request_scope, set_request_family, top_offenders
+from app.models.system import SlowQueryLog
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND name = 'Ana'  LIMIT 10") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = '?' LIMIT ?"
+    )
+    assert normalize_sql("SELECT a FROM t WHERE x = $1 AND y IN ($2, $3)") == "SELECT a FROM t WHERE x = $1 AND y IN (...)"
+    assert parameter_shape({"id": 1, "name": "Ana"}, False) == {"id": "int", "name": "str"}
+    assert parameter_shape([(1, "a"), (2, "b")], True) == {"rows": 2, "shape": ["int", "str"]}
+
+
+def test_slow_queries_are_captured_with_route_and_family(monkeypatch):
+    monkeypatch.setattr(slow_queries.settings, "SLOW_QUERY_MS", 1)
+    monkeypatch.setattr(slow_queries, "query_duration", lambda context: 0.25)
+    slow_queries.clear_slow_queries()
+    engine = create_engine("sqlite://")
+
+    with request_scope("GET", "/api/v1/healthcare/members/42"):
+        set_request_family(7)
+        with engine.connect() as connection:
+            for _ in range(2):
+                connection.execute(text("SELECT 1 WHERE 5 > :x"), {"x": 3})
+
+    [top] = top_offenders(slow_queries.recent_slow_queries())
+    assert top["sql"] == "SELECT ? WHERE ? > ?"
+    assert (top["count"], top["total_ms"], top["avg_ms"]) == (2, 500.0, 250.0)
+    assert top["routes"] == ["GET /api/v1/healthcare/members/{id}"]
+    assert top["family_ids"] == [7]
+    assert top["params"] == ["int"]  # sqlite: parâmetros posicionais
+    slow_queries.clear_slow_queries()
+
+
+def test_persist_writes_rows_without_capturing_itself(monkeypatch):
+    monkeypatch.setattr(slow_queries.settings, "SLOW_QUERY_MS", 1)
+    monkeypatch.setattr(slow_queries, "query_duration", lambda context: 1.0)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    slow_queries.clear_slow_queries()
+
+    slow_queries.persist([{
+        "sql": "SELECT ?", "params": None, "duration_ms": 812.5, "route": "GET /x",
+        "family_id": None, "plan": None, "created_at": datetime.now(timezone.utc),
+    }], engine)
+
+    assert slow_queries.recent_slow_queries() == []
+    monkeypatch.setattr(slow_queries.settings, "SLOW_QUERY_MS", 0)
+    with engine.connect() as connection:
+        assert connection.execute(select(SlowQueryLog.sql, SlowQueryLog.duration_ms)).all() == [("SELECT ?", 812.5)]
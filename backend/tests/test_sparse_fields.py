@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.api.v1.endpoints.finance import ENTRY_FIELDS
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.models.family import Family
+from app.models.finance import FinanceEntry
+from app.models.maintenance import Equipment, MaintenanceOrder
+from app.models.user import User
+
+
+def test_fields_are_validated_against_the_allow_list():
+    # Ordem do schema, sempre com o id
+    assert ENTRY_FIELDS.parse("amount, description") == ("description", "amount", "id")
+    assert ENTRY_FIELDS.parse(None) is None and ENTRY_FIELDS.parse(" , ") is None
+    with pytest.raises(HTTPException) as error:
+        ENTRY_FIELDS.parse("description,category,password")
+    assert error.value.status_code == 400
+    assert "category, password" in error.value.detail
+
+
+def test_fields_select_only_the_requested_columns():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        family = Family(name="Nossa", codigo_unico="a")
+        db.add(family)
+        db.flush()
+        user = User(username="ana", password="x", is_active=True, family_id=family.id)
+        db.add(user)
+        db.flush()
+        equipment = Equipment(family_id=family.id, name="Geladeira", owner_id=user.id)
+        db.add_all([
+            equipment,
+            FinanceEntry(family_id=family.id, description="Feira", amount=Decimal("10.50"), date=date(2024, 1, 2),
+                         type="EXPENSE", notes="texto longo", created_by_id=user.id),
+        ])
+        db.flush()
+        db.add(MaintenanceOrder(equipment_id=equipment.id, title="Troca", description="Filtro",
+                                warranty_terms="texto longo", created_by_id=user.id))
+        db.commit()
+        user_id = user.id
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    try:
+        entries = client.get("/api/v1/finance/entries?fields=description,amount", headers=headers)
+        assert entries.json() == [{"id": entries.json()[0]["id"], "description": "Feira", "amount": "10.50"}]
+        assert not any("finance_entry.notes" in statement for statement in statements)
+
+        statements.clear()
+        orders = client.get("/api/v1/maintenance/orders?fields=title,equipment_name", headers=headers)
+        assert [set(order) for order in orders.json()] == [{"id", "title", "equipment_name"}]
+        assert orders.json()[0]["equipment_name"] == "Geladeira"
+        assert not any("warranty_terms" in statement for statement in statements)
+
+        assert client.get("/api/v1/healthcare/members?fields=photo", headers=headers).status_code == 400
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
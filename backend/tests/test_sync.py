@@ -0,0 +1,120 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.api.v1.endpoints.sync import decode_token, encode_token
+from app.db.base import Base
+from app.db.writes import insert_returning
+from app.models.family import Family
+from app.models.healthcare import FamilyMember, Medication
+from app.models.sync import SyncChange
+
+
+def _changes(db):
+    return {(c.family_id, c.resource, c.object_id) for c in db.query(SyncChange)}
+
+
+def test_token_round_trip_and_invalid_token():
+    moment = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    assert decode_token(encode_token(moment)) == moment
+    with pytest.raises(HTTPException) as exc:
+        decode_token("nao-e-um-token")
+    assert exc.value.status_code == 400
+
+
+def test_orm_and_core_writes_record_changes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        member = FamilyMember(family_id=family.id, name="Ana", birth_date=date(1990, 1, 1))
+        db.add(member)
+        db.commit()
+
+        assert _changes(db) == {(family.id, "healthcare_familymember", member.id)}
+
+        now = datetime.now()
+        medication = insert_returning(db, Medication, {
+            "family_member_id": member.id, "name": "Dipirona", "dosage": "1", "frequency": "8/8h",
+            "start_date": now.date(), "created_at": now, "updated_at": now,
+        })
+        member.name = "Ana Maria"
+        db.commit()
+
+        assert _changes(db) == {
+            (family.id, "healthcare_familymember", member.id),
+            (family.id, "healthcare_medication", medication["id"]),
+        }
+        # Upsert: uma linha por registro, mesmo após várias alterações
+        assert db.query(SyncChange).count() == 2
+
+
+def test_unmodified_objects_are_not_recorded():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        member = FamilyMember(family_id=family.id, name="Ana", birth_date=date(1990, 1, 1))
+        db.add(member)
+        db.commit()
+        db.query(SyncChange).delete()
+        db.commit()
+
+        member.name = member.name  # mesmo valor: sem alteração real
+        family.name = "Silva Santos"  # Family não é sincronizável
+        db.commit()
+
+        assert _changes(db) == set()
+
+
+def test_category_update_changes_entry_list_state_without_rewriting_entries():
+    import asyncio
+
+    from app.api.v1.endpoints.finance import update_category
+    from app.db.tenancy import TenantScope
+    from app.models.finance import FinanceCategory, FinanceEntry
+    from app.schemas.finance import FinanceCategoryUpdate
+    from app.utils.conditional_get import collection_state
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        family = Family(name="Silva", codigo_unico="ABC123")
+        db.add(family)
+        db.flush()
+        category = FinanceCategory(family_id=family.id, name="Mercado", type="EXPENSE", created_by_id=1,
+                                   updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        db.add(category)
+        db.flush()
+        entry = FinanceEntry(family_id=family.id, category_id=category.id, description="Feira", amount=10,
+                             date=date(2024, 5, 1), type="EXPENSE", created_by_id=1,
+                             updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        db.add(entry)
+        db.commit()
+        db.query(SyncChange).delete()
+        db.commit()
+        scope = TenantScope((family.id,), family.id)
+
+        def entries_state():
+            return collection_state(
+                db, scope.family_ids,
+                (FinanceEntry, [scope.where(FinanceEntry)]), (FinanceCategory, [scope.where(FinanceCategory)]),
+            )
+
+        before = entries_state()
+        asyncio.run(update_category(category.id, FinanceCategoryUpdate(name="Supermercado"), db, scope))
+
+        # ETag da listagem muda pela categoria; /sync recebe a categoria, não os lançamentos
+        assert entries_state().values != before.values
+        assert _changes(db) == {(family.id, "finance_category", category.id)}
+        db.refresh(entry)
+        assert entry.updated_at.replace(tzinfo=timezone.utc) == datetime(2024, 1, 1, tzinfo=timezone.utc)
@@ -0,0 +1,103 @@
+import json
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main
+import app.models  # noqa: F401 - registra todos os modelos no metadata
+from app.core.principals import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base, get_db
+from app.db.tenancy import TenantScope, tenant_path
+from app.models.family import Family
+from app.models.finance import FinanceEntry
+from app.models.healthcare import FamilyMember, MedicalAppointment
+from app.models.maintenance import Equipment, EquipmentAttachment, MaintenanceImage, MaintenanceOrder
+from app.models.user import User
+
+
+def test_join_path_per_model():
+    assert tenant_path(FinanceEntry) == ()
+    assert tenant_path(MedicalAppointment) == ()  # family_id denormalizado
+    assert tenant_path(EquipmentAttachment) == (("equipment_id", Equipment),)
+    assert tenant_path(MaintenanceImage) == (("maintenance_order_id", MaintenanceOrder),)
+
+    single = str(TenantScope((3,), 3).where(FinanceEntry).compile(compile_kwargs={"literal_binds": True}))
+    assert single == "finance_entry.family_id = 3"
+    nested = str(TenantScope((1, 2)).where(MaintenanceImage).compile(compile_kwargs={"literal_binds": True}))
+    assert "maintenance_maintenanceorder.family_id IN (1, 2)" in nested and "JOIN" not in nested
+
+
+def test_child_records_are_scoped_to_the_family():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        ours, other = Family(name="Nossa", codigo_unico="a"), Family(name="Outra", codigo_unico="b")
+        db.add_all([ours, other])
+        db.flush()
+        user = User(username="ana", password="x", is_active=True, family_id=ours.id)
+        member = FamilyMember(family_id=other.id, name="Bia", birth_date=date(2000, 1, 1))
+        db.add_all([user, member])
+        db.flush()
+        appointment = MedicalAppointment(
+            family_member_id=member.id, doctor_name="Dr", specialty="Clínica", reason="Rotina",
+            appointment_date=datetime(2024, 1, 1),
+            documents=json.dumps([{"name": "a.txt", "type": "text/plain", "content": "b2k="}]),
+        )
+        db.add(appointment)
+        db.commit()
+        user_id, appointment_id = user.id, appointment.id
+
+    def override_db():
+        with factory() as db:
+            yield db
+
+    principal_cache.clear()
+    app.main.app.dependency_overrides[get_db] = override_db
+    client = TestClient(app.main.app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    try:
+        assert client.get("/api/v1/healthcare/appointments", headers=headers).json() == []
+        # O download não conferia a família do registro
+        download = client.get(f"/api/v1/healthcare/appointments/{appointment_id}/documents/0/download", headers=headers)
+        assert download.status_code == 404
+    finally:
+        app.main.app.dependency_overrides.clear()
+        principal_cache.clear()
+
+
+def test_denormalized_family_follows_the_parent():
+    from app.db.writes import insert_returning
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        first, second = Family(name="A", codigo_unico="a"), Family(name="B", codigo_unico="b")
+        member = FamilyMember(family=first, name="Bia", birth_date=date(2000, 1, 1))
+        # ORM: o filho recebe a família do pai no flush, mesmo com o pai ainda sem id
+        orm_appointment = MedicalAppointment(
+            family_member=member, doctor_name="Dr", specialty="Clínica", reason="Rotina",
+            appointment_date=datetime(2024, 1, 1),
+        )
+        db.add_all([first, second, orm_appointment])
+        db.commit()
+        assert orm_appointment.family_id == first.id
+
+        # Core: INSERT sem family_id copia a família do membro
+        core_appointment = insert_returning(db, MedicalAppointment, {
+            "family_member_id": member.id, "doctor_name": "Dr", "specialty": "Clínica", "reason": "Retorno",
+            "appointment_date": datetime(2024, 2, 1), "created_at": datetime.now(), "updated_at": datetime.now(),
+        })
+        assert core_appointment["family_id"] == first.id
+        db.commit()
+
+        # Membro movido para outra família: as consultas vão junto
+        member.family_id = second.id
+        db.commit()
+        families = db.query(MedicalAppointment.family_id).all()
+        assert families == [(second.id,), (second.id,)]
@@ -0,0 +1,79 @@
+from app.core import workers
+from app.db import base
+
+
+def test_cgroup_cpu_quota_v2_and_v1(tmp_path):
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    (v2 / "cpu.max").write_text("150000 100000\n")
+    assert workers.cgroup_cpu_quota(v2) == 1.5
+
+    (v2 / "cpu.max").write_text("max 100000\n")
+    assert workers.cgroup_cpu_quota(v2) is None
+
+    v1 = tmp_path / "v1" / "cpu"
+    v1.mkdir(parents=True)
+    (v1 / "cpu.cfs_quota_us").write_text("200000")
+    (v1 / "cpu.cfs_period_us").write_text("100000")
+    assert workers.cgroup_cpu_quota(tmp_path / "v1") == 2
+    (v1 / "cpu.cfs_quota_us").write_text("-1")
+    assert workers.cgroup_cpu_quota(tmp_path / "v1") is None
+
+    assert workers.cgroup_cpu_quota(tmp_path / "vazio") is None
+
+
+def test_default_workers_follows_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    (tmp_path / "cpu.max").write_text("150000 100000")
+
+    assert workers.available_cpus(tmp_path) == 2
+    assert workers.default_workers(root=tmp_path) == 4
+    assert workers.default_workers(per_cpu=3, max_workers=5, root=tmp_path) == 5
+
+    (tmp_path / "cpu.max").write_text("50000 100000")
+    assert workers.default_workers(root=tmp_path) == 2  # mínimo para reinício gradual
+
+
+def test_pool_limits_split_budget_between_workers(monkeypatch):
+    import pytest
+
+    monkeypatch.setattr(base.settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(base.settings, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(base.settings, "DB_POOL_MIN_PER_WORKER", 4)
+
+    # O engine async (poucos endpoints) fica com 1/4; o sync com o resto
+    monkeypatch.setattr(base.settings, "WEB_CONCURRENCY", 1)
+    assert base.pool_limits() == {"sync": (15, 8), "async": (5, 2)}
+    monkeypatch.setattr(base.settings, "WEB_CONCURRENCY", 4)
+    assert base.pool_limits() == {"sync": (4, 2), "async": (1, 0)}
+    # Réplicas dividem o orçamento com o primário; abaixo do mínimo, a inicialização falha
+    with pytest.raises(RuntimeError):
+        base.pool_limits(servers=2)
+    monkeypatch.setattr(base.settings, "DB_POOL_SIZE", 0)
+    assert base.pool_limits(servers=2) == {"sync": (0, 0), "async": (0, 0)}
+
+
+def test_automatic_workers_fit_the_pool_budget():
+    assert workers.pool_capped_workers(8, pool_size=10, min_per_worker=4) == 2
+    assert workers.pool_capped_workers(8, pool_size=40, min_per_worker=4) == 8
+    assert workers.pool_capped_workers(8, pool_size=40, min_per_worker=4, servers=2) == 5
+    assert workers.pool_capped_workers(8, pool_size=2, min_per_worker=4) == 1
+    assert workers.pool_capped_workers(8, pool_size=0, min_per_worker=4) == 8  # NullPool/PgBouncer
+
+
+def test_memory_backends_are_not_used_per_worker(monkeypatch):
+    from app.core import cache, rate_limit
+
+    monkeypatch.setattr(cache.settings, "CACHE_BACKEND", "memory")
+    monkeypatch.setattr(cache.settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(cache.settings, "CACHE_REDIS_URL", None)
+    monkeypatch.setattr(cache.settings, "WEB_CONCURRENCY", 1)
+    assert (cache.cache_backend(), rate_limit.buckets_backend()) == ("memory", "memory")
+    assert rate_limit.worker_share(5, 0.5) == (5, 0.5)
+
+    monkeypatch.setattr(cache.settings, "WEB_CONCURRENCY", 4)
+    assert (cache.cache_backend(), rate_limit.buckets_backend()) == ("none", "memory")
+    assert rate_limit.worker_share(5, 0.5) == (2, 0.125)
+
+    monkeypatch.setattr(cache.settings, "CACHE_REDIS_URL", "redis://localhost:6379/0")
+    assert (cache.cache_backend(), rate_limit.buckets_backend()) == ("redis", "redis")
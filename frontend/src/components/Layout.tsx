@@ -1,5 +1,6 @@
 import { Outlet, Link, useNavigate } from 'react-router-dom'
 import { useAuthStore } from '../stores/authStore'
+import { authService } from '../services/authService'
 import { 
   Home, Users, Calendar, Pill, Wrench, Settings, LogOut, 
   Heart, Menu, X, Activity, Shield, Building2, User, Wallet, TrendingUp
@@ -8,12 +9,16 @@ import { useState } from 'react'
 import { useAppVersion } from '../hooks/useAppVersion'
 
 export default function Layout() {
-  const { user, logout } = useAuthStore()
+  const { user, refreshToken, logout } = useAuthStore()
   const navigate = useNavigate()
   const [sidebarOpen, setSidebarOpen] = useState(false)
   const appVersion = useAppVersion()
 
   const handleLogout = () => {
+    // Revoga a sessão no servidor; falha de rede não impede o logout local
+    if (refreshToken) {
+      authService.logout(refreshToken).catch(() => {})
+    }
     logout()
     navigate('/login')
   }
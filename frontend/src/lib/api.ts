@@ -89,10 +89,71 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 )
 
+// Renovação do access token com o refresh token: uma única chamada em andamento,
+// compartilhada pelas requisições que receberem 401 ao mesmo tempo
+let refreshPromise: Promise<string> | null = null
+
+// Token salvo no localStorage: outra aba pode já ter feito a rotação (cada refresh token
+// vale uma vez; reusar um token antigo fora da janela de tolerância revoga a sessão)
+const persistedRefreshToken = async () => {
+  await useAuthStore.persist.rehydrate()
+  return useAuthStore.getState().refreshToken
+}
+
+const requestTokens = async (refreshToken: string | null) => {
+  const response = await api.post('/auth/refresh', { refresh_token: refreshToken }, { timeout: 10000 })
+  const { access_token, refresh_token } = response.data
+  useAuthStore.getState().setTokens(access_token, refresh_token)
+  return access_token as string
+}
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    refreshPromise = (async () => {
+      const refreshToken = await persistedRefreshToken()
+      try {
+        return await requestTokens(refreshToken)
+      } catch (error) {
+        // Outra aba renovou ao mesmo tempo: tenta uma vez com o token novo
+        let newer = await persistedRefreshToken()
+        if (newer === refreshToken) {
+          // A resposta da outra aba pode ainda não ter sido salva
+          await new Promise((resolve) => setTimeout(resolve, 1000))
+          newer = await persistedRefreshToken()
+        }
+        if (!newer || newer === refreshToken) throw error
+        return await requestTokens(newer)
+      }
+    })().finally(() => {
+      refreshPromise = null
+    })
+  }
+  return refreshPromise
+}
+
 // Interceptor para lidar com erros de autenticação
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const config = error.config
+    const isAuthRoute = typeof config?.url === 'string' && config.url.startsWith('/auth/')
+    if (
+      error.response?.status === 401 &&
+      config &&
+      !config._retried &&
+      !isAuthRoute &&
+      useAuthStore.getState().refreshToken
+    ) {
+      config._retried = true
+      try {
+        const token = await refreshAccessToken()
+        config.headers.Authorization = `Bearer ${token}`
+        return api(config)
+      } catch {
+        // Refresh inválido ou expirado: segue para o logout abaixo
+      }
+    }
+
     const detail = error.response?.data?.detail
     if (detail !== undefined && detail !== null) {
       error.message = typeof detail === 'string' ? detail : (Array.isArray(detail) ? detail.map((d: { msg?: string }) => d?.msg ?? String(d)).join('; ') : String(detail))
@@ -102,7 +163,8 @@ api.interceptors.response.use(
       console.error('Request URL:', error.config?.url)
       console.error('Token presente:', !!useAuthStore.getState().token)
     }
-    if (error.response?.status === 401) {
+    // Falha do próprio /auth/refresh: quem decide o logout é a requisição que pediu a renovação
+    if (error.response?.status === 401 && config?.url !== '/auth/refresh') {
       console.warn('Token inválido ou expirado. Fazendo logout e redirecionando...')
       useAuthStore.getState().logout()
       // Usar setTimeout para garantir que o logout seja processado antes do redirecionamento
@@ -34,7 +34,7 @@ export default function Login() {
 
     try {
       console.log('Tentando fazer login com:', formData.username)
-      const { access_token } = await authService.login(formData)
+      const { access_token, refresh_token } = await authService.login(formData)
       console.log('Login bem-sucedido! Token:', access_token.substring(0, 20) + '...')
       
       // Salvar ou remover dados do "Lembrar de mim"
@@ -55,7 +55,7 @@ export default function Login() {
       const userData = await authService.getMe()
       console.log('Dados do usuário:', userData)
       
-      setAuth(userData, access_token)
+      setAuth(userData, access_token, refresh_token)
       navigate('/')
     } catch (err: any) {
       if (import.meta.env.DEV) {
@@ -24,12 +24,12 @@ export default function Register() {
     setLoading(true)
 
     try {
-      const { access_token } = await authService.register(formData)
+      const { access_token, refresh_token } = await authService.register(formData)
       
       // Buscar dados do usuário
       const userData = await authService.getMe()
       
-      setAuth(userData, access_token)
+      setAuth(userData, access_token, refresh_token)
       navigate('/')
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Erro ao criar conta')
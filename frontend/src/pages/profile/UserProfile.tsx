@@ -1,36 +1,82 @@
 import { useState, useEffect } from 'react'
 import {
-  Key, Copy, RefreshCw, Trash2, Loader2, CheckCircle, AlertCircle,
+  Key, Copy, Trash2, Loader2, CheckCircle, AlertCircle,
   Eye, EyeOff, User
 } from 'lucide-react'
 import api from '../../lib/api'
 import { useAuthStore } from '../../stores/authStore'
 
+interface ApiTokenInfo {
+  id: number
+  name: string
+  prefix: string
+  scopes: string[]
+  created_at: string
+  last_used_at: string | null
+}
+
+const SCOPE_LABELS: Record<string, string> = {
+  dashboard: 'Dashboard',
+  finance: 'Finanças',
+  healthcare: 'Saúde',
+  maintenance: 'Manutenção',
+  sync: 'Sincronização',
+  telegram: 'Telegram',
+}
+
+const formatScope = (scope: string) => {
+  if (scope === '*') return 'Acesso total'
+  const [area, access] = scope.split(':')
+  return `${SCOPE_LABELS[area] || area} (${access === 'write' ? 'leitura e escrita' : 'leitura'})`
+}
+
+const formatDate = (value: string | null) => (value ? new Date(value).toLocaleString('pt-BR') : 'nunca')
+
 export default function UserProfile() {
   const { user } = useAuthStore()
 
+  const [tokens, setTokens] = useState<ApiTokenInfo[]>([])
+  const [availableScopes, setAvailableScopes] = useState<string[]>([])
+  const [name, setName] = useState('')
+  const [scopes, setScopes] = useState<string[]>(['*'])
   const [token, setToken] = useState<string | null>(null)
   const [tokenLoading, setTokenLoading] = useState(false)
-  const [revoking, setRevoking] = useState(false)
+  const [revokingId, setRevokingId] = useState<number | null>(null)
   const [copied, setCopied] = useState(false)
   const [visible, setVisible] = useState(false)
   const [tokenError, setTokenError] = useState('')
   const [tokenSuccess, setTokenSuccess] = useState('')
 
+  const loadTokens = () =>
+    api.get<ApiTokenInfo[]>('/users/me/api-tokens').then(({ data }) => setTokens(data)).catch(() => {})
+
   useEffect(() => {
-    api.get('/users/me').then(({ data }) => {
-      setToken(data.api_token || null)
-    }).catch(() => {})
+    loadTokens()
+    api.get<string[]>('/users/me/api-tokens/scopes').then(({ data }) => setAvailableScopes(data)).catch(() => {})
   }, [])
 
+  const toggleScope = (scope: string) => {
+    if (scope === '*') {
+      setScopes(['*'])
+      return
+    }
+    const withoutFull = scopes.filter((s) => s !== '*')
+    const next = withoutFull.includes(scope) ? withoutFull.filter((s) => s !== scope) : [...withoutFull, scope]
+    setScopes(next.length ? next : ['*'])
+  }
+
   const handleGenerate = async () => {
-    if (token && !confirm('Isso vai invalidar o token atual e gerar um novo. Tem certeza?')) return
     setTokenLoading(true); setTokenError(''); setTokenSuccess('')
     try {
-      const { data } = await api.post<{ api_token: string }>('/users/me/api-token')
+      const { data } = await api.post<ApiTokenInfo & { api_token: string }>('/users/me/api-tokens', {
+        name: name.trim() || 'Token de API',
+        scopes,
+      })
       setToken(data.api_token)
       setVisible(true)
-      setTokenSuccess('Token gerado! Copie agora — ele será parcialmente ocultado na próxima visita.')
+      setName('')
+      setTokenSuccess('Token gerado! Copie agora — ele não será exibido novamente.')
+      loadTokens()
     } catch (err: any) {
       setTokenError(err.response?.data?.detail || 'Erro ao gerar token.')
     } finally {
@@ -38,17 +84,17 @@ export default function UserProfile() {
     }
   }
 
-  const handleRevoke = async () => {
-    if (!confirm('Revogar o token de API? Qualquer integração que usa este token perderá acesso.')) return
-    setRevoking(true); setTokenError(''); setTokenSuccess('')
+  const handleRevoke = async (item: ApiTokenInfo) => {
+    if (!confirm(`Revogar o token "${item.name}"? Qualquer integração que usa este token perderá acesso.`)) return
+    setRevokingId(item.id); setTokenError(''); setTokenSuccess('')
     try {
-      await api.delete('/users/me/api-token')
-      setToken(null); setVisible(false)
+      await api.delete(`/users/me/api-tokens/${item.id}`)
+      setTokens(tokens.filter((t) => t.id !== item.id))
       setTokenSuccess('Token revogado com sucesso.')
     } catch (err: any) {
       setTokenError(err.response?.data?.detail || 'Erro ao revogar token.')
     } finally {
-      setRevoking(false)
+      setRevokingId(null)
     }
   }
 
@@ -113,50 +159,76 @@ export default function UserProfile() {
           </div>
         )}
 
-        {token ? (
-          <>
-            <div className="flex items-center gap-2">
-              <div className="flex-1 bg-gray-50 border border-gray-200 rounded-lg px-4 py-3 font-mono text-sm text-gray-800 break-all">
-                {visible ? token : maskedToken}
-              </div>
-              <button onClick={() => setVisible(!visible)} className="p-2 text-gray-400 hover:text-gray-700 rounded-lg transition-colors" title={visible ? 'Ocultar' : 'Mostrar'}>
-                {visible ? <EyeOff className="h-5 w-5" /> : <Eye className="h-5 w-5" />}
-              </button>
-              <button onClick={handleCopy} className="p-2 text-gray-400 hover:text-orange-600 rounded-lg transition-colors" title="Copiar">
-                {copied ? <CheckCircle className="h-5 w-5 text-green-600" /> : <Copy className="h-5 w-5" />}
-              </button>
-            </div>
-            <div className="flex gap-3 flex-wrap">
-              <button onClick={handleGenerate} disabled={tokenLoading}
-                className="inline-flex items-center gap-2 px-4 py-2 text-sm font-medium bg-orange-500 text-white rounded-lg hover:bg-orange-600 disabled:opacity-50 transition-colors">
-                {tokenLoading ? <Loader2 className="h-4 w-4 animate-spin" /> : <RefreshCw className="h-4 w-4" />}
-                Regenerar
-              </button>
-              <button onClick={handleRevoke} disabled={revoking}
-                className="inline-flex items-center gap-2 px-4 py-2 text-sm font-medium text-red-600 border border-red-200 rounded-lg hover:bg-red-50 disabled:opacity-50 transition-colors">
-                {revoking ? <Loader2 className="h-4 w-4 animate-spin" /> : <Trash2 className="h-4 w-4" />}
-                Revogar
-              </button>
+        {token && (
+          <div className="flex items-center gap-2">
+            <div className="flex-1 bg-gray-50 border border-gray-200 rounded-lg px-4 py-3 font-mono text-sm text-gray-800 break-all">
+              {visible ? token : maskedToken}
             </div>
-          </>
-        ) : (
-          <div className="space-y-3">
-            <p className="text-sm text-gray-500">Nenhum token gerado ainda.</p>
-            <button onClick={handleGenerate} disabled={tokenLoading}
-              className="inline-flex items-center gap-2 px-4 py-2 bg-orange-500 text-white rounded-lg hover:bg-orange-600 font-medium text-sm disabled:opacity-50 transition-colors">
-              {tokenLoading ? <Loader2 className="h-4 w-4 animate-spin" /> : <Key className="h-4 w-4" />}
-              Gerar token
+            <button onClick={() => setVisible(!visible)} className="p-2 text-gray-400 hover:text-gray-700 rounded-lg transition-colors" title={visible ? 'Ocultar' : 'Mostrar'}>
+              {visible ? <EyeOff className="h-5 w-5" /> : <Eye className="h-5 w-5" />}
+            </button>
+            <button onClick={handleCopy} className="p-2 text-gray-400 hover:text-orange-600 rounded-lg transition-colors" title="Copiar">
+              {copied ? <CheckCircle className="h-5 w-5 text-green-600" /> : <Copy className="h-5 w-5" />}
             </button>
           </div>
         )}
 
+        {tokens.length > 0 ? (
+          <ul className="divide-y divide-gray-100 border border-gray-200 rounded-lg">
+            {tokens.map((item) => (
+              <li key={item.id} className="flex items-center justify-between gap-3 px-4 py-3">
+                <div className="min-w-0">
+                  <p className="text-sm font-medium text-gray-900">
+                    {item.name} <span className="font-mono text-xs text-gray-400">{item.prefix}…</span>
+                  </p>
+                  <p className="text-xs text-gray-500">{item.scopes.map(formatScope).join(', ')}</p>
+                  <p className="text-xs text-gray-400">
+                    Criado em {formatDate(item.created_at)} · Último uso: {formatDate(item.last_used_at)}
+                  </p>
+                </div>
+                <button onClick={() => handleRevoke(item)} disabled={revokingId === item.id}
+                  className="inline-flex items-center gap-2 px-3 py-1.5 text-sm font-medium text-red-600 border border-red-200 rounded-lg hover:bg-red-50 disabled:opacity-50 transition-colors">
+                  {revokingId === item.id ? <Loader2 className="h-4 w-4 animate-spin" /> : <Trash2 className="h-4 w-4" />}
+                  Revogar
+                </button>
+              </li>
+            ))}
+          </ul>
+        ) : (
+          <p className="text-sm text-gray-500">Nenhum token gerado ainda.</p>
+        )}
+
+        <div className="space-y-3 border-t border-gray-100 pt-4">
+          <input
+            type="text"
+            value={name}
+            onChange={(e) => setName(e.target.value)}
+            placeholder="Nome do token (ex.: n8n, planilha)"
+            maxLength={100}
+            className="w-full border border-gray-300 rounded-lg px-3 py-2 text-sm focus:ring-2 focus:ring-orange-500 focus:border-orange-500"
+          />
+          <div className="flex flex-wrap gap-2">
+            {availableScopes.map((scope) => (
+              <label key={scope} className="inline-flex items-center gap-1.5 text-xs text-gray-700 bg-gray-50 border border-gray-200 rounded-full px-3 py-1 cursor-pointer">
+                <input type="checkbox" checked={scopes.includes(scope)} onChange={() => toggleScope(scope)} />
+                {formatScope(scope)}
+              </label>
+            ))}
+          </div>
+          <button onClick={handleGenerate} disabled={tokenLoading}
+            className="inline-flex items-center gap-2 px-4 py-2 bg-orange-500 text-white rounded-lg hover:bg-orange-600 font-medium text-sm disabled:opacity-50 transition-colors">
+            {tokenLoading ? <Loader2 className="h-4 w-4 animate-spin" /> : <Key className="h-4 w-4" />}
+            Gerar token
+          </button>
+        </div>
+
         <div className="bg-blue-50 border border-blue-200 rounded-lg p-4 space-y-2">
           <p className="text-xs font-semibold text-blue-800">Como usar:</p>
           <div className="bg-blue-900 text-blue-100 rounded px-3 py-2 font-mono text-xs overflow-x-auto">
             <div>GET /api/v1/healthcare/members</div>
             <div className="text-blue-300">X-API-Token: {token ? maskedToken : 'seu-token-aqui'}</div>
           </div>
-          <p className="text-xs text-blue-700">⚠️ Guarde em local seguro. O token tem os mesmos acessos que sua conta.</p>
+          <p className="text-xs text-blue-700">⚠️ Guarde em local seguro. Com "Acesso total", o token tem os mesmos acessos que sua conta.</p>
         </div>
       </section>
     </div>
@@ -34,6 +34,16 @@ export const authService = {
     return response.data
   },
 
+  // Troca o refresh token por um novo par (o anterior deixa de valer)
+  async refresh(refreshToken: string) {
+    const response = await api.post('/auth/refresh', { refresh_token: refreshToken }, { timeout: 10000 })
+    return response.data
+  },
+
+  async logout(refreshToken: string) {
+    await api.post('/auth/logout', { refresh_token: refreshToken }, { timeout: 10000 })
+  },
+
   async getMe() {
     const response = await api.get('/users/me', { timeout: 10000 })
     return response.data
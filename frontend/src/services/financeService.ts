@@ -7,6 +7,10 @@ export interface Category {
   color: string
   type: 'INCOME' | 'EXPENSE'
   is_active: boolean
+  usage_count?: number
+  last_used_date?: string | null
+  total_30d?: number
+  total_90d?: number
 }
 
 export interface Entry {
@@ -60,8 +64,8 @@ export interface FinanceSummary {
 
 export const financeService = {
   // Categorias
-  async getCategories() {
-    const response = await api.get<Category[]>('/finance/categories')
+  async getCategories(order: 'name' | 'usage' = 'name') {
+    const response = await api.get<Category[]>('/finance/categories', { params: { order } })
     return response.data
   },
   async createCategory(data: Partial<Category>) {
@@ -12,14 +12,15 @@ interface User {
   is_superuser?: boolean
   is_staff?: boolean
   is_active?: boolean
-  api_token?: string | null
 }
 
 interface AuthState {
   user: User | null
   token: string | null
+  refreshToken: string | null
   isAuthenticated: boolean
-  setAuth: (user: User, token: string) => void
+  setAuth: (user: User, token: string, refreshToken?: string | null) => void
+  setTokens: (token: string, refreshToken: string | null) => void
   logout: () => void
 }
 
@@ -28,9 +29,11 @@ export const useAuthStore = create<AuthState>()(
     (set) => ({
       user: null,
       token: null,
+      refreshToken: null,
       isAuthenticated: false,
-      setAuth: (user, token) => set({ user, token, isAuthenticated: true }),
-      logout: () => set({ user: null, token: null, isAuthenticated: false }),
+      setAuth: (user, token, refreshToken = null) => set({ user, token, refreshToken, isAuthenticated: true }),
+      setTokens: (token, refreshToken) => set({ token, refreshToken }),
+      logout: () => set({ user: null, token: null, refreshToken: null, isAuthenticated: false }),
     }),
     {
       name: 'auth-storage',
@@ -38,3 +41,13 @@ export const useAuthStore = create<AuthState>()(
   )
 )
 
+
+// O persist só lê o localStorage ao carregar a página: acompanha as outras abas
+// (tokens renovados, login e logout) pelo evento `storage`
+if (typeof window !== 'undefined') {
+  window.addEventListener('storage', (event) => {
+    if (event.key === useAuthStore.persist.getOptions().name) {
+      useAuthStore.persist.rehydrate()
+    }
+  })
+}